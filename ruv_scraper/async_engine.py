@@ -0,0 +1,261 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from discovery import is_json, same_site, scan_listing_html, scan_listing_json
+from extractors import extract_series_title, extract_title, extract_video_info
+from metrics import timed
+from nfo import NFOWriter
+from pages import DEFAULT_PARSER
+from transport import RETRY_STATUS, parse_retry_after
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def parse_listing_page(content, page_url, series_url, base_url, known_urls=(), parser=DEFAULT_PARSER):
+    """Parse one page of a series' episode list (runs in a worker process).
+
+    Returns (series_title, episodes, next_urls, page_title); the titles are
+    only read from the series page itself, for the single-episode fallback.
+    """
+    if is_json(content):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return None, [], [], None
+        return (None,) + scan_listing_json(data, series_url, base_url, known_urls) + (None,)
+    soup = BeautifulSoup(content, parser)
+    try:
+        episodes, next_urls = scan_listing_html(soup, page_url, series_url, base_url, known_urls)
+        if page_url != series_url:
+            return None, episodes, next_urls, None
+        return extract_series_title(soup), episodes, next_urls, extract_title(soup)
+    finally:
+        soup.decompose()
+
+
+def parse_episode_page(content, episode_url, base_url, parser=DEFAULT_PARSER):
+    """Parse an episode page exactly like extract_video_data (runs in a worker process)"""
+    soup = BeautifulSoup(content, parser)
+    try:
+        return extract_video_info(soup, episode_url, base_url)
+    finally:
+        soup.decompose()
+
+
+class AsyncTokenBucket:
+    """Per-host request rate for the event loop"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._next_slot = 0.0
+        self._hold_until = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        slot = max(now, self._next_slot, self._hold_until)
+        self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def hold(self, seconds):
+        self._hold_until = max(self._hold_until, time.monotonic() + seconds)
+
+
+class AsyncMetadataEngine:
+    """Metadata-only crawler that fetches many pages at once on one event loop.
+
+    Pages are fetched over one shared aiohttp connection pool, limited by
+    `concurrency` requests in flight and `requests_per_second` per host. HTML is
+    parsed in a process pool so parsing never blocks the loop, using the same
+    extractors as RUVImprovedScraper, so the results match extract_video_data.
+    """
+
+    def __init__(self, scraper, concurrency=50, requests_per_second=None, max_retries=4,
+                 parse_workers=None, backoff=1.0, max_backoff=60.0, max_pages=100):
+        if aiohttp is None:
+            raise RuntimeError("The async engine needs aiohttp: pip install aiohttp")
+        self.scraper = scraper
+        self.base_url = scraper.base_url
+        self.parser = scraper.pages.parser
+        self.headers = dict(scraper.session.headers)
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.parse_workers = parse_workers or os.cpu_count()
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_pages = max_pages
+        self.metrics = scraper.metrics
+        self.streams = scraper.streams
+        self._buckets = {}
+
+    def _bucket(self, url):
+        if not self.requests_per_second:
+            return None
+        host = urlparse(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = AsyncTokenBucket(self.requests_per_second)
+        return bucket
+
+    async def _fetch(self, http, semaphore, url):
+        bucket = self._bucket(url)
+        for attempt in range(self.max_retries + 1):
+            if bucket:
+                await bucket.acquire()
+            try:
+                async with semaphore:
+                    # Timed from here, so waits for a token or a free slot are not counted as fetch time
+                    start = time.perf_counter()
+                    async with http.get(url) as response:
+                        if response.status in RETRY_STATUS and attempt < self.max_retries:
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        else:
+                            response.raise_for_status()
+                            content = await response.read()
+                            if self.metrics is not None:
+                                self.metrics.record('fetch', time.perf_counter() - start, url)
+                            return content
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+                retry_after = None
+            delay = retry_after
+            if delay is None:
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if bucket:
+                bucket.hold(delay)
+            else:
+                await asyncio.sleep(delay)
+
+    async def _parse(self, pool, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args, self.parser)
+
+    async def _episode(self, http, semaphore, pool, episode_url):
+        if self.streams is not None:
+            video_info = self.streams.get(episode_url)
+            if video_info:
+                return video_info
+        try:
+            content = await self._fetch(http, semaphore, episode_url)
+            # Parsing and extraction happen together in the worker process
+            with timed(self.metrics, 'parse', episode_url):
+                video_info = await self._parse(pool, parse_episode_page, content, episode_url, self.base_url)
+            if self.streams is not None and video_info.get('video_url'):
+                if self.streams.put(episode_url, video_info, save=False):
+                    await self._save_streams()
+            return video_info
+        except Exception as e:
+            print(f"Error extracting video data from {episode_url}: {e}")
+            return None
+
+    async def _save_streams(self):
+        """Write the stream cache in a thread, so the loop keeps fetching meanwhile"""
+        await asyncio.get_running_loop().run_in_executor(None, self.streams.save)
+
+    async def _listing_page(self, http, semaphore, pool, url, series_url, known_urls):
+        content = await self._fetch(http, semaphore, url)
+        with timed(self.metrics, 'parse', url):
+            return await self._parse(pool, parse_listing_page, content, url, series_url, self.base_url,
+                                     list(known_urls))
+
+    async def _series(self, http, semaphore, pool, series_url, output_dir_base, download_limit):
+        # Episode pages are fetched as soon as they are discovered, while later
+        # pages of the episode list are still being read
+        episodes = []
+        tasks = []
+        seen = set()
+        visited = set()
+        queue = [series_url]
+        title = page_title = None
+        while queue and len(visited) < self.max_pages:
+            if download_limit is not None and len(episodes) >= download_limit:
+                break
+            url = queue.pop(0)
+            if url in visited:
+                continue
+            visited.add(url)
+            try:
+                series_title, found, next_urls, single_title = await self._listing_page(
+                    http, semaphore, pool, url, series_url, seen)
+            except Exception as e:
+                if url == series_url:
+                    print(f"Error getting series {series_url}: {e}")
+                    return None
+                print(f"Error reading episode list page {url}: {e}")
+                continue
+            if url == series_url:
+                title, page_title = series_title, single_title
+            queue.extend(next_url for next_url in next_urls
+                         if next_url not in visited and same_site(next_url, series_url))
+            for episode in found:
+                if episode['url'] in seen or (download_limit is not None and len(episodes) >= download_limit):
+                    continue
+                seen.add(episode['url'])
+                episodes.append(episode)
+                tasks.append(asyncio.ensure_future(self._episode(http, semaphore, pool, episode['url'])))
+
+        # No episode links anywhere, so the page itself is the only episode
+        if not episodes and page_title:
+            episodes.append({'url': series_url, 'title': page_title})
+            tasks.append(asyncio.ensure_future(self._episode(http, semaphore, pool, series_url)))
+        if not title or not episodes:
+            print(f"No title or episodes found for {series_url}")
+            for task in tasks:
+                task.cancel()
+            return None
+
+        results = await asyncio.gather(*tasks)
+        numbered = [(i, info) for i, info in enumerate(results, 1) if info]
+
+        output_dir = os.path.join(output_dir_base, re.sub(r'[<>:"/\\|?*]', '_', title))
+        if numbered:
+            with timed(self.metrics, 'nfo', series_url):
+                NFOWriter(output_dir, title).merge(numbered)
+        print(f"{title}: {len(numbered)}/{len(episodes)} episodes")
+        return len(numbered)
+
+    async def _run(self, work):
+        """Await `work(http, semaphore, pool)` with one connection pool and one parser pool"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=60)
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+            async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout) as http:
+                try:
+                    return await work(http, semaphore, pool)
+                finally:
+                    if self.streams is not None:
+                        await self._save_streams()
+
+    def extract_many(self, episode_urls):
+        """Extract video info for many episode pages, in the order given"""
+        async def work(http, semaphore, pool):
+            return await asyncio.gather(*(self._episode(http, semaphore, pool, url) for url in episode_urls))
+        return asyncio.run(self._run(work))
+
+    def crawl(self, series_urls, output_dir_base="downloads", download_limit=None):
+        """Refresh info.nfo for every series without downloading any video"""
+        async def work(http, semaphore, pool):
+            return await asyncio.gather(*(
+                self._series(http, semaphore, pool, url, output_dir_base, download_limit) for url in series_urls
+            ))
+
+        start = time.monotonic()
+        counts = asyncio.run(self._run(work))
+        done = [count for count in counts if count is not None]
+        print("\n" + "=" * 60)
+        print(f"Metadata refresh completed: {len(done)} series, {sum(done)} episodes "
+              f"in {time.monotonic() - start:.1f} s")
+        return counts
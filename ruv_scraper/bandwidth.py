@@ -0,0 +1,71 @@
+import contextlib
+import re
+import threading
+import time
+
+_SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kKmMgG]?)i?[bB]?\s*$')
+_SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_size(text):
+    """Parse a byte count such as `500K`, `5M` or `1.5G`"""
+    match = _SIZE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+class BandwidthLimiter:
+    """Global bytes-per-second cap shared by every running download.
+
+    Downloads report the bytes they receive with `consume`, which blocks long
+    enough to keep the combined rate under the cap.
+    """
+
+    def __init__(self, bytes_per_second, burst=None):
+        self.rate = bytes_per_second
+        self.burst = burst or bytes_per_second
+        self.active = 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._progress = threading.local()
+
+    def consume(self, nbytes):
+        """Account for `nbytes` received, sleeping if the cap is exceeded"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= nbytes
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay > 0:
+            time.sleep(delay)
+
+    @contextlib.contextmanager
+    def transfer(self):
+        """Count a download as running for the duration of the block"""
+        with self._lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def fair_share(self):
+        """Per-download rate when the cap is split between running downloads"""
+        return max(1, int(self.rate / max(1, self.active)))
+
+    def progress_hook(self, status):
+        """yt-dlp progress hook that throttles the calling download"""
+        if status.get('status') != 'downloading':
+            return
+        filename = status.get('filename')
+        downloaded = status.get('downloaded_bytes') or 0
+        seen = getattr(self._progress, 'seen', None)
+        if seen is None or seen[0] != filename:
+            seen = (filename, 0)
+        self._progress.seen = (filename, downloaded)
+        if downloaded > seen[1]:
+            self.consume(downloaded - seen[1])
@@ -0,0 +1,106 @@
+import collections
+import sys
+import time
+
+from pipeline import EpisodePipeline
+
+
+def read_series_urls(path):
+    """Read series URLs from a file, or from stdin when `path` is `-`.
+
+    Blank lines and lines starting with `#` are ignored.
+    """
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class BatchScheduler:
+    """Runs many series through one scraper session and one episode pipeline.
+
+    Episodes from up to `active_series` series are interleaved round-robin, so
+    a long series shares the workers with the rest instead of holding them up.
+    New series are discovered as earlier ones run out of episodes.
+    """
+
+    def __init__(self, scraper, jobs=1, download_jobs=1, download_videos=True, download_limit=None,
+                 output_dir_base="downloads", active_series=None, dry_run=False):
+        self.scraper = scraper
+        self.pipeline = EpisodePipeline(scraper, jobs=jobs, download_jobs=download_jobs,
+                                        download_videos=download_videos and not dry_run)
+        self.download_limit = download_limit
+        self.output_dir_base = output_dir_base
+        self.dry_run = dry_run
+        self.active_series = active_series or max(4, jobs * 2)
+        self.series_jobs = []
+        self.failed_series = []
+
+    def _interleave(self, series_urls):
+        urls = iter(series_urls)
+        active = collections.deque()
+
+        def refill():
+            while len(active) < self.active_series:
+                series_url = next(urls, None)
+                if series_url is None:
+                    return
+                try:
+                    job, pending = self.scraper.prepare_series(series_url, self.download_limit, self.output_dir_base,
+                                                                self.dry_run)
+                except Exception as e:
+                    print(f"Error preparing series {series_url}: {e}")
+                    job = None
+                if job is None:
+                    self.failed_series.append(series_url)
+                    continue
+                self.series_jobs.append(job)
+                active.append((job, iter(pending)))
+
+        refill()
+        while active:
+            job, pending = active.popleft()
+            item = next(pending, None)
+            if item is None:
+                refill()
+                continue
+            yield (job,) + item
+            active.append((job, pending))
+
+    def run(self, series_urls):
+        """Process every series and print a summary"""
+        start = time.monotonic()
+        try:
+            stats = self.pipeline.run(self._interleave(series_urls))
+        finally:
+            for job in self.series_jobs:
+                if job.nfo is not None:
+                    job.nfo.flush()
+        elapsed = time.monotonic() - start
+
+        for job in self.series_jobs:
+            self.scraper.finish_series(job)
+
+        print("\n" + "=" * 60)
+        print("BATCH SUMMARY")
+        print("=" * 60)
+        print(f"Series processed:    {len(self.series_jobs)}")
+        if self.failed_series:
+            print(f"Series failed:       {len(self.failed_series)}")
+        print(f"Episodes processed:  {stats['episodes']}")
+        print(f"Episodes downloaded: {stats['downloads']}")
+        if stats['failed']:
+            print(f"Downloads failed:    {stats['failed']}")
+        if stats['verify_failed']:
+            print(f"Failed verification: {stats['verify_failed']}")
+        downloaded = stats['bytes']
+        store = self.scraper.store
+        if store is not None and store.linked:
+            # Linked episodes are counted as downloads but cost no bandwidth
+            downloaded -= store.linked_bytes
+            print(f"Linked from store:   {store.linked} ({store.linked_bytes / (1024 * 1024):.1f} MB)")
+        print(f"Bytes downloaded:    {downloaded} ({downloaded / (1024 * 1024):.1f} MB)")
+        print(f"Elapsed:             {elapsed:.1f} s")
+        return stats
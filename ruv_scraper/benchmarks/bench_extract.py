@@ -0,0 +1,131 @@
+"""Micro-benchmark for video URL extraction over saved RÚV episode pages.
+
+Compares the original per-script pattern loop with the precompiled
+single-pass extractor in `extractors.py`.
+
+Usage:
+    python ruv_scraper/benchmarks/bench_extract.py [--pages <directory>] [--repeat <n>] [--max-ratio <r>]
+    python ruv_scraper/benchmarks/bench_extract.py --pages <directory> --save <episode_url> [<episode_url> ...]
+
+Pages are read from the `*.html` files under the pages directory. The default
+is the recorded pages that bench_offline.py serves (`benchmarks/fixtures/pages`),
+so the benchmark runs without any setup. Use `--save` to record episode pages
+into a directory of your own. The run fails when the new extractor is slower than `--max-ratio` times the
+original one.
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from extractors import find_video_url  # noqa: E402
+from pages import DEFAULT_PARSER  # noqa: E402
+
+# The fixtures recorded for bench_offline.py
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+
+
+def legacy_find_video_url(soup):
+    """The original extraction loop from extract_video_data"""
+    for script in soup.find_all('script'):
+        if script.string:
+            patterns = [
+                r'"videoUrl"\s*:\s*"([^"]+)"',
+                r'"src"\s*:\s*"([^"]+\.mp4[^"]*)"',
+                r'"url"\s*:\s*"([^"]+\.mp4[^"]*)"',
+                r'"streamUrl"\s*:\s*"([^"]+)"',
+                r'"mediaUrl"\s*:\s*"([^"]+)"',
+                r'https?://[^\s"<>]+\.mp4[^\s"<>]*',
+                r'https?://[^\s"<>]+\.m3u8[^\s"<>]*',
+                r'https?://ruv-vod\.akamaized\.net/[^\s"<>]+'
+            ]
+            for pattern in patterns:
+                matches = re.findall(pattern, script.string)
+                if matches:
+                    return matches[0]
+    return None
+
+
+def save_pages(urls, pages_dir):
+    import requests
+
+    os.makedirs(pages_dir, exist_ok=True)
+    session = requests.Session()
+    for url in urls:
+        response = session.get(url)
+        response.raise_for_status()
+        name = re.sub(r'[^A-Za-z0-9]+', '_', url.split('//', 1)[-1]).strip('_') + '.html'
+        with open(os.path.join(pages_dir, name), 'wb') as f:
+            f.write(response.content)
+        print(f"Saved {url} -> {name}")
+
+
+def find_pages(pages_dir):
+    """Paths of the saved pages under `pages_dir`, including subdirectories"""
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(pages_dir)
+                  for name in names if name.endswith('.html'))
+
+
+def time_per_page(func, soups, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for soup in soups:
+            func(soup)
+    return (time.perf_counter() - start) / (repeat * len(soups))
+
+
+def _option(name, default):
+    if name not in sys.argv:
+        return default
+    return sys.argv[sys.argv.index(name) + 1]
+
+
+def main():
+    pages_dir = _option('--pages', PAGES_DIR)
+
+    if '--save' in sys.argv:
+        if '--pages' not in sys.argv:
+            # The fixture directory is laid out by URL path and maintained by bench_offline.py --record
+            print("--save needs --pages <directory>")
+            sys.exit(1)
+        urls = [arg for arg in sys.argv[sys.argv.index('--save') + 1:] if not arg.startswith('--')]
+        save_pages(urls, pages_dir)
+        return
+
+    repeat = int(_option('--repeat', 50))
+    max_ratio = float(_option('--max-ratio', 1.0))
+
+    files = find_pages(pages_dir)
+    if not files:
+        print(f"No saved pages in {pages_dir}. Record some with --save <episode_url>.")
+        sys.exit(1)
+
+    soups = []
+    for name in files:
+        with open(name, 'rb') as f:
+            soups.append(BeautifulSoup(f.read(), DEFAULT_PARSER))
+
+    changed = [os.path.relpath(name, pages_dir) for name, soup in zip(files, soups) if legacy_find_video_url(soup) != find_video_url(soup)]
+
+    legacy = time_per_page(legacy_find_video_url, soups, repeat)
+    current = time_per_page(find_video_url, soups, repeat)
+    ratio = current / legacy if legacy else 0
+
+    print(f"Pages:     {len(soups)} (x{repeat})")
+    print(f"Original:  {legacy * 1e6:.1f} us/page")
+    print(f"Extractor: {current * 1e6:.1f} us/page")
+    print(f"Speed-up:  {legacy / current:.2f}x")
+    if changed:
+        print(f"Different URL chosen by priority ranking on: {', '.join(changed)}")
+
+    if ratio > max_ratio:
+        print(f"FAIL: extractor takes {ratio:.2f}x the original time (limit {max_ratio:.2f}x)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
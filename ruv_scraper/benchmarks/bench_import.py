@@ -0,0 +1,175 @@
+"""Startup benchmark: import cost of the command line entry point.
+
+Starts a fresh interpreter with `-X importtime` for each way the scraper is
+started, up to the point where the scraper is ready to fetch its first page:
+
+    help       building the argument parser, as for --help
+    dry-run    a scraper for --dry-run
+    metadata   a scraper for --metadata-only
+    download   a scraper for a normal run, with the yt-dlp backend loaded
+
+Every scenario fails if it imports a module it must not need (yt-dlp, the
+download machinery, the ffmpeg helpers or the async engine outside their own
+modes), whether directly or through another module. Total import time
+and process wall time are compared with `benchmarks/import_baseline.json`, and
+the run fails when a scenario is slower than `--tolerance` times its baseline.
+
+Usage:
+    python ruv_scraper/benchmarks/bench_import.py [--repeat <n>] [--tolerance <x>] [--update-baseline] [--verbose]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fsutil import atomic_write_json, read_json  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPER_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, 'import_baseline.json')
+
+SERIES_URL = 'https://www.ruv.is/sjonvarp/spila/bubbi-byggir/37750'
+
+# Imports smaller than this are noise between runs
+NOISE_FLOOR_MS = 5.0
+
+# Arguments are followed by --output-dir <temporary directory>
+_CREATE = "import cli; scraper = cli.create_scraper(cli.parse_args({args!r} + sys.argv[1:]))"
+
+# Only needed once a run downloads (bandwidth is not here, the command line parses sizes with it)
+_DOWNLOAD_MODULES = ('yt_dlp', 'postprocess', 'content_store', 'downloaders', 'hls', 'scheduler')
+
+# name: (code, modules that must not be imported)
+SCENARIOS = {
+    'help': ("import cli; cli.build_parser().format_help()",
+             ('ruv_improved_scraper', 'requests', 'bs4', 'yt_dlp')),
+    'dry-run': (_CREATE.format(args=[SERIES_URL, '--dry-run', '--no-cache']),
+                _DOWNLOAD_MODULES + ('async_engine', 'aiohttp')),
+    'metadata': (_CREATE.format(args=[SERIES_URL, '--metadata-only', '--no-cache']),
+                 _DOWNLOAD_MODULES + ('async_engine', 'aiohttp')),
+    # Without --native-hls
+    'download': (_CREATE.format(args=[SERIES_URL, '--no-cache']) + "; scraper.get_downloader()",
+                 ('hls', 'async_engine', 'aiohttp')),
+}
+
+_IMPORT_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def measure(code, output_dir):
+    """Run `code` in a new interpreter.
+
+    Returns (wall ms, import ms, {top-level module: cumulative ms}, every module
+    imported, at any depth).
+    """
+    code = f"import sys; {code}"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code, '--output-dir', output_dir],
+                            cwd=SCRAPER_DIR, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total_us = 0
+    modules = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        total_us += int(self_us)
+        # Indented lines are modules imported by the one below them, which count too
+        loaded.add(name.split('.')[0])
+        if not indent:
+            modules[name] = int(cumulative_us) / 1000
+    return wall_ms, total_us / 1000, modules, loaded
+
+
+def run(repeat, verbose=False):
+    output_dir = tempfile.mkdtemp(prefix='ruv-bench-import-')
+    results = {'scenarios': {}}
+    failures = []
+    for name, (code, forbidden) in SCENARIOS.items():
+        walls, imports = [], []
+        modules = {}
+        loaded = set()
+        for _ in range(repeat):
+            wall_ms, import_ms, modules, loaded = measure(code, output_dir)
+            walls.append(wall_ms)
+            imports.append(import_ms)
+        failures += [f"{name}: imports {module}" for module in forbidden if module in loaded]
+        results['scenarios'][name] = {
+            'runs': repeat,
+            'wall_ms': round(statistics.median(walls), 1),
+            'import_ms': round(statistics.median(imports), 1),
+        }
+        if verbose:
+            print(f"\n{name}: slowest top-level imports")
+            for module, ms in sorted(modules.items(), key=lambda item: -item[1])[:8]:
+                print(f"  {module:<30} {ms:>8.1f} ms")
+    return results, failures
+
+
+def compare(results, baseline, tolerance):
+    """List the regressions of `results` against `baseline`"""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for key, label in (('import_ms', 'imports'), ('wall_ms', 'startup')):
+            if current[key] > before[key] * tolerance and current[key] - before[key] > NOISE_FLOOR_MS:
+                regressions.append(f"{name}: {label} {current[key]:.1f} ms, baseline {before[key]:.1f} ms")
+    return regressions
+
+
+def _option(name, default):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def main():
+    repeat = int(_option('--repeat', 5))
+    tolerance = float(_option('--tolerance', 1.5))
+    results, failures = run(repeat, verbose='--verbose' in sys.argv)
+
+    baseline = read_json(BASELINE_FILE, None)
+    print(f"{'Scenario':<10} {'Runs':>5} {'Startup ms':>11} {'Imports ms':>11} {'Baseline':>9}")
+    for name, scenario in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name) if baseline else None
+        before_ms = f"{before['import_ms']:.1f}" if before else '-'
+        print(f"{name:<10} {scenario['runs']:>5} {scenario['wall_ms']:>11.1f} {scenario['import_ms']:>11.1f} "
+              f"{before_ms:>9}")
+
+    if failures:
+        print("\nFAIL: modules loaded that the run does not need")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+    if '--update-baseline' in sys.argv:
+        atomic_write_json(BASELINE_FILE, results)
+        print(f"\nBaseline written to {BASELINE_FILE}")
+        return
+
+    if baseline is None:
+        print(f"\nNo baseline in {BASELINE_FILE}. Store one with --update-baseline.")
+        return
+
+    regressions = compare(results, baseline, tolerance)
+    if regressions:
+        print(f"\nFAIL: slower than the baseline by more than {tolerance:.2f}x")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nPASS")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,465 @@
+"""Offline benchmark and regression test over recorded RÚV pages.
+
+Serves the series and episode pages in `benchmarks/fixtures/pages`, plus a
+small synthetic HLS stream, from a local HTTP server and runs the scraper
+against them:
+
+    episodes   get_all_episodes on every series page
+    extract    extract_video_data on every episode page
+    nfo        create_info_file for every series
+    pipeline   scrape_series with native HLS downloads
+
+Results are checked against `fixtures/series.json`. Throughput, p50/p99
+latency per stage and peak RSS are compared with `benchmarks/baseline.json`,
+and the run fails on a wrong result or when a stage regresses by more than
+`--tolerance` times its baseline.
+
+Usage:
+    python ruv_scraper/benchmarks/bench_offline.py [--repeat <n>] [--tolerance <x>] [--jobs <n>] [--download-jobs <n>]
+                                                   [--update-baseline] [--verbose]
+    python ruv_scraper/benchmarks/bench_offline.py --record <series_url> [<series_url> ...] [--limit <n>]
+
+`--record` fetches live pages from ruv.is into the fixtures and stores what the
+current scraper reads from them as the expected results. Page links to
+www.ruv.is and stream URLs on ruv-vod.akamaized.net are rewritten to the local
+server while serving, so recorded pages are stored unmodified.
+"""
+import contextlib
+import io
+import itertools
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fsutil import atomic_write_json, read_json  # noqa: E402
+from manifest import SeriesManifest  # noqa: E402
+from metrics import percentile  # noqa: E402
+from ruv_improved_scraper import RUVImprovedScraper  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+PAGES_DIR = os.path.join(FIXTURES_DIR, 'pages')
+SERIES_FILE = os.path.join(FIXTURES_DIR, 'series.json')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+
+SITE_URL = 'https://www.ruv.is'
+STREAM_URL = 'https://ruv-vod.akamaized.net'
+
+STAGES = ('episodes', 'extract', 'nfo', 'pipeline')
+
+# Synthetic HLS stream: (name, width, height, bandwidth) variants of null TS packets
+HLS_VARIANTS = (('low', 640, 360, 800000), ('high', 1280, 720, 3000000))
+HLS_SEGMENTS = 10
+TS_PACKETS_PER_SEGMENT = 256
+
+# p99 is noisier than p50, so it gets twice the tolerance, and it is only
+# compared once there are enough runs for it to be more than the slowest one
+P99_SLACK = 2.0
+P99_MIN_RUNS = 50
+# Differences below this are timer and filesystem jitter, whatever the ratio
+NOISE_FLOOR_MS = 1.0
+
+
+def _segment(index):
+    packet = b'\x47\x1f\xff\x10' + bytes([index % 256]) * 184
+    return packet * TS_PACKETS_PER_SEGMENT
+
+
+def _master_playlist():
+    lines = ['#EXTM3U']
+    for name, width, height, bandwidth in HLS_VARIANTS:
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height}')
+        lines.append(f'{name}/index.m3u8')
+    return '\n'.join(lines) + '\n'
+
+
+def _media_playlist():
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4', '#EXT-X-MEDIA-SEQUENCE:0']
+    for i in range(HLS_SEGMENTS):
+        lines.append('#EXTINF:4.0,')
+        lines.append(f'seg{i}.ts')
+    lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+def page_file(url):
+    """Fixture file that holds the response body for `url`"""
+    parts = urlparse(url)
+    path = os.path.join(PAGES_DIR, *parts.path.strip('/').split('/'))
+    if parts.query:
+        path += '__' + re.sub(r'[^A-Za-z0-9]+', '_', parts.query)
+    return path + '.html'
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes, which Nagle would hold back
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith('/vod/'):
+            body, content_type = self.server.stream(path)
+        else:
+            body, content_type = self.server.page(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Local stand-in for www.ruv.is and the RÚV video CDN"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _FixtureHandler)
+        self.url = f'http://127.0.0.1:{self.server_port}'
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def local(self, url):
+        """Map a ruv.is or CDN URL to this server"""
+        return url.replace(STREAM_URL, self.url + '/vod').replace(SITE_URL, self.url)
+
+    def original(self, url):
+        """Map a URL on this server back to ruv.is or the CDN"""
+        if not url:
+            return url
+        return url.replace(self.url + '/vod', STREAM_URL).replace(self.url, SITE_URL)
+
+    def page(self, path):
+        with self._lock:
+            body = self._pages.get(path)
+            if body is None:
+                try:
+                    with open(page_file(path), 'r', encoding='utf-8') as f:
+                        body = self._pages[path] = self.local(f.read()).encode('utf-8')
+                except OSError:
+                    return None, None
+        return body, 'text/html; charset=utf-8'
+
+    def stream(self, path):
+        parts = path.split('/')
+        name = parts[-1]
+        if name.endswith('.ts'):
+            match = re.match(r'seg(\d+)\.ts$', name)
+            if not match or int(match.group(1)) >= HLS_SEGMENTS:
+                return None, None
+            return _segment(int(match.group(1))), 'video/mp2t'
+        if not name.endswith('.m3u8'):
+            return None, None
+        if name == 'index.m3u8' and parts[-2] in {variant[0] for variant in HLS_VARIANTS}:
+            playlist = _media_playlist()
+        else:
+            playlist = _master_playlist()
+        return playlist.encode('utf-8'), 'application/vnd.apple.mpegurl'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be read"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Stage:
+    """Latency samples and item counts for one benchmark stage"""
+
+    def __init__(self):
+        self.samples = []
+        self.items = 0
+
+    def run(self, func, *args, items=1, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.samples.append(time.perf_counter() - start)
+        self.items += items
+        return result
+
+    def summary(self):
+        if not self.samples:
+            return None
+        return {
+            'runs': len(self.samples),
+            'throughput': round(self.items / sum(self.samples), 1),
+            'p50_ms': round(percentile(self.samples, 50) * 1000, 3),
+            'p99_ms': round(percentile(self.samples, 99) * 1000, 3),
+        }
+
+
+class OfflineBenchmark:
+    """Runs every stage against the fixture server and checks the results"""
+
+    def __init__(self, server, series, jobs=4, download_jobs=2):
+        self.server = server
+        self.series = series
+        self.jobs = jobs
+        self.download_jobs = download_jobs
+        self.stages = {name: Stage() for name in STAGES}
+        self.failures = []
+        self.bytes_downloaded = 0
+        self.retries = 0
+
+    def _fail(self, message):
+        if message not in self.failures:
+            self.failures.append(message)
+
+    def _scraper(self):
+        scraper = RUVImprovedScraper(requests_per_second=None, native_hls=True)
+        scraper.base_url = self.server.url
+        return scraper
+
+    def run_metadata(self, scraper, output_dir, stages=None):
+        """get_all_episodes, extract_video_data and create_info_file for every series"""
+        stages = stages or self.stages
+        os.makedirs(output_dir, exist_ok=True)
+        for series in self.series:
+            series_url = self.server.local(series['url'])
+            episodes = stages['episodes'].run(scraper.get_all_episodes, series_url)
+            title = scraper.get_series_title(series_url)
+            scraper.pages.release(series_url)
+            if title != series['title']:
+                self._fail(f"{series['url']}: series title is {title!r}, recorded {series['title']!r}")
+            expected = [(episode['url'], episode['link_title']) for episode in series['episodes']]
+            found = [(self.server.original(episode['url']), episode['title']) for episode in episodes]
+            if found[:len(expected)] != expected:
+                self._fail(f"{series['title']}: episode list differs from the recording")
+
+            infos = []
+            for episode in series['episodes']:
+                info = stages['extract'].run(scraper.extract_video_data, self.server.local(episode['url']))
+                if not info:
+                    self._fail(f"{episode['url']}: no video data extracted")
+                    continue
+                for key in ('title', 'description', 'video_url'):
+                    value = self.server.original(info[key]) if key == 'video_url' else info[key]
+                    if value != episode[key]:
+                        self._fail(f"{episode['url']}: {key} is {value!r}, recorded {episode[key]!r}")
+                infos.append(info)
+
+            info_file = stages['nfo'].run(scraper.create_info_file, series['title'], infos, output_dir)
+            try:
+                titles = [elem.findtext('title') for elem in ET.parse(info_file).iter('episode')]
+            except (ET.ParseError, OSError, TypeError) as e:
+                self._fail(f"{series['title']}: info.nfo not readable: {e}")
+                continue
+            if titles != [info['title'] for info in infos]:
+                self._fail(f"{series['title']}: info.nfo episodes differ from the extracted data")
+
+    def run_pipeline(self, scraper, output_dir, stages=None):
+        """scrape_series with downloads for every series into a fresh directory"""
+        stages = stages or self.stages
+        for series in self.series:
+            series_url = self.server.local(series['url'])
+            count = len(series['episodes'])
+            metadata = stages['pipeline'].run(
+                scraper.scrape_series, series_url, download_limit=count, output_dir_base=output_dir,
+                jobs=self.jobs, download_jobs=self.download_jobs, items=count
+            )
+            if not metadata or len(metadata) != count:
+                self._fail(f"{series['title']}: pipeline processed {len(metadata or [])} of {count} episodes")
+                continue
+            manifest = SeriesManifest(os.path.join(output_dir, re.sub(r'[<>:"/\\|?*]', '_', series['title'])))
+            for episode in series['episodes']:
+                url = series_url if episode['url'] == series['url'] else self.server.local(episode['url'])
+                entry = manifest.get(url)
+                if not entry or not manifest.is_complete(url):
+                    self._fail(f"{episode['url']}: download missing from the manifest")
+                    continue
+                self.bytes_downloaded += entry['size']
+
+    def run(self, repeat, output_dir, verbose=False):
+        out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with out:
+            # One untimed pass to warm up imports, connections and the page reads
+            warm_up = {name: Stage() for name in STAGES}
+            scraper = self._scraper()
+            self.run_metadata(scraper, os.path.join(output_dir, 'warm-up'), warm_up)
+            self.run_pipeline(scraper, os.path.join(output_dir, 'warm-up'), warm_up)
+            self.bytes_downloaded = 0
+
+            for i in range(repeat):
+                scraper = self._scraper()
+                run_dir = os.path.join(output_dir, f'run-{i}')
+                self.run_metadata(scraper, run_dir)
+                self.run_pipeline(scraper, run_dir)
+                self.retries += scraper.session.retries + scraper.hls.session.retries
+
+        results = {'stages': {name: stage.summary() for name, stage in self.stages.items()}}
+        rss = peak_rss_mb()
+        results['peak_rss_mb'] = round(rss, 1) if rss is not None else None
+        pipeline_time = sum(self.stages['pipeline'].samples)
+        mb_per_s = self.bytes_downloaded / (1024 * 1024) / pipeline_time if pipeline_time else 0
+        results['download_mb_per_s'] = round(mb_per_s, 1)
+        results['retries'] = self.retries
+        return results
+
+
+def compare(results, baseline, tolerance):
+    """List the regressions of `results` against `baseline`"""
+    def slower(current_ms, before_ms, limit):
+        return current_ms > before_ms * limit and current_ms - before_ms > NOISE_FLOOR_MS
+
+    regressions = []
+    for name, current in results['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if not current or not before:
+            continue
+        if slower(1000 / current['throughput'], 1000 / before['throughput'], tolerance):
+            regressions.append(f"{name}: throughput {current['throughput']:.1f}/s, baseline {before['throughput']:.1f}/s")
+        if slower(current['p50_ms'], before['p50_ms'], tolerance):
+            regressions.append(f"{name}: p50 {current['p50_ms']:.2f} ms, baseline {before['p50_ms']:.2f} ms")
+        if current['runs'] >= P99_MIN_RUNS and slower(current['p99_ms'], before['p99_ms'], tolerance * P99_SLACK):
+            regressions.append(f"{name}: p99 {current['p99_ms']:.2f} ms, baseline {before['p99_ms']:.2f} ms")
+    rss, before_rss = results.get('peak_rss_mb'), baseline.get('peak_rss_mb')
+    if rss and before_rss and rss > before_rss * tolerance:
+        regressions.append(f"peak RSS {rss:.1f} MB, baseline {before_rss:.1f} MB")
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"{'Stage':<10} {'Runs':>5} {'Items/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'Baseline p50':>13}")
+    for name in STAGES:
+        stage = results['stages'].get(name)
+        if not stage:
+            continue
+        before = baseline.get('stages', {}).get(name) if baseline else None
+        before_p50 = f"{before['p50_ms']:.2f}" if before else '-'
+        print(f"{name:<10} {stage['runs']:>5} {stage['throughput']:>10.1f} {stage['p50_ms']:>9.2f} "
+              f"{stage['p99_ms']:>9.2f} {before_p50:>13}")
+    print(f"Downloads:  {results['download_mb_per_s']:.1f} MB/s")
+    if results['retries']:
+        # A retry waits out a backoff, which shows up in p99
+        print(f"Retries:    {results['retries']}")
+    if results['peak_rss_mb'] is not None:
+        before_rss = f" (baseline {baseline['peak_rss_mb']:.1f} MB)" if baseline and baseline.get('peak_rss_mb') else ''
+        print(f"Peak RSS:   {results['peak_rss_mb']:.1f} MB{before_rss}")
+
+
+def record(series_urls, limit=None):
+    """Save live pages into the fixtures, with what the scraper extracts from them.
+
+    Every response the scraper receives is saved, so further pages of an
+    episode list and episode list API responses are recorded too.
+    """
+    scraper = RUVImprovedScraper()
+    recorded = read_json(SERIES_FILE, {'series': []})
+
+    def save(response, *args, **kwargs):
+        if not response.ok:
+            return
+        for url in [response.url] + [earlier.url for earlier in response.history]:
+            path = page_file(url)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(response.content)
+            print(f"Saved {url}")
+
+    scraper.session.hooks['response'].append(save)
+    for series_url in series_urls:
+        entry = {'url': series_url, 'title': scraper.get_series_title(series_url), 'episodes': []}
+        for episode in scraper.get_all_episodes(series_url)[:limit]:
+            info = scraper.extract_video_data(episode['url'])
+            if not info:
+                continue
+            entry['episodes'].append({
+                'url': episode['url'],
+                'link_title': episode['title'],
+                'title': info['title'],
+                'description': info['description'],
+                'video_url': info['video_url'],
+            })
+        recorded['series'] = [series for series in recorded['series'] if series['url'] != series_url] + [entry]
+
+    atomic_write_json(SERIES_FILE, recorded)
+    print(f"Recorded {len(series_urls)} series into {SERIES_FILE}")
+
+
+def _option(name, default):
+    if name not in sys.argv:
+        return default
+    return sys.argv[sys.argv.index(name) + 1]
+
+
+def main():
+    if '--record' in sys.argv:
+        urls = list(itertools.takewhile(lambda arg: not arg.startswith('--'), sys.argv[sys.argv.index('--record') + 1:]))
+        limit = _option('--limit', None)
+        record(urls, int(limit) if limit else None)
+        return
+
+    repeat = int(_option('--repeat', 5))
+    tolerance = float(_option('--tolerance', 1.5))
+    series = read_json(SERIES_FILE, {'series': []})['series']
+    if not series:
+        print(f"No recorded series in {SERIES_FILE}. Record some with --record <series_url>.")
+        sys.exit(1)
+
+    server = FixtureServer().start()
+    output_dir = tempfile.mkdtemp(prefix='ruv-bench-')
+    try:
+        benchmark = OfflineBenchmark(server, series, jobs=int(_option('--jobs', 4)),
+                                     download_jobs=int(_option('--download-jobs', 2)))
+        results = benchmark.run(repeat, output_dir, verbose='--verbose' in sys.argv)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    baseline = read_json(BASELINE_FILE, None)
+    episodes = sum(len(entry['episodes']) for entry in series)
+    print(f"Series: {len(series)}, episodes: {episodes} (x{repeat})")
+    print_results(results, baseline)
+
+    if benchmark.failures:
+        print("\nFAIL: results differ from the recordings")
+        for failure in benchmark.failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+    if '--update-baseline' in sys.argv:
+        atomic_write_json(BASELINE_FILE, results)
+        print(f"\nBaseline written to {BASELINE_FILE}")
+        return
+
+    if baseline is None:
+        print(f"\nNo baseline in {BASELINE_FILE}. Store one with --update-baseline.")
+        return
+
+    regressions = compare(results, baseline, tolerance)
+    if regressions:
+        print(f"\nFAIL: slower than the baseline by more than {tolerance:.2f}x")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nPASS")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+import argparse
+import os
+import sys
+
+from bandwidth import parse_size
+
+# Only argparse is loaded up front. The scraper, its caches and the download
+# machinery are imported once the arguments say they are needed, so --help,
+# --dry-run and metadata-only runs start without loading yt-dlp or ffmpeg helpers.
+
+DEFAULT_OUTPUT_DIR = os.path.join("ruv_scraper", "downloads")
+
+# One request every 3 seconds per host, the delay the scraper has always kept to
+DEFAULT_RATE = 1 / 3
+
+
+def _interval(text):
+    from daemon import parse_interval
+    try:
+        return parse_interval(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an interval such as 900, 15m or 2h, got {text!r}")
+
+
+def _size(text):
+    try:
+        return parse_size(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a size such as 500K, 5M or 10G, got {text!r}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="ruv_improved_scraper.py",
+        description="Download RÚV series into one folder per series, with an info.nfo file of episode metadata.",
+    )
+    parser.add_argument('series_url', nargs='?', help="series page on ruv.is")
+    parser.add_argument('--batch', metavar='FILE', help="file of series URLs, one per line, or - for stdin")
+    parser.add_argument('--watch', metavar='FILE',
+                        help="keep running and download new episodes of the series in FILE, one URL per line "
+                             "with an optional poll interval")
+    parser.add_argument('--limit', type=int, metavar='N', help="process at most N episodes per series")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, metavar='DIR',
+                        help=f"directory for the series folders (default: {DEFAULT_OUTPUT_DIR})")
+
+    modes = parser.add_argument_group("modes")
+    modes.add_argument('--dry-run', action='store_true',
+                       help="list the episodes that would be downloaded, without downloading or writing info.nfo")
+    modes.add_argument('--metadata-only', action='store_true', help="refresh info.nfo without downloading any video")
+    modes.add_argument('--async', dest='use_async', action='store_true',
+                       help="metadata-only crawl with many pages in flight at once (needs aiohttp)")
+    modes.add_argument('--concurrency', type=int, default=50, metavar='N',
+                       help="maximum pages in flight for --async (default: 50)")
+
+    workers = parser.add_argument_group("workers")
+    workers.add_argument('--jobs', type=int, default=1, metavar='N', help="metadata extraction workers (default: 1)")
+    workers.add_argument('--download-jobs', type=int, default=1, metavar='N',
+                         help="simultaneous downloads (default: 1)")
+    workers.add_argument('--verify-jobs', type=int, default=2, metavar='N',
+                         help="processes verifying and remuxing finished downloads (default: 2)")
+
+    network = parser.add_argument_group("network")
+    network.add_argument('--rate', type=float, default=DEFAULT_RATE, metavar='REQUESTS/S',
+                         help="maximum requests per second to each host (default: 0.33, one request every 3 s)")
+    network.add_argument('--retries', type=int, default=4, metavar='N',
+                         help="retries for connection errors, 429 and 5xx responses (default: 4)")
+    network.add_argument('--limit-rate', type=_size, metavar='BYTES/S',
+                         help="global download bandwidth cap, e.g. 500K or 5M")
+
+    downloads = parser.add_argument_group("downloads")
+    downloads.add_argument('--backend', choices=('api', 'subprocess'),
+                           help="run yt-dlp in-process or as a command (default: api when installed)")
+    downloads.add_argument('--native-hls', action='store_true', help="download HLS streams with the built-in downloader")
+    downloads.add_argument('--segment-jobs', type=int, default=8, metavar='N',
+                           help="HLS segments fetched in parallel (default: 8)")
+    downloads.add_argument('--max-height', type=int, metavar='LINES', help="best HLS variant at or below this height")
+    downloads.add_argument('--min-free', type=_size, default=0, metavar='SIZE',
+                           help="free disk space to keep after every running download, e.g. 10G")
+    downloads.add_argument('--no-dedup', action='store_true',
+                           help="download every episode, even when another series already has it")
+    downloads.add_argument('--checksum', action='store_true',
+                           help="record SHA-256 checksums and check linked copies against them")
+    downloads.add_argument('--no-verify', action='store_true', help="record downloads without probing them")
+
+    caching = parser.add_argument_group("caching")
+    caching.add_argument('--parser', choices=('lxml', 'html.parser'), help="HTML parser (default: lxml when installed)")
+    caching.add_argument('--cache-ttl', type=int, default=0, metavar='SECONDS',
+                         help="serve cached pages younger than this without asking the server (default: 0)")
+    caching.add_argument('--cache-size', type=int, default=200, metavar='MB',
+                         help="maximum size of the page cache (default: 200)")
+    caching.add_argument('--stream-ttl', type=int, default=86400, metavar='SECONDS',
+                         help="reuse extracted video info for this long (default: 86400)")
+    caching.add_argument('--no-cache', action='store_true', help="disable the page cache and the stream cache")
+
+    daemon = parser.add_argument_group("watching")
+    daemon.add_argument('--interval', type=_interval, default=900, metavar='INTERVAL',
+                        help="poll interval for series without their own, e.g. 900, 15m or 2h (default: 15m)")
+    daemon.add_argument('--status-file', metavar='FILE',
+                        help="status JSON of the watcher (default: daemon-status.json in the output directory)")
+    daemon.add_argument('--status-port', type=int, metavar='PORT',
+                        help="also serve the status JSON on http://127.0.0.1:PORT/")
+
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write stage timings and counters to a .jsonl file, or a .prom file for Prometheus")
+    return parser
+
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    sources = [source for source in (args.series_url, args.batch, args.watch) if source]
+    if not sources:
+        parser.error("a series URL, --batch or --watch is required")
+    if len(sources) > 1:
+        parser.error("give only one of a series URL, --batch and --watch")
+    if args.watch and (args.dry_run or args.use_async or args.limit is not None):
+        parser.error("--watch cannot be combined with --dry-run, --async or --limit")
+    return args
+
+
+def downloads_enabled(args):
+    return not (args.dry_run or args.metadata_only or args.use_async)
+
+
+def create_scraper(args):
+    """Build the scraper with the caches and helpers the arguments ask for"""
+    from ruv_improved_scraper import RUVImprovedScraper
+
+    options = {}
+    if args.parser:
+        options['parser'] = args.parser
+    if not args.no_cache:
+        from http_cache import HTTPCache
+        from stream_cache import StreamCache
+        options['cache'] = HTTPCache(os.path.join(args.output_dir, '.cache', 'http'), ttl=args.cache_ttl,
+                                     max_bytes=args.cache_size * 1024 * 1024)
+        options['streams'] = StreamCache(os.path.join(args.output_dir, '.cache', 'streams.json'), ttl=args.stream_ttl)
+    if args.metrics:
+        from metrics import Metrics
+        options['metrics'] = Metrics(args.metrics)
+
+    # The download machinery is only loaded for runs that download
+    if downloads_enabled(args):
+        if not args.no_dedup:
+            from content_store import ContentStore
+            options['store'] = ContentStore(os.path.join(args.output_dir, '.store', 'index.json'),
+                                            checksum=args.checksum)
+        if not args.no_verify:
+            from postprocess import PostProcessor
+            options['postprocessor'] = PostProcessor(args.verify_jobs)
+
+    return RUVImprovedScraper(
+        requests_per_second=args.rate,
+        max_retries=args.retries,
+        backend=args.backend,
+        native_hls=args.native_hls,
+        segment_jobs=args.segment_jobs,
+        max_height=args.max_height,
+        bandwidth_limit=args.limit_rate,
+        min_free_space=args.min_free,
+        **options
+    )
+
+
+def run(scraper, args):
+    if args.watch:
+        # One scraper, session and page cache for the life of the watcher
+        from daemon import WatchDaemon
+        status_file = args.status_file or os.path.join(args.output_dir, 'daemon-status.json')
+        WatchDaemon(
+            scraper,
+            args.watch,
+            default_interval=args.interval,
+            jobs=args.jobs,
+            download_jobs=args.download_jobs,
+            download_videos=downloads_enabled(args),
+            output_dir_base=args.output_dir,
+            status_file=status_file,
+            status_port=args.status_port
+        ).run()
+        return
+
+    if args.batch:
+        from batch import read_series_urls
+        series_urls = read_series_urls(args.batch)
+    else:
+        series_urls = [args.series_url]
+
+    if args.use_async:
+        # Metadata-only crawl with many pages in flight on one event loop
+        from async_engine import AsyncMetadataEngine
+        engine = AsyncMetadataEngine(scraper, concurrency=args.concurrency, requests_per_second=args.rate,
+                                     max_retries=args.retries)
+        engine.crawl(series_urls, args.output_dir, download_limit=args.limit)
+    elif args.batch:
+        from batch import BatchScheduler
+        scheduler = BatchScheduler(
+            scraper,
+            jobs=args.jobs,
+            download_jobs=args.download_jobs,
+            download_videos=downloads_enabled(args),
+            download_limit=args.limit,
+            output_dir_base=args.output_dir,
+            dry_run=args.dry_run
+        )
+        scheduler.run(series_urls)
+    else:
+        scraper.scrape_series(
+            args.series_url,
+            download_videos=downloads_enabled(args),
+            download_limit=args.limit,
+            output_dir_base=args.output_dir,
+            jobs=args.jobs,
+            download_jobs=args.download_jobs,
+            dry_run=args.dry_run
+        )
+
+
+def close(scraper):
+    """Shut down the helpers and write the final metrics"""
+    if scraper.postprocessor:
+        scraper.postprocessor.close()
+    if scraper.cache:
+        scraper.cache.close()
+    if scraper.streams:
+        scraper.streams.close()
+    if scraper.metrics:
+        counters = {'retries': scraper.session.retries, 'throttle_seconds': round(scraper.session.throttled, 3)}
+        if scraper.hls:
+            counters['retries'] += scraper.hls.session.retries
+        if scraper.cache:
+            counters.update(cache_hits=scraper.cache.hits, cache_revalidated=scraper.cache.revalidated,
+                            cache_misses=scraper.cache.misses)
+        if scraper.streams:
+            counters.update(stream_cache_hits=scraper.streams.hits, stream_cache_misses=scraper.streams.misses)
+        if scraper.store:
+            counters.update(dedup_links=scraper.store.linked, dedup_bytes=scraper.store.linked_bytes)
+        scraper.metrics.close(**counters)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scraper = create_scraper(args)
+    try:
+        run(scraper, args)
+    finally:
+        close(scraper)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
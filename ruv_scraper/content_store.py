@@ -0,0 +1,201 @@
+import collections
+import errno
+import hashlib
+import os
+import re
+import shutil
+import threading
+from urllib.parse import urlparse
+
+from fsutil import atomic_write_json, read_json
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# RÚV streams live under /opid/<media id>/, whichever collection links to them
+_MEDIA_ID_RE = re.compile(r'/opid/([^/]+)/')
+# ioctl that makes a file share another file's blocks (btrfs, XFS, ...)
+_FICLONE = 0x40049409
+
+
+def content_key(video_info):
+    """Key identifying an episode's media, the same for every series it appears in"""
+    video_url = video_info.get('video_url')
+    if not video_url:
+        return None
+    parsed = urlparse(video_url)
+    match = _MEDIA_ID_RE.search(parsed.path)
+    if match:
+        return f"opid:{match.group(1)}"
+    return parsed.netloc + parsed.path
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(source, target):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform")
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(target)
+            raise
+
+
+def link_file(source, target):
+    """Make `target` a copy of `source` without duplicating data where the disk allows.
+
+    Tries a hardlink, then a reflink, then falls back to a plain copy. Returns
+    'hardlink', 'reflink' or 'copy'.
+    """
+    for method, make in (('hardlink', os.link), ('reflink', _reflink)):
+        try:
+            make(source, target)
+            return method
+        except OSError:
+            continue
+    shutil.copyfile(source, target)
+    return 'copy'
+
+
+class ContentStore:
+    """Global index of downloaded episodes, keyed on their media rather than their series.
+
+    The first download of an episode is indexed by its content key; when the
+    same media turns up in another series it is linked into that series'
+    folder instead of being downloaded again. With `checksum`, files are
+    hashed as they are indexed and every link is checked against the original.
+    A thread downloading an episode claims its key, so other threads wanting
+    the same media wait for that download and link it rather than fetching it
+    twice.
+    """
+
+    def __init__(self, path, checksum=False):
+        self.path = path
+        # Indexed files are stored relative to the directory holding the series folders
+        self.root = os.path.dirname(os.path.dirname(os.path.abspath(path)))
+        self.checksum = checksum
+        self.linked = 0
+        self.linked_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = collections.defaultdict(threading.Lock)
+        # Keys being downloaded, and the condition their waiting copies are woken with
+        self._claimed = set()
+        self._claims = threading.Condition()
+        self.entries = read_json(path, {}).get('entries', {})
+
+    def _key_lock(self, key):
+        """Lock held while one episode is looked up, linked, claimed or released"""
+        with self._lock:
+            return self._key_locks[key]
+
+    def claim(self, key, output_file):
+        """Link the stored file for `key` to `output_file`, or claim `key` for downloading it.
+
+        Returns the linked path, or None when the caller now holds the claim
+        and must download the episode, then add() it and release() the claim.
+        While another thread holds the claim this waits for it, without holding
+        any lock, and tries the link again.
+        """
+        while True:
+            with self._key_lock(key):
+                linked_file = self.link(key, output_file)
+                if linked_file:
+                    return linked_file
+                with self._claims:
+                    if key not in self._claimed:
+                        self._claimed.add(key)
+                        return None
+            with self._claims:
+                while key in self._claimed:
+                    self._claims.wait()
+
+    def release(self, key):
+        """Give up the claim taken by claim(), waking the threads waiting for `key`"""
+        with self._key_lock(key):
+            with self._claims:
+                self._claimed.discard(key)
+                self._claims.notify_all()
+
+    def find(self, key):
+        """Path of the indexed file for `key`, if it is still intact"""
+        with self._lock:
+            entry = self.entries.get(key)
+        if not entry:
+            return None
+        path = os.path.join(self.root, entry['file'])
+        try:
+            if os.path.getsize(path) == entry['size']:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def get_checksum(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            return entry.get('checksum') if entry else None
+
+    def add(self, key, file_path, checksum=None):
+        """Index a finished download under `key`"""
+        if self.checksum and checksum is None:
+            checksum = file_checksum(file_path)
+        entry = {
+            'file': os.path.relpath(os.path.abspath(file_path), self.root),
+            'size': os.path.getsize(file_path),
+            'checksum': checksum,
+        }
+        with self._lock:
+            self.entries[key] = entry
+            atomic_write_json(self.path, {'entries': self.entries})
+        return entry
+
+    def remove(self, key):
+        """Drop `key` from the index, e.g. when its file turned out to be broken"""
+        with self._lock:
+            if self.entries.pop(key, None) is None:
+                return False
+            atomic_write_json(self.path, {'entries': self.entries})
+        return True
+
+    def link(self, key, output_file):
+        """Link the indexed file for `key` to `output_file`, keeping its extension.
+
+        Returns the path linked to, or None when the media is not in the store
+        or the copy does not match the original.
+        """
+        source = self.find(key)
+        if source is None:
+            return None
+        target = os.path.splitext(output_file)[0] + os.path.splitext(source)[1]
+        if os.path.exists(target):
+            # A file of this series' own is left for the downloader to resume or skip
+            return target if os.path.samefile(source, target) else None
+        method = link_file(source, target)
+
+        if self.checksum and method != 'hardlink':
+            expected = self.get_checksum(key)
+            if expected is None:
+                expected = file_checksum(source)
+                self.add(key, source, expected)
+            if file_checksum(target) != expected:
+                print(f"Checksum mismatch for {os.path.basename(target)}, downloading it again")
+                os.remove(target)
+                return None
+
+        print(f"Linked ({method}) from {os.path.relpath(source, self.root)}")
+        with self._lock:
+            self.linked += 1
+            self.linked_bytes += os.path.getsize(target)
+        return target
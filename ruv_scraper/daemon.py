@@ -0,0 +1,311 @@
+import collections
+import heapq
+import json
+import os
+import queue
+import re
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fsutil import atomic_write_json
+from pipeline import EpisodePipeline
+
+_INTERVAL_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([smhd]?)$', re.IGNORECASE)
+_INTERVAL_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Sentinel ending the pipeline's task stream
+_STOP = object()
+
+# Throughput in the status is averaged over this many seconds
+THROUGHPUT_WINDOW = 300
+
+
+def parse_interval(text):
+    """Parse a poll interval such as `900`, `15m`, `2h` or `1d` into seconds"""
+    match = _INTERVAL_RE.match(str(text).strip())
+    if not match:
+        raise ValueError(f"Invalid interval: {text}")
+    return float(match.group(1)) * _INTERVAL_UNITS[match.group(2).lower()]
+
+
+def read_watch_list(path, default_interval):
+    """Read (series_url, interval seconds) pairs, one series per line with an optional interval.
+
+    Blank lines and lines starting with `#` are ignored.
+    """
+    watch_list = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            url, _, interval = line.partition(' ')
+            try:
+                seconds = parse_interval(interval) if interval.strip() else default_interval
+            except ValueError:
+                print(f"Invalid interval for {url}: {interval.strip()}, using the default")
+                seconds = default_interval
+            watch_list.append((url, seconds))
+    return watch_list
+
+
+class WatchedSeries:
+    """Poll state of one series on the watch list"""
+
+    def __init__(self, url, interval):
+        self.url = url
+        self.interval = interval
+        self.job = None
+        # Episode page URL -> episode number, for every episode seen so far
+        self.numbers = {}
+        self.next_poll = 0.0
+        self.last_poll = None
+        self.last_new = 0
+        self.error = None
+
+    def status(self):
+        return {
+            'url': self.url,
+            'title': self.job.title if self.job else None,
+            'interval': self.interval,
+            'episodes': len(self.numbers),
+            'last_poll': self.last_poll,
+            'next_poll': self.next_poll,
+            'new_last_poll': self.last_new,
+            'error': self.error,
+        }
+
+
+def _status_handler(daemon):
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(daemon.status(), ensure_ascii=False, indent=2).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return StatusHandler
+
+
+class WatchDaemon:
+    """Watches series for new episodes and feeds them to one long-running pipeline.
+
+    Every series on the watch list is polled on its own interval with
+    `get_all_episodes`, through the scraper's session and page cache, so an
+    unchanged page costs a conditional request. Episodes not seen before are
+    queued for extraction and download; everything else is left alone. The
+    watch list file is re-read when it changes. Extracted episodes reach each
+    series' info.nfo within `status_every` seconds, and on stopping. Queue depth,
+    recent throughput and the state of each series are written to
+    `status_file`, and served as JSON on localhost when `status_port` is given.
+    """
+
+    def __init__(self, scraper, watch_file, default_interval=900, jobs=1, download_jobs=1, download_videos=True,
+                 output_dir_base="downloads", status_file=None, status_port=None, status_every=10):
+        self.scraper = scraper
+        self.watch_file = watch_file
+        self.default_interval = default_interval
+        self.output_dir_base = output_dir_base
+        self.status_file = status_file
+        self.status_port = status_port
+        self.status_every = status_every
+        self.pipeline = EpisodePipeline(scraper, jobs=jobs, download_jobs=download_jobs,
+                                        download_videos=download_videos)
+        self.series = {}
+        self.tasks = queue.Queue()
+        self.started = time.time()
+        self._watch_mtime = None
+        self._schedule = []
+        self._samples = collections.deque()
+        self._status_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def _reload_watch_list(self):
+        """Pick up added and removed series when the watch list file changes"""
+        try:
+            mtime = os.path.getmtime(self.watch_file)
+        except OSError as e:
+            if self._watch_mtime is None:
+                raise
+            print(f"Could not read watch list {self.watch_file}: {e}")
+            return
+        if mtime == self._watch_mtime:
+            return
+        self._watch_mtime = mtime
+
+        watch_list = dict(read_watch_list(self.watch_file, self.default_interval))
+        for url in list(self.series):
+            if url not in watch_list:
+                print(f"No longer watching {url}")
+                del self.series[url]
+        for url, interval in watch_list.items():
+            watched = self.series.get(url)
+            if watched is None:
+                watched = self.series[url] = WatchedSeries(url, interval)
+                heapq.heappush(self._schedule, (watched.next_poll, url))
+            elif watched.interval != interval:
+                watched.interval = interval
+                watched.next_poll = min(watched.next_poll, time.time() + interval)
+                heapq.heappush(self._schedule, (watched.next_poll, url))
+        print(f"Watching {len(self.series)} series from {self.watch_file}")
+
+    def _poll(self, watched):
+        """Queue the episodes of a series that were not there on earlier polls"""
+        # Drop the page kept from the last poll, so it is revalidated with the server
+        self.scraper.pages.release(watched.url)
+        if watched.job is None:
+            # First poll: everything not already downloaded is new
+            job, pending = self.scraper.prepare_series(watched.url, output_dir_base=self.output_dir_base)
+            if job is None:
+                raise ValueError("Could not read the series page")
+            new = list(pending)
+            watched.job = job
+            # Episodes finished on earlier runs are already in the job's results
+            watched.numbers = {info['url']: index for index, info in job.results.items()}
+        else:
+            episodes = self.scraper.get_all_episodes(watched.url)
+            # New episodes are numbered after every episode seen so far, wherever the
+            # list shows them, so they never take the number of an earlier one
+            next_number = max(watched.numbers.values(), default=0) + 1
+            new = []
+            for episode in episodes:
+                if episode['url'] not in watched.numbers:
+                    new.append((next_number + len(new), episode))
+        for index, episode in new:
+            watched.numbers[episode['url']] = index
+            self.tasks.put((watched.job, index, episode))
+        watched.job.total = max(watched.numbers.values(), default=0)
+        watched.last_new = len(new)
+        if new:
+            print(f"{watched.job.title}: {len(new)} new episodes queued")
+
+    def _throughput(self, now):
+        """Episodes and bytes per hour over the last THROUGHPUT_WINDOW seconds"""
+        stats = self.pipeline.stats
+        self._samples.append((now, stats['downloads'], stats['bytes']))
+        while len(self._samples) > 1 and self._samples[1][0] <= now - THROUGHPUT_WINDOW:
+            self._samples.popleft()
+        start, downloads, size = self._samples[0]
+        hours = max(now - start, 1.0) / 3600
+        return {
+            'window_seconds': round(now - start),
+            'downloads_per_hour': round((stats['downloads'] - downloads) / hours, 1),
+            'bytes_per_second': round((stats['bytes'] - size) / (hours * 3600)),
+        }
+
+    def status(self):
+        """Queue depth, throughput and per-series poll state"""
+        # Also called from the status server's threads
+        with self._status_lock:
+            now = time.time()
+            return {
+                'updated': now,
+                'uptime_seconds': round(now - self.started),
+                'queued': self.tasks.qsize(),
+                'totals': dict(self.pipeline.stats),
+                'throughput': self._throughput(now),
+                'series': [watched.status() for watched in list(self.series.values())],
+            }
+
+    def write_status(self):
+        if not self.status_file:
+            return
+        try:
+            atomic_write_json(self.status_file, self.status())
+        except OSError as e:
+            print(f"Could not write status file {self.status_file}: {e}")
+
+    def flush_info_files(self):
+        """Write the episodes extracted since the last call to each series' info.nfo"""
+        for watched in list(self.series.values()):
+            if watched.job is None or watched.job.nfo is None:
+                continue
+            try:
+                watched.job.nfo.flush()
+            except Exception as e:
+                print(f"Error updating info file of {watched.job.title}: {e}")
+
+    def _tasks(self):
+        """Feed the pipeline from the task queue until the daemon stops"""
+        while True:
+            task = self.tasks.get()
+            if task is _STOP:
+                return
+            yield task
+
+    def _start_status_server(self):
+        server = ThreadingHTTPServer(('127.0.0.1', self.status_port), _status_handler(self))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Status on http://127.0.0.1:{server.server_address[1]}/")
+        return server
+
+    def _poll_due(self):
+        """Poll every series that is due and return the time of the next poll"""
+        while self._schedule and not self._stop.is_set():
+            due, url = self._schedule[0]
+            watched = self.series.get(url)
+            if watched is None or watched.next_poll != due:
+                # Removed from the watch list or rescheduled
+                heapq.heappop(self._schedule)
+                continue
+            if due > time.time():
+                return due
+            heapq.heappop(self._schedule)
+            try:
+                self._poll(watched)
+                watched.error = None
+            except Exception as e:
+                watched.error = str(e)
+                print(f"Error polling {url}: {e}")
+            finally:
+                # The page tree is not needed until the next poll
+                self.scraper.pages.release(url)
+            watched.last_poll = time.time()
+            watched.next_poll = watched.last_poll + watched.interval
+            heapq.heappush(self._schedule, (watched.next_poll, url))
+            self.write_status()
+        return None
+
+    def run(self):
+        """Poll the watch list until stopped by Ctrl+C or SIGTERM"""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+        self._reload_watch_list()
+        server = self._start_status_server() if self.status_port is not None else None
+        worker = threading.Thread(target=self.pipeline.run, args=(self._tasks(),), daemon=True)
+        worker.start()
+        try:
+            while not self._stop.is_set():
+                self._reload_watch_list()
+                next_poll = self._poll_due()
+                # The pipeline queues info.nfo updates in batches; nothing else ends a batch here
+                self.flush_info_files()
+                self.write_status()
+                wait = self.status_every if next_poll is None else min(next_poll - time.time(), self.status_every)
+                self._stop.wait(max(wait, 0))
+        except KeyboardInterrupt:
+            print("\nInterrupted")
+        finally:
+            print("Stopping: finishing the episodes in progress...")
+            # Queued episodes are dropped; the next start finds them again
+            while True:
+                try:
+                    self.tasks.get_nowait()
+                except queue.Empty:
+                    break
+            self.tasks.put(_STOP)
+            worker.join()
+            self.flush_info_files()
+            self.write_status()
+            if server is not None:
+                server.shutdown()
+        return self.pipeline.stats
@@ -0,0 +1,250 @@
+import collections
+import json
+import re
+from urllib.parse import urljoin, urlparse
+
+from extractors import extract_title
+
+EPISODE_SECTION_CLASS_RE = re.compile(r'episode|video|list|item')
+NAV_CLASS_RE = re.compile(r'nav|pagination|episode')
+NEXT_CLASS_RE = re.compile(r'next')
+NEXT_TEXT_RE = re.compile(r'^(næsta|next|sjá fleiri|fleiri|meira|›|»)', re.IGNORECASE)
+
+# Embedded JSON and API responses: lists of episodes, and links to the next batch
+EPISODE_LIST_KEY_RE = re.compile(r'episode', re.IGNORECASE)
+NEXT_KEY_RE = re.compile(r'^(next(page)?(url)?|episodes?(api|url))$', re.IGNORECASE)
+JSON_URL_KEYS = ('url', 'href', 'path', 'link', 'webUrl')
+JSON_ID_KEYS = ('id', 'slug')
+_JSON_SCRIPT_TYPES = ('application/ld+json', 'application/json')
+
+
+def is_json(content):
+    """Whether a response body is JSON rather than HTML"""
+    return content.lstrip()[:1] in (b'{', b'[')
+
+
+def _classes_match(tag, pattern):
+    return any(pattern.search(name) for name in tag.get('class') or ())
+
+
+def _context(tag, contexts):
+    """(in episode section, in navigation) for `tag`, remembered for every ancestor looked at"""
+    # Walk up to the nearest ancestor already looked at, then fill in the tags below it
+    chain = []
+    in_section = in_nav = False
+    while tag is not None and tag.name != '[document]':
+        context = contexts.get(id(tag))
+        if context is not None:
+            in_section, in_nav = context
+            break
+        chain.append(tag)
+        tag = tag.parent
+    for tag in reversed(chain):
+        if tag.name in ('div', 'section', 'ul') and _classes_match(tag, EPISODE_SECTION_CLASS_RE):
+            in_section = True
+        if tag.name in ('nav', 'div') and _classes_match(tag, NAV_CLASS_RE):
+            in_nav = True
+        contexts[id(tag)] = (in_section, in_nav)
+    return in_section, in_nav
+
+
+def same_site(url, series_url):
+    """Whether `url` is on the host of the series page, so discovery may follow it"""
+    return urlparse(url).netloc == urlparse(series_url).netloc
+
+
+def _id_template(ids, known_urls, series_url):
+    """URL prefix that turns an episode id into its page URL"""
+    ids = set(ids)
+    for url in known_urls:
+        prefix, _, last = url.rstrip('/').rpartition('/')
+        if last in ids:
+            return prefix + '/'
+    # Otherwise assume the episodes sit next to those already found
+    for url in known_urls:
+        return url.rstrip('/').rpartition('/')[0] + '/'
+    return series_url.rstrip('/') + '/'
+
+
+def _json_episodes(items, series_url, base_url, known_urls):
+    entries = []
+    for item in items:
+        title = item.get('title') or item.get('name')
+        if not isinstance(title, str) or not title.strip():
+            continue
+        url = next((item[key] for key in JSON_URL_KEYS if isinstance(item.get(key), str) and item[key]), None)
+        episode_id = next((str(item[key]) for key in JSON_ID_KEYS
+                           if isinstance(item.get(key), (str, int)) and str(item[key])), None)
+        if url or episode_id:
+            entries.append((title.strip(), url, episode_id))
+
+    template = None
+    episodes = []
+    for title, url, episode_id in entries:
+        if url:
+            url = urljoin(base_url, url)
+        else:
+            if template is None:
+                template = _id_template([entry[2] for entry in entries if entry[2]], known_urls, series_url)
+            url = template + episode_id
+        if '/spila/' in url:
+            episodes.append({'url': url, 'title': title})
+    return episodes
+
+
+def scan_listing_json(data, series_url, base_url, known_urls=()):
+    """Return the (episodes, next_urls) in an embedded JSON blob or an API response.
+
+    Episodes are read from lists under keys such as `episodes`, by URL or by
+    id; keys such as `nextPage` or `episodesUrl` give more pages to fetch.
+    """
+    episodes = []
+    next_urls = []
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        children = []
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if isinstance(value, str):
+                    if NEXT_KEY_RE.match(key) and value.startswith(('http', '/')):
+                        next_urls.append(urljoin(base_url, value))
+                elif (isinstance(value, list) and value and EPISODE_LIST_KEY_RE.search(key)
+                      and all(isinstance(item, dict) for item in value)):
+                    episodes.extend(_json_episodes(value, series_url, base_url, known_urls))
+                elif isinstance(value, (dict, list)):
+                    children.append(value)
+        elif isinstance(node, list):
+            children = [item for item in node if isinstance(item, (dict, list))]
+        stack.extend(reversed(children))
+    return episodes, next_urls
+
+
+def scan_listing_html(soup, page_url, series_url, base_url, known_urls=()):
+    """Return the (episodes, next_urls) on an episode list page in one pass over the tree.
+
+    Episode links are taken from episode sections, then links carrying the
+    series id, then navigation, as before; episode lists in embedded JSON are
+    added after them. `rel=next` and pagination links give more pages to fetch.
+    """
+    series_id = series_url.rstrip('/').split('/')[-1]
+    section_links, id_links, nav_links = [], [], []
+    next_urls = []
+    blobs = []
+    contexts = {}
+
+    for tag in soup.find_all(['a', 'link', 'script']):
+        if tag.name == 'script':
+            if tag.get('type') in _JSON_SCRIPT_TYPES and tag.string:
+                try:
+                    blobs.append(json.loads(tag.string))
+                except ValueError:
+                    pass
+            continue
+
+        href = tag.get('href')
+        if not href:
+            continue
+        if 'next' in (tag.get('rel') or ()):
+            next_urls.append(urljoin(page_url, href))
+            continue
+        if tag.name != 'a':
+            continue
+
+        in_section, in_nav = _context(tag.parent, contexts)
+
+        title = tag.get_text(strip=True)
+        if in_nav and (_classes_match(tag, NEXT_CLASS_RE) or NEXT_TEXT_RE.match(title)):
+            next_urls.append(urljoin(page_url, href))
+            continue
+        if not title:
+            continue
+        episode = {'url': urljoin(base_url, href), 'title': title}
+        if '/spila/' in href:
+            if in_section:
+                section_links.append(episode)
+            if in_nav:
+                nav_links.append(episode)
+        if series_id and series_id in href:
+            id_links.append(episode)
+
+    episodes = section_links or id_links or nav_links
+    known = list(known_urls) + [episode['url'] for episode in episodes]
+    for blob in blobs:
+        found, more = scan_listing_json(blob, series_url, base_url, known)
+        episodes = episodes + found
+        next_urls.extend(more)
+
+    unique_episodes = []
+    seen_urls = set()
+    for episode in episodes:
+        if episode['url'] not in seen_urls:
+            unique_episodes.append(episode)
+            seen_urls.add(episode['url'])
+    return unique_episodes, next_urls
+
+
+class EpisodeDiscovery:
+    """Finds every episode of a series and yields them as they are found.
+
+    The series page is scanned first, then every further page it points to:
+    pagination links and episode list APIs named in embedded JSON, on the
+    same host, up to `max_pages` pages. A series page without any episode
+    links is treated as a single episode.
+    """
+
+    def __init__(self, pages, base_url, max_pages=100):
+        self.pages = pages
+        self.base_url = base_url
+        self.max_pages = max_pages
+
+    def _scan(self, url, series_url, known_urls):
+        page = self.pages.get(url)
+        if is_json(page.content):
+            try:
+                data = json.loads(page.content)
+            except ValueError as e:
+                print(f"Could not read episode list from {url}: {e}")
+                return [], [], None
+            return scan_listing_json(data, series_url, self.base_url, known_urls) + (None,)
+        episodes, next_urls = scan_listing_html(page.soup, url, series_url, self.base_url, known_urls)
+        title = extract_title(page.soup) if url == series_url and not episodes else None
+        return episodes, next_urls, title
+
+    def episodes(self, series_url):
+        """Yield {'url', 'title'} for each episode of the series, without duplicates"""
+        seen = set()
+        visited = set()
+        queue = collections.deque([series_url])
+        single_title = None
+        while queue and len(visited) < self.max_pages:
+            url = queue.popleft()
+            if url in visited:
+                continue
+            visited.add(url)
+            try:
+                episodes, next_urls, title = self._scan(url, series_url, seen)
+            except Exception as e:
+                print(f"Error reading episode list page {url}: {e}")
+                continue
+            if url == series_url:
+                single_title = title
+
+            # A list page that is also an episode is released by the extractor instead,
+            # and a series page without episodes may turn out to be the only one
+            if not any(episode['url'] == url for episode in episodes) and not title:
+                self.pages.release(url)
+
+            # Links to other hosts are never followed
+            queue.extend(next_url for next_url in next_urls
+                         if next_url not in visited and same_site(next_url, series_url))
+            for episode in episodes:
+                if episode['url'] not in seen:
+                    seen.add(episode['url'])
+                    yield episode
+
+        # No episode links anywhere, so the page itself is the only episode
+        if not seen and single_title:
+            yield {'url': series_url, 'title': single_title}
+        elif single_title:
+            self.pages.release(series_url)
@@ -0,0 +1,115 @@
+import importlib.util
+import os
+import subprocess
+import threading
+
+# Options shared by both backends, matching the original command line:
+# --format best --merge-output-format mkv --no-check-certificates --geo-bypass
+YTDLP_OPTIONS = {
+    'format': 'best',
+    'merge_output_format': 'mkv',
+    'nocheckcertificate': True,
+    'geo_bypass': True,
+}
+
+
+class DownloadError(Exception):
+    pass
+
+
+class SubprocessBackend:
+    """Runs one `yt-dlp` process per episode"""
+
+    name = 'subprocess'
+
+    def __init__(self, bandwidth=None):
+        self.bandwidth = bandwidth
+
+    def download(self, url, output_file):
+        """Download `url` to `output_file` and return the final file path"""
+        cmd = [
+            'yt-dlp',
+            '--output', output_file,
+            '--format', YTDLP_OPTIONS['format'],
+            '--merge-output-format', YTDLP_OPTIONS['merge_output_format'],
+            '--no-check-certificates',
+            '--geo-bypass',
+            # Report where the finished file ended up, after merging and remuxing
+            '--print', 'after_move:filepath',
+        ]
+        if self.bandwidth:
+            # A separate process cannot share the limiter, so give it its share of the cap
+            cmd += ['--limit-rate', str(self.bandwidth.fair_share())]
+        cmd.append(url)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise DownloadError(result.stderr)
+
+        printed = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+        if printed and os.path.isfile(printed[-1]):
+            return printed[-1]
+
+        # Older yt-dlp versions do not print the file name, so find the largest matching file
+        output_dir = os.path.dirname(output_file) or '.'
+        prefix = os.path.splitext(os.path.basename(output_file))[0]
+        actual_files = [
+            os.path.join(output_dir, file) for file in os.listdir(output_dir)
+            if file.startswith(prefix) and file.endswith('.mkv')
+        ]
+        if actual_files:
+            return max(actual_files, key=os.path.getsize)
+        return output_file
+
+
+class YtDlpApiBackend:
+    """Downloads in-process through `yt_dlp.YoutubeDL`.
+
+    Each worker thread keeps one YoutubeDL instance and reuses it for every
+    episode, so extractors are loaded once instead of once per episode.
+    """
+
+    name = 'api'
+
+    def __init__(self, progress_hooks=None):
+        # Imported here, as yt-dlp takes longer to load than the rest of the scraper together
+        try:
+            import yt_dlp
+        except ImportError:
+            raise RuntimeError("The yt-dlp Python package is not installed")
+        self.yt_dlp = yt_dlp
+        self.progress_hooks = list(progress_hooks or [])
+        self._local = threading.local()
+
+    def _ydl(self):
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            options = dict(YTDLP_OPTIONS, quiet=True, no_warnings=True, noprogress=True,
+                           progress_hooks=self.progress_hooks)
+            ydl = self.yt_dlp.YoutubeDL(options)
+            self._local.ydl = ydl
+        return ydl
+
+    def download(self, url, output_file):
+        """Download `url` to `output_file` and return the final file path"""
+        ydl = self._ydl()
+        ydl.params['outtmpl'] = {'default': output_file}
+        try:
+            info = ydl.extract_info(url, download=True)
+        except self.yt_dlp.utils.DownloadError as e:
+            raise DownloadError(str(e))
+        info = info or {}
+        for download in info.get('requested_downloads') or []:
+            if download.get('filepath'):
+                return download['filepath']
+        return info.get('filepath') or output_file
+
+
+def create_backend(name=None, progress_hooks=None, bandwidth=None):
+    """Create a download backend by name, preferring the in-process API"""
+    if name is None:
+        name = 'api' if importlib.util.find_spec('yt_dlp') is not None else 'subprocess'
+    if name == 'api':
+        return YtDlpApiBackend(progress_hooks)
+    if name == 'subprocess':
+        return SubprocessBackend(bandwidth)
+    raise ValueError(f"Unknown download backend: {name}")
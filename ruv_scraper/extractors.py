@@ -0,0 +1,234 @@
+import json
+import re
+from urllib.parse import urljoin
+
+# Candidate priorities, lower is better: explicit videoUrl, then HLS, then
+# other stream keys, then MP4 files
+PRIORITY_VIDEO_URL = 0
+PRIORITY_HLS = 1
+PRIORITY_STREAM = 2
+PRIORITY_MP4 = 3
+
+# Script patterns in priority order, each with a substring that must be present
+# for it to match. The cheap `in` test skips most scripts without running the
+# regex, and the first pattern that matches anywhere is the best candidate.
+SCRIPT_PATTERNS = [
+    (PRIORITY_VIDEO_URL, '"videoUrl"', re.compile(r'"videoUrl"\s*:\s*"([^"]+)"')),
+    (PRIORITY_HLS, '.m3u8', re.compile(r'https?://[^\s"<>]+\.m3u8[^\s"<>]*')),
+    (PRIORITY_HLS, 'ruv-vod.akamaized.net', re.compile(r'https?://ruv-vod\.akamaized\.net/[^\s"<>]+')),
+    (PRIORITY_STREAM, '"streamUrl"', re.compile(r'"streamUrl"\s*:\s*"([^"]+)"')),
+    (PRIORITY_STREAM, '"mediaUrl"', re.compile(r'"mediaUrl"\s*:\s*"([^"]+)"')),
+    (PRIORITY_MP4, '.mp4', re.compile(r'"src"\s*:\s*"([^"]+\.mp4[^"]*)"')),
+    (PRIORITY_MP4, '.mp4', re.compile(r'"url"\s*:\s*"([^"]+\.mp4[^"]*)"')),
+    (PRIORITY_MP4, '.mp4', re.compile(r'https?://[^\s"<>]+\.mp4[^\s"<>]*')),
+]
+
+# Keys inside JSON-LD and __NEXT_DATA__ blobs that may hold the stream URL
+_JSON_KEY_PRIORITY = {
+    'videoUrl': PRIORITY_VIDEO_URL,
+    'contentUrl': PRIORITY_VIDEO_URL,
+    'streamUrl': PRIORITY_STREAM,
+    'mediaUrl': PRIORITY_STREAM,
+    'embedUrl': PRIORITY_STREAM,
+    'src': PRIORITY_MP4,
+    'url': PRIORITY_MP4,
+}
+
+_JSON_SCRIPT_TYPES = ('application/ld+json', 'application/json')
+
+# A JSON blob without any of these cannot hold a candidate, so it is not parsed
+_JSON_MARKERS = ('"videoUrl"', '"contentUrl"', '"streamUrl"', '"mediaUrl"', '"embedUrl"',
+                 '.m3u8', 'ruv-vod.akamaized.net', '.mp4')
+
+TITLE_CLASS_RE = re.compile(r'title|heading')
+
+# ISO 8601 durations as used by schema.org VideoObject, e.g. PT1H2M3S
+DURATION_RE = re.compile(r'"duration"\s*:\s*"(P[0-9DTHMS.]+)"')
+_ISO_DURATION_RE = re.compile(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?$')
+
+
+def _url_priority(url):
+    """Priority of a URL judged by its form alone"""
+    if '.m3u8' in url or 'ruv-vod.akamaized.net' in url:
+        return PRIORITY_HLS
+    if '.mp4' in url:
+        return PRIORITY_MP4
+    return None
+
+
+def scan_scripts(texts, best=None):
+    """Return the best (priority, url) candidate in the script texts, improving on `best`"""
+    for priority, marker, pattern in SCRIPT_PATTERNS:
+        if best is not None and best[0] <= priority:
+            break
+        for text in texts:
+            if marker in text:
+                match = pattern.search(text)
+                if match:
+                    return (priority, match.group(match.lastindex or 0))
+    return best
+
+
+def scan_json(data, best=None):
+    """Walk a parsed JSON blob for stream URLs and return the best candidate"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if isinstance(value, str):
+                    priority = _JSON_KEY_PRIORITY.get(key)
+                    if priority is None or not value.startswith('http'):
+                        continue
+                    form = _url_priority(value)
+                    # Generic keys such as `url` only count when the value looks like media
+                    if priority == PRIORITY_MP4 and form is None:
+                        continue
+                    if form is not None and priority > PRIORITY_VIDEO_URL:
+                        priority = min(priority, form)
+                    if best is None or priority < best[0]:
+                        best = (priority, value)
+                        if priority == PRIORITY_VIDEO_URL:
+                            return best
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return best
+
+
+def find_video_url(soup):
+    """Find the stream URL in the page scripts, ranking every candidate by priority.
+
+    JSON-LD and __NEXT_DATA__ style blobs are parsed and walked directly;
+    other scripts are searched with the precompiled patterns.
+    """
+    best = None
+    texts = []
+    for script in soup.find_all('script'):
+        text = script.string
+        if not text:
+            continue
+        if script.get('type') in _JSON_SCRIPT_TYPES:
+            if not any(marker in text for marker in _JSON_MARKERS):
+                continue
+            try:
+                best = scan_json(json.loads(text), best)
+            except ValueError:
+                texts.append(text)
+                continue
+            if best is not None and best[0] == PRIORITY_VIDEO_URL:
+                # Nothing later on the page can rank higher
+                return best[1]
+            continue
+        texts.append(text)
+    best = scan_scripts(texts, best)
+    return best[1] if best else None
+
+
+def parse_duration(text):
+    """Seconds in an ISO 8601 duration such as `PT11M33S`, or None"""
+    match = _ISO_DURATION_RE.match(text or '')
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return int(days or 0) * 86400 + int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds or 0)
+
+
+def find_duration(soup):
+    """The episode duration from the page's JSON-LD, as the ISO 8601 text"""
+    for script in soup.find_all('script', type='application/ld+json'):
+        match = DURATION_RE.search(script.string or '')
+        if match:
+            return match.group(1)
+    return ''
+
+
+def extract_title(soup):
+    """Extract the episode title - try multiple methods"""
+    # Method 1: Look for h1 tag
+    h1_elem = soup.find('h1')
+    if h1_elem:
+        title = h1_elem.get_text(strip=True)
+        if title:
+            return title
+
+    # Method 2: Look for title tag
+    title_elem = soup.find('title')
+    if title_elem:
+        title = title_elem.get_text(strip=True)
+        # Clean up title (remove site name if present)
+        if ' - RÚV' in title:
+            title = title.replace(' - RÚV', '')
+        if title:
+            return title
+
+    # Method 3: Look for specific RÚV title elements
+    title_elem = soup.find(['h2', 'h3'], class_=TITLE_CLASS_RE)
+    if title_elem:
+        title = title_elem.get_text(strip=True)
+        if title:
+            return title
+
+    return "Unknown Title"
+
+
+def extract_video_info(soup, episode_url, base_url):
+    """Build the video info dict for a parsed episode page"""
+    video_info = {
+        'title': extract_title(soup),
+        'url': episode_url,
+        'video_url': None,
+        'description': '',
+        'duration': '',
+        'air_date': ''
+    }
+
+    # Extract description
+    desc_elem = soup.find('meta', {'name': 'description'})
+    if desc_elem:
+        video_info['description'] = desc_elem.get('content', '')
+
+    # Running time, which the post-download check compares the file against
+    video_info['duration'] = find_duration(soup)
+
+    # Look for video player data in JavaScript and embedded JSON
+    video_info['video_url'] = find_video_url(soup)
+
+    # If no video URL found in scripts, try other methods
+    if not video_info['video_url']:
+        # Look for video tags
+        for video in soup.find_all('video'):
+            src = video.get('src')
+            if src:
+                video_info['video_url'] = urljoin(base_url, src)
+                break
+
+        # Look for source tags
+        if not video_info['video_url']:
+            for source in soup.find_all('source'):
+                src = source.get('src')
+                if src:
+                    video_info['video_url'] = urljoin(base_url, src)
+                    break
+
+        # Look for iframe players
+        if not video_info['video_url']:
+            for iframe in soup.find_all('iframe'):
+                src = iframe.get('src')
+                if src and ('player' in src or 'video' in src):
+                    video_info['video_url'] = src
+                    break
+
+    return video_info
+
+
+def extract_series_title(soup):
+    """Extract the series title from the main series page"""
+    title_element = soup.find('h1')
+    if title_element:
+        return title_element.get_text(strip=True)
+    title_element = soup.find('h2')
+    if title_element:
+        return title_element.get_text(strip=True)
+    return None
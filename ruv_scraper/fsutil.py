@@ -0,0 +1,41 @@
+import contextlib
+import json
+import os
+import threading
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode='wb', encoding=None):
+    """Open a temporary file that atomically replaces `path` when the block succeeds"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # Unique per thread, and created with the normal umask unlike mkstemp files
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write(path, data):
+    """Write bytes to `path` through a temporary file and an atomic rename"""
+    with atomic_open(path) as f:
+        f.write(data)
+
+
+def atomic_write_json(path, obj):
+    """Serialize `obj` as JSON and write it atomically"""
+    atomic_write(path, json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def read_json(path, default=None):
+    """Load a JSON file, returning `default` when it is missing or unreadable"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
@@ -0,0 +1,248 @@
+import collections
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+from fsutil import atomic_write_json, read_json
+from transport import PoliteSession
+
+_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class HLSError(Exception):
+    pass
+
+
+class HLSUnsupported(HLSError):
+    """The stream uses features the native downloader does not handle"""
+
+
+def is_hls_url(url):
+    """True for URLs the native HLS downloader should try"""
+    if not url:
+        return False
+    parsed = urlparse(url)
+    return parsed.path.endswith('.m3u8') or parsed.netloc == 'ruv-vod.akamaized.net'
+
+
+def _parse_attributes(text):
+    return {key: value.strip('"') for key, value in _ATTRIBUTE_RE.findall(text)}
+
+
+def parse_playlist(text, base_url):
+    """Parse an M3U8 playlist.
+
+    Returns ('master', variants) where each variant has `uri`, `bandwidth`,
+    `average_bandwidth` and `resolution`, or ('media', segments) where each segment has `uri` and
+    `duration`.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or lines[0] != '#EXTM3U':
+        raise HLSUnsupported("Not an M3U8 playlist")
+
+    variants = []
+    segments = []
+    pending_variant = None
+    duration = 0.0
+    for line in lines[1:]:
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            attributes = _parse_attributes(line.split(':', 1)[1])
+            width, _, height = attributes.get('RESOLUTION', '0x0').partition('x')
+            pending_variant = {
+                'bandwidth': int(attributes.get('BANDWIDTH', 0) or 0),
+                'average_bandwidth': int(attributes.get('AVERAGE-BANDWIDTH', 0) or 0),
+                'resolution': (int(width or 0), int(height or 0)),
+            }
+        elif line.startswith('#EXT-X-KEY:'):
+            method = _parse_attributes(line.split(':', 1)[1]).get('METHOD', 'NONE')
+            if method != 'NONE':
+                raise HLSUnsupported(f"Encrypted stream ({method})")
+        elif line.startswith('#EXT-X-MAP:'):
+            raise HLSUnsupported("Fragmented MP4 streams are not supported")
+        elif line.startswith('#EXTINF:'):
+            duration = float(line.split(':', 1)[1].split(',', 1)[0] or 0)
+        elif line.startswith('#'):
+            continue
+        elif pending_variant is not None:
+            pending_variant['uri'] = urljoin(base_url, line)
+            variants.append(pending_variant)
+            pending_variant = None
+        else:
+            segments.append({'uri': urljoin(base_url, line), 'duration': duration})
+            duration = 0.0
+
+    if variants:
+        return 'master', variants
+    return 'media', segments
+
+
+def choose_variant(variants, max_height=None):
+    """Pick the highest bandwidth variant, optionally capped at `max_height` lines"""
+    candidates = variants
+    if max_height:
+        candidates = [v for v in variants if v['resolution'][1] <= max_height] or \
+            [min(variants, key=lambda v: v['resolution'][1])]
+    return max(candidates, key=lambda v: (v['bandwidth'], v['resolution'][1]))
+
+
+def fetch_playlist(session, url):
+    """Fetch and parse the playlist at `url`"""
+    response = session.get(url)
+    response.raise_for_status()
+    return parse_playlist(response.text, url)
+
+
+def estimate_hls_size(fetch, playlist_url, max_height=None, duration=None):
+    """Expected size in bytes of the variant that would be downloaded, or None if unknown.
+
+    The variant's average (or peak) bandwidth times the running time, taken
+    from `duration` seconds when the page gives it and from the variant's media
+    playlist otherwise. `fetch(url)` returns a parsed playlist. Streams without
+    a master playlist carry no bandwidth to go by.
+    """
+    kind, variants = fetch(playlist_url)
+    if kind != 'master':
+        return None
+    variant = choose_variant(variants, max_height)
+    if not duration:
+        kind, segments = fetch(variant['uri'])
+        if kind != 'media':
+            return None
+        duration = sum(segment['duration'] for segment in segments)
+    return int((variant['average_bandwidth'] or variant['bandwidth']) * duration / 8) or None
+
+
+class HLSDownloader:
+    """Downloads HLS streams by fetching segments in parallel.
+
+    Segments are fetched by `segment_jobs` workers over one pooled session and
+    appended to the output file strictly in order. At most `buffer_segments`
+    segments are in flight or waiting to be written, which bounds memory.
+    Progress is recorded in a sidecar file so an interrupted download resumes
+    after the last segment written. Playlists fetched by `playlist()`, e.g. to
+    estimate a download's size, are kept for `playlist_ttl` seconds and used
+    by the download instead of fetching them again.
+    """
+
+    # Playlists kept between the size estimate and the download
+    MAX_PLAYLISTS = 64
+
+    def __init__(self, headers=None, segment_jobs=8, buffer_segments=None, max_height=None, retries=3,
+                 bandwidth=None, playlist_ttl=600):
+        self.segment_jobs = max(1, segment_jobs)
+        self.buffer_segments = buffer_segments or self.segment_jobs * 2
+        self.max_height = max_height
+        self.bandwidth = bandwidth
+        self.playlist_ttl = playlist_ttl
+        self._playlists = collections.OrderedDict()
+        self._playlists_lock = threading.Lock()
+        # Segments come from a CDN, so retries and backoff but no per-host rate limit
+        self.session = PoliteSession(max_retries=retries)
+        if headers:
+            self.session.headers.update(headers)
+        self.session.configure_pool(self.segment_jobs)
+
+    def _get(self, url):
+        response = self.session.get(url)
+        response.raise_for_status()
+        if self.bandwidth:
+            self.bandwidth.consume(len(response.content))
+        return response.content
+
+    def playlist(self, url):
+        """Fetch and parse the playlist at `url`, keeping it for the download"""
+        with self._playlists_lock:
+            cached = self._playlists.get(url)
+        if cached is not None and time.monotonic() - cached[0] < self.playlist_ttl:
+            return cached[1]
+        text = self._get(url).decode('utf-8', errors='replace')
+        parsed = parse_playlist(text, url)
+        with self._playlists_lock:
+            self._playlists[url] = (time.monotonic(), parsed)
+            self._playlists.move_to_end(url)
+            while len(self._playlists) > self.MAX_PLAYLISTS:
+                self._playlists.popitem(last=False)
+        return parsed
+
+    def _take_playlist(self, url):
+        """The playlist at `url`, from the ones kept by `playlist()` if it is still fresh"""
+        parsed = self.playlist(url)
+        with self._playlists_lock:
+            self._playlists.pop(url, None)
+        return parsed
+
+    def resolve_segments(self, playlist_url):
+        """Return the media playlist URL and its segments, choosing a variant if needed"""
+        kind, entries = self._take_playlist(playlist_url)
+        if kind == 'master':
+            variant = choose_variant(entries, self.max_height)
+            playlist_url = variant['uri']
+            kind, entries = self._take_playlist(playlist_url)
+            if kind != 'media':
+                raise HLSUnsupported("Nested master playlists are not supported")
+        if not entries:
+            raise HLSError("Playlist has no segments")
+        return playlist_url, entries
+
+    def download(self, playlist_url, output_file):
+        """Download the stream at `playlist_url` and return the final file path"""
+        media_url, segments = self.resolve_segments(playlist_url)
+
+        base, _ = os.path.splitext(output_file)
+        part_file = base + '.ts.part'
+        state_file = base + '.hls.json'
+
+        state = read_json(state_file, {})
+        if state.get('playlist') != media_url or state.get('segments') != len(segments) \
+                or not os.path.exists(part_file):
+            state = {'playlist': media_url, 'segments': len(segments), 'completed': 0, 'bytes': 0}
+
+        with open(part_file, 'ab') as out:
+            # Drop anything written after the last recorded segment
+            out.truncate(state['bytes'])
+            out.seek(state['bytes'])
+            self._fetch_segments(segments, state, out, state_file)
+
+        os.remove(state_file)
+        return self._finalize(part_file, base, output_file)
+
+    def _fetch_segments(self, segments, state, out, state_file):
+        pending = collections.deque()
+        next_index = state['completed']
+        with ThreadPoolExecutor(max_workers=self.segment_jobs) as executor:
+            try:
+                while next_index < len(segments) or pending:
+                    while next_index < len(segments) and len(pending) < self.buffer_segments:
+                        pending.append(executor.submit(self._get, segments[next_index]['uri']))
+                        next_index += 1
+                    data = pending.popleft().result()
+                    out.write(data)
+                    out.flush()
+                    state['completed'] += 1
+                    state['bytes'] += len(data)
+                    atomic_write_json(state_file, state)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+    def _finalize(self, part_file, base, output_file):
+        """Remux the transport stream into the requested container when ffmpeg is available"""
+        if output_file.endswith('.mkv') and shutil.which('ffmpeg'):
+            result = subprocess.run(
+                ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'mpegts', '-i', part_file,
+                 '-map', '0', '-c', 'copy', output_file],
+                capture_output=True, text=True
+            )
+            if result.returncode == 0:
+                os.remove(part_file)
+                return output_file
+            print(f"ffmpeg remux failed, keeping the transport stream: {result.stderr.strip()}")
+        ts_file = base + '.ts'
+        os.replace(part_file, ts_file)
+        return ts_file
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+import time
+
+from fsutil import atomic_write, atomic_write_json, read_json
+
+
+class HTTPCache:
+    """On-disk page cache that revalidates with ETag / Last-Modified.
+
+    Entries younger than `ttl` seconds are served without any request. Older
+    entries are revalidated with If-None-Match / If-Modified-Since and the
+    cached body is reused on a 304. The least recently used bodies are evicted
+    once the cache grows past `max_bytes`. The index is kept in memory and
+    written at most every `save_interval` seconds and on close, not per request.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir, ttl=0, max_bytes=200 * 1024 * 1024, save_interval=60):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        self._index = read_json(self._index_path, {})
+        self._size = sum(entry.get('size', 0) for entry in self._index.values())
+        self._dirty = False
+        self._saved_at = time.time()
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key + '.body')
+
+    def _read_body(self, key):
+        try:
+            with open(self._body_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _save_index(self):
+        atomic_write_json(self._index_path, self._index)
+        self._dirty = False
+        self._saved_at = time.time()
+
+    def _changed(self, now):
+        """Mark the index dirty and write it if the last save is old enough (lock held)"""
+        self._dirty = True
+        if now - self._saved_at >= self.save_interval:
+            self._save_index()
+
+    def get(self, session, url):
+        """Return the body of `url`, using the cache where possible"""
+        key = self._key(url)
+        with self._lock:
+            entry = dict(self._index.get(key) or {})
+        body = self._read_body(key) if entry else None
+        now = time.time()
+
+        if body is not None and now - entry.get('stored_at', 0) < self.ttl:
+            with self._lock:
+                self.hits += 1
+                if key in self._index:
+                    self._index[key]['last_used'] = now
+                    self._changed(now)
+            return body
+
+        headers = {}
+        if body is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = session.get(url, headers=headers)
+        if response.status_code == 304 and body is not None:
+            with self._lock:
+                self.revalidated += 1
+                if key in self._index:
+                    self._index[key].update(stored_at=now, last_used=now)
+                    self._changed(now)
+            return body
+
+        response.raise_for_status()
+        body = response.content
+        atomic_write(self._body_path(key), body)
+        with self._lock:
+            self.misses += 1
+            self._size -= (self._index.get(key) or {}).get('size', 0)
+            self._size += len(body)
+            self._index[key] = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'stored_at': now,
+                'last_used': now,
+                'size': len(body),
+            }
+            self._evict()
+            self._changed(now)
+        return body
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in `max_bytes`"""
+        if self._size <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1].get('last_used', 0)):
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            self._size -= entry.get('size', 0)
+            del self._index[key]
+
+    def close(self):
+        """Write the index if anything changed since the last save"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
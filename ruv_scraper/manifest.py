@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+
+from fsutil import atomic_write_json, read_json
+
+
+class SeriesManifest:
+    """Per-series record of finished episodes, stored next to info.nfo.
+
+    Each entry is keyed on the episode page URL and remembers the extracted
+    metadata, the output file with its size, checksum state and verification
+    result, and when the download completed. Re-runs use it to skip finished episodes before any
+    request is made.
+    """
+
+    FILE_NAME = 'manifest.json'
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, self.FILE_NAME)
+        self._lock = threading.Lock()
+        data = read_json(self.path, {})
+        self.episodes = data.get('episodes', {})
+
+    def get(self, episode_url):
+        with self._lock:
+            return self.episodes.get(episode_url)
+
+    def is_complete(self, episode_url):
+        """True if the episode was downloaded and its file is still intact"""
+        entry = self.get(episode_url)
+        if not entry:
+            return False
+        path = os.path.join(self.output_dir, entry['output_file'])
+        try:
+            return os.path.getsize(path) == entry['size']
+        except OSError:
+            return False
+
+    def is_unverified(self, episode_url):
+        """True if the episode was recorded without being probed, e.g. because ffprobe was missing"""
+        entry = self.get(episode_url)
+        return bool(entry) and (entry.get('verification') or {}).get('state', 'unverified') == 'unverified'
+
+    def record(self, video_info, output_file, checksum=None, verification=None):
+        """Mark an episode as finished and persist the manifest"""
+        entry = {
+            'url': video_info['url'],
+            'video_url': video_info.get('video_url'),
+            'metadata': video_info,
+            'output_file': os.path.basename(output_file),
+            'size': os.path.getsize(output_file),
+            'checksum': checksum,
+            # Nothing has compared the file against the checksum yet, only stored it
+            'checksum_state': 'recorded' if checksum else 'unverified',
+            'verification': verification,
+            'completed_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        }
+        with self._lock:
+            self.episodes[video_info['url']] = entry
+            self._save()
+        return entry
+
+    def _save(self):
+        atomic_write_json(self.path, {'episodes': self.episodes})
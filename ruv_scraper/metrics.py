@@ -0,0 +1,119 @@
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+from fsutil import atomic_open
+
+# Stages timed for every episode, in the order they happen
+STAGES = ('fetch', 'parse', 'extract', 'download', 'verify', 'nfo')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values`"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def timed(metrics, stage, url=None):
+    """Time a block as `stage` when metrics are enabled, otherwise do nothing"""
+    if metrics is None:
+        return contextlib.nullcontext()
+    return metrics.time(stage, url)
+
+
+class Metrics:
+    """Per-episode stage timings and run counters.
+
+    Every timed stage is written to `path` as one JSON line as soon as it
+    finishes, followed by a summary line when the run is closed. A path ending
+    in `.prom` gets a Prometheus text file with the summary instead, suitable
+    for the node_exporter textfile collector.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.prometheus = path.endswith('.prom')
+        self.samples = collections.defaultdict(list)
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = None if self.prometheus else open(path, 'w', encoding='utf-8')
+
+    @contextlib.contextmanager
+    def time(self, stage, url=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, url)
+
+    def record(self, stage, seconds, url=None):
+        """Add one timing of `stage`, e.g. for work timed elsewhere"""
+        with self._lock:
+            self.samples[stage].append(seconds)
+            if self._file is not None:
+                event = {'type': 'stage', 'time': time.time(), 'stage': stage, 'url': url, 'seconds': seconds}
+                self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+                self._file.flush()
+
+    def count(self, **increments):
+        with self._lock:
+            self.counters.update(increments)
+
+    def summary(self):
+        """Count, total and p50/p99/max seconds per stage, with the counters"""
+        with self._lock:
+            stages = {}
+            order = [name for name in STAGES if name in self.samples]
+            order += sorted(name for name in self.samples if name not in STAGES)
+            for stage in order:
+                samples = self.samples[stage]
+                stages[stage] = {
+                    'count': len(samples),
+                    'total': sum(samples),
+                    'p50': percentile(samples, 50),
+                    'p99': percentile(samples, 99),
+                    'max': max(samples),
+                }
+            return {'stages': stages, 'counters': dict(self.counters)}
+
+    def _write_prometheus(self, summary):
+        with atomic_open(self.path, 'w', encoding='utf-8') as f:
+            f.write("# HELP ruv_scraper_stage_seconds Time spent per episode in each stage.\n")
+            f.write("# TYPE ruv_scraper_stage_seconds summary\n")
+            for stage, stats in summary['stages'].items():
+                for quantile, key in (('0.5', 'p50'), ('0.99', 'p99')):
+                    f.write(f'ruv_scraper_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}\n')
+                f.write(f'ruv_scraper_stage_seconds_sum{{stage="{stage}"}} {stats["total"]}\n')
+                f.write(f'ruv_scraper_stage_seconds_count{{stage="{stage}"}} {stats["count"]}\n')
+            for name, value in sorted(summary['counters'].items()):
+                metric = f"ruv_scraper_{name}_total"
+                f.write(f"# TYPE {metric} counter\n")
+                f.write(f"{metric} {value}\n")
+
+    def close(self, **counters):
+        """Add the final counters, write the summary and print it"""
+        self.count(**counters)
+        summary = self.summary()
+        if self.prometheus:
+            self._write_prometheus(summary)
+        else:
+            with self._lock:
+                self._file.write(json.dumps(dict(summary, type='summary', time=time.time()), ensure_ascii=False) + '\n')
+                self._file.close()
+                self._file = None
+
+        print("\n" + "=" * 60)
+        print("METRICS")
+        print("=" * 60)
+        print(f"{'Stage':<10} {'Count':>7} {'Total s':>9} {'p50 ms':>9} {'p99 ms':>9} {'Max ms':>9}")
+        for stage, stats in summary['stages'].items():
+            print(f"{stage:<10} {stats['count']:>7} {stats['total']:>9.2f} {stats['p50'] * 1000:>9.1f} "
+                  f"{stats['p99'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f}")
+        for name, value in sorted(summary['counters'].items()):
+            print(f"{name + ':':<20} {value:.1f}" if isinstance(value, float) else f"{name + ':':<20} {value}")
+        print(f"Metrics written to: {self.path}")
+        return summary
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import XMLGenerator
+
+from fsutil import atomic_open
+
+EPISODE_FIELDS = ('title', 'description', 'url', 'video_url')
+
+
+class _NFOGenerator:
+    """Writes the info.nfo layout element by element with proper escaping"""
+
+    def __init__(self, f):
+        self._xml = XMLGenerator(f, encoding='utf-8', short_empty_elements=False)
+
+    def _element(self, name, text, indent):
+        self._xml.ignorableWhitespace(indent)
+        self._xml.startElement(name, {})
+        self._xml.characters(text)
+        self._xml.endElement(name)
+
+    def start(self, series_title):
+        self._xml.startDocument()
+        self._xml.startElement('tvshow', {})
+        self._element('title', series_title, '\n    ')
+        self._xml.ignorableWhitespace('\n    ')
+        self._xml.startElement('episodes', {})
+
+    def episode(self, number, fields):
+        self._xml.ignorableWhitespace('\n        ')
+        self._xml.startElement('episode', {})
+        self._element('number', str(number), '\n            ')
+        for name in EPISODE_FIELDS:
+            self._element(name, fields.get(name) or '', '\n            ')
+        self._xml.ignorableWhitespace('\n        ')
+        self._xml.endElement('episode')
+
+    def end(self):
+        self._xml.ignorableWhitespace('\n    ')
+        self._xml.endElement('episodes')
+        self._xml.ignorableWhitespace('\n')
+        self._xml.endElement('tvshow')
+        self._xml.endDocument()
+
+
+class NFOWriter:
+    """Keeps a series' info.nfo up to date as episodes finish.
+
+    Updates are buffered and merged into the file once `flush_every` episodes
+    are waiting or `flush_interval` seconds have passed, and on `flush()`. A
+    merge streams the existing file into a temporary file, putting the new
+    episodes in by number, and renames it into place. Memory use does not grow
+    with the length of the series and the file on disk is always complete.
+    """
+
+    FILE_NAME = 'info.nfo'
+
+    def __init__(self, output_dir, series_title, flush_every=25, flush_interval=30):
+        self.path = os.path.join(output_dir, self.FILE_NAME)
+        self.series_title = series_title
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+
+    def _existing_episodes(self):
+        """Yield (number, fields) for the episodes already in info.nfo"""
+        if not os.path.exists(self.path):
+            return
+        episodes_elem = None
+        try:
+            for event, elem in ET.iterparse(self.path, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == 'episodes':
+                        episodes_elem = elem
+                    continue
+                if elem.tag != 'episode':
+                    continue
+                fields = {name: elem.findtext(name) or '' for name in EPISODE_FIELDS}
+                try:
+                    number = int(elem.findtext('number') or 0)
+                except ValueError:
+                    number = 0
+                if episodes_elem is not None:
+                    episodes_elem.remove(elem)
+                yield number, fields
+        except ET.ParseError as e:
+            print(f"Could not read existing info file, rewriting it: {e}")
+
+    def update(self, episodes):
+        """Queue (number, video_info) pairs for info.nfo, merging them in when enough are waiting"""
+        with self._buffer_lock:
+            for number, info in episodes:
+                self._pending[number] = info
+            due = (len(self._pending) >= self.flush_every
+                   or time.monotonic() - self._flushed_at >= self.flush_interval)
+        if due:
+            self.flush()
+        return self.path
+
+    def flush(self):
+        """Merge the queued episodes into info.nfo"""
+        with self._buffer_lock:
+            pending = list(self._pending.items())
+            self._pending = {}
+            self._flushed_at = time.monotonic()
+        if pending:
+            self.merge(pending)
+        return self.path
+
+    def merge(self, episodes):
+        """Merge (number, video_info) pairs into info.nfo right away"""
+        return self._write(episodes, merge=True)
+
+    def write(self, episodes):
+        """Replace info.nfo with the given (number, video_info) pairs"""
+        return self._write(episodes, merge=False)
+
+    def _write(self, episodes, merge):
+        incoming = sorted(episodes, key=lambda item: item[0])
+        numbers = {number for number, _ in incoming}
+        urls = {info.get('url') for _, info in incoming}
+        with self._lock:
+            with atomic_open(self.path, 'w', encoding='utf-8') as f:
+                generator = _NFOGenerator(f)
+                generator.start(self.series_title)
+                position = 0
+                if merge:
+                    for number, fields in self._existing_episodes():
+                        # An incoming episode replaces the entry with its number or its URL
+                        if number in numbers or fields['url'] in urls:
+                            continue
+                        while position < len(incoming) and incoming[position][0] <= number:
+                            generator.episode(*incoming[position])
+                            position += 1
+                        generator.episode(number, fields)
+                for item in incoming[position:]:
+                    generator.episode(*item)
+                generator.end()
+        return self.path
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from bs4 import BeautifulSoup
+
+from metrics import timed
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+
+class PageDocument:
+    """A fetched page whose parsed tree is built on first use"""
+
+    def __init__(self, url, parser, metrics=None):
+        self.url = url
+        self.parser = parser
+        self.metrics = metrics
+        self.content = None
+        self._soup = None
+        self._lock = threading.Lock()
+
+    @property
+    def soup(self):
+        with self._lock:
+            if self._soup is None:
+                with timed(self.metrics, 'parse', self.url):
+                    self._soup = BeautifulSoup(self.content, self.parser)
+            return self._soup
+
+    def release(self):
+        """Free the parsed tree and the page body"""
+        with self._lock:
+            if self._soup is not None:
+                self._soup.decompose()
+                self._soup = None
+            self.content = None
+
+
+class PageStore:
+    """Fetches each page once per run and shares its parsed tree between extractors.
+
+    Callers release a page when every extractor is done with it, which frees
+    the tree memory. When an HTTPCache is given, page bodies come from it.
+    """
+
+    def __init__(self, session, parser=DEFAULT_PARSER, cache=None, metrics=None):
+        self.session = session
+        self.parser = parser
+        self.cache = cache
+        self.metrics = metrics
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, url):
+        if self.cache is not None:
+            return self.cache.get(self.session, url)
+        response = self.session.get(url)
+        response.raise_for_status()
+        return response.content
+
+    def _waited(self):
+        thread_waited = getattr(self.session, 'thread_waited', None)
+        return thread_waited() if thread_waited else 0.0
+
+    def get(self, url):
+        """Return the document for `url`, fetching it on first use"""
+        with self._lock:
+            page = self._pages.get(url)
+            if page is None:
+                page = PageDocument(url, self.parser, self.metrics)
+                self._pages[url] = page
+        # Concurrent callers for the same URL wait for a single fetch
+        with page._lock:
+            if page.content is None:
+                try:
+                    if self.metrics is None:
+                        page.content = self._fetch(url)
+                    else:
+                        # Time spent waiting for the rate limit is not network time
+                        waited = self._waited()
+                        start = time.perf_counter()
+                        page.content = self._fetch(url)
+                        seconds = time.perf_counter() - start - (self._waited() - waited)
+                        self.metrics.record('fetch', max(seconds, 0.0), url)
+                        self.metrics.count(page_bytes=len(page.content))
+                except Exception:
+                    with self._lock:
+                        self._pages.pop(url, None)
+                    raise
+        return page
+
+    def release(self, url):
+        """Forget `url` and free its parsed tree"""
+        with self._lock:
+            page = self._pages.pop(url, None)
+        if page is not None:
+            page.release()
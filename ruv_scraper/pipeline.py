@@ -0,0 +1,258 @@
+import os
+import queue
+import threading
+
+from metrics import timed
+
+# Sentinel telling a worker that no more work is coming
+_DONE = object()
+
+
+class SeriesJob:
+    """Per-series state shared by the pipeline workers"""
+
+    def __init__(self, series_url, title, output_dir, total, manifest=None, nfo=None):
+        self.series_url = series_url
+        self.title = title
+        self.output_dir = output_dir
+        self.total = total
+        self.manifest = manifest
+        self.nfo = nfo
+        # Video info keyed by episode number
+        self.results = {}
+
+    def metadata(self):
+        """Video info of every processed episode, in episode order"""
+        return [self.results[index] for index in sorted(self.results)]
+
+
+class EpisodePipeline:
+    """Extracts episode metadata and downloads episodes in two separate worker pools.
+
+    Extraction workers feed a bounded DownloadScheduler that the download workers
+    drain, so metadata for the next episodes is fetched while earlier ones are
+    downloading. The scheduler hands out the smallest remaining downloads first
+    and holds back downloads that would not fit on the disk. Finished files are
+    verified by the scraper's post-processor, if it has one, while later
+    episodes download. Work items may come from several series; each carries
+    its SeriesJob.
+    """
+
+    def __init__(self, scraper, jobs=1, download_jobs=1, download_videos=True, queue_size=None):
+        self.scraper = scraper
+        self.jobs = max(1, jobs)
+        self.download_jobs = max(1, download_jobs)
+        self.download_videos = download_videos
+        # Room for a few episodes per worker, so there is a choice of what to download next
+        self.queue_size = queue_size or self.download_jobs * 4
+        self.postprocessor = scraper.postprocessor
+        self.stats = {'episodes': 0, 'downloads': 0, 'failed': 0, 'bytes': 0, 'verify_failed': 0}
+        # Enough pooled connections for every worker to keep one open
+        scraper.session.configure_pool(self.jobs + self.download_jobs)
+        self._print_lock = threading.Lock()
+
+    def _log(self, message):
+        with self._print_lock:
+            print(message)
+
+    def _count(self, **increments):
+        with self._print_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+        if self.scraper.metrics is not None:
+            self.scraper.metrics.count(**increments)
+
+    def run(self, tasks):
+        """Process (series_job, index, episode) work items.
+
+        Video info is stored in each job's results, finished downloads are
+        recorded in its manifest once verified, and extracted metadata is queued
+        for its info.nfo, which is written in batches. Episodes marked
+        `verify_only` were downloaded before and are only verified.
+        """
+        extract_queue = queue.Queue(maxsize=self.jobs * 2)
+        download_queue = None
+        if self.download_videos:
+            # Dry runs and metadata runs never load the download scheduler
+            from scheduler import DownloadScheduler
+            download_queue = DownloadScheduler(self.queue_size, self.scraper.min_free_space)
+
+        verify_queue = queue.Queue()
+        extractors = [
+            threading.Thread(target=self._extract_worker, args=(extract_queue, download_queue, verify_queue),
+                             daemon=True)
+            for _ in range(self.jobs)
+        ]
+
+        downloaders = []
+        verifiers = []
+        if self.download_videos:
+            downloaders = [
+                threading.Thread(target=self._download_worker, args=(download_queue, verify_queue), daemon=True)
+                for _ in range(self.download_jobs)
+            ]
+            if self.postprocessor is not None:
+                verifiers = [
+                    threading.Thread(target=self._verify_worker, args=(verify_queue,), daemon=True)
+                    for _ in range(self.postprocessor.jobs)
+                ]
+
+        for worker in extractors + downloaders + verifiers:
+            worker.start()
+
+        for task in tasks:
+            extract_queue.put(task)
+        for _ in extractors:
+            extract_queue.put(_DONE)
+        for worker in extractors:
+            worker.join()
+
+        if download_queue is not None:
+            download_queue.close()
+        for worker in downloaders:
+            worker.join()
+
+        for _ in verifiers:
+            verify_queue.put(_DONE)
+        for worker in verifiers:
+            worker.join()
+
+        return self.stats
+
+    def _extract_worker(self, in_queue, out_queue, verify_queue):
+        while True:
+            task = in_queue.get()
+            if task is _DONE:
+                break
+            job, index, episode = task
+            if episode.get('verify_only'):
+                if self.download_videos and self.postprocessor is not None:
+                    entry = job.manifest.get(episode['url'])
+                    verify_queue.put((job, episode, entry['metadata'],
+                                      os.path.join(job.output_dir, entry['output_file'])))
+                continue
+            try:
+                video_info = self.scraper.extract_video_data(episode['url'])
+            except Exception as e:
+                print(f"Error processing {episode['title']}: {e}")
+                video_info = None
+
+            position = f"{index}/{job.total}" if job.total else str(index)
+            if not video_info:
+                self._log(f"\n[{position}] Failed to extract video info for: {episode['title']}")
+                continue
+
+            job.results[index] = video_info
+            self._count(episodes=1)
+            if job.nfo is not None:
+                try:
+                    with timed(self.scraper.metrics, 'nfo', episode['url']):
+                        job.nfo.update([(index, video_info)])
+                except Exception as e:
+                    print(f"Error updating info file: {e}")
+            lines = [
+                f"\n[{position}] Processing: {episode['title']}",
+                "-" * 40,
+                f"Title: {video_info['title']}",
+                f"URL: {video_info['url']}",
+            ]
+            if video_info.get('video_url'):
+                lines.append(f"Video URL: {video_info['video_url']}")
+            if video_info.get('description'):
+                lines.append(f"Description: {video_info['description'][:100]}...")
+            self._log("\n".join(lines))
+
+            if self.download_videos:
+                expected, done, output_file = self.scraper.expected_download_size(video_info, episode['title'],
+                                                                                  job.output_dir)
+                out_queue.put((job, episode, video_info), job.output_dir, expected, done, output_file)
+
+    def _record(self, job, video_info, output_file, verification=None):
+        if job.manifest is not None:
+            job.manifest.record(video_info, output_file, self.scraper.content_checksum(video_info), verification)
+
+    def _download_worker(self, scheduler, verify_queue):
+        while True:
+            item = scheduler.get()
+            if item is None:
+                break
+            task, remaining, admitted = item
+            job, episode, video_info = task
+            if not admitted:
+                self._count(failed=1)
+                needed = f" ({remaining / (1024 * 1024):.0f} MB needed)" if remaining else ""
+                self._log(f"Not enough disk space for {episode['title']}{needed}, skipping it...")
+                continue
+            try:
+                output_file = self.scraper.download_video(video_info, episode['title'], job.output_dir)
+                if output_file and os.path.isfile(output_file):
+                    self._count(downloads=1, bytes=os.path.getsize(output_file))
+                    if self.postprocessor is not None:
+                        verify_queue.put((job, episode, video_info, output_file))
+                    else:
+                        self._record(job, video_info, output_file)
+            except Exception as e:
+                print(f"Error downloading {episode['title']}: {e}")
+                output_file = None
+            finally:
+                scheduler.finished(task)
+            if not output_file:
+                self._count(failed=1)
+                self._log(f"Download failed for {episode['title']}, but continuing with other episodes...")
+
+    def _shared(self, key, output_file):
+        """True if the file is also another series' copy, which remuxing it would break away from"""
+        try:
+            if os.stat(output_file).st_nlink > 1:
+                return True
+            source = self.scraper.store.find(key) if key else None
+            return source is not None and not os.path.samefile(source, output_file)
+        except OSError:
+            return False
+
+    def _verify_worker(self, in_queue):
+        while True:
+            task = in_queue.get()
+            if task is _DONE:
+                break
+            job, episode, video_info, output_file = task
+            key = None
+            if self.scraper.store is not None:
+                from content_store import content_key
+                key = content_key(video_info)
+            try:
+                with timed(self.scraper.metrics, 'verify', video_info.get('url')):
+                    result = self.postprocessor.verify(video_info, output_file,
+                                                       remux_allowed=not self._shared(key, output_file))
+            except Exception as e:
+                print(f"Error verifying {episode['title']}: {e}")
+                self._record(job, video_info, output_file)
+                continue
+
+            if result['state'] == 'failed':
+                # Removed so the next run downloads it again instead of skipping it, and
+                # dropped from the content store so no other series links the same bad file
+                if key and self.scraper.store.remove(key):
+                    self._log(f"Dropped {episode['title']} from the content store")
+                self._count(verify_failed=1)
+                try:
+                    os.remove(output_file)
+                except OSError:
+                    pass
+                self._log(f"Verification failed for {episode['title']}: {result['error']}, removed the file")
+                continue
+
+            output_file = result['output_file']
+            if result['remuxed'] and key:
+                # The remuxed file replaces the one the content store indexed, which only
+                # this series had, as shared files are never remuxed
+                self.scraper.store.add(key, output_file)
+            self._record(job, video_info, output_file, {key: value for key, value in result.items()
+                                                         if key != 'output_file'})
+            if result['state'] == 'verified':
+                details = f"{result['duration'] or 0:.0f} s, {', '.join(result['streams'])}"
+                if result['remuxed']:
+                    details += ", remuxed to MKV"
+                self._log(f"✓ Verified {episode['title']} ({details})")
+            if result['error']:
+                self._log(result['error'])
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+from extractors import parse_duration
+
+# A file this much shorter than the page says, beyond a few seconds of slack, is truncated
+DURATION_TOLERANCE = 0.05
+DURATION_SLACK = 5.0
+
+
+def probe(path):
+    """Duration, streams and container tags of a media file, from ffprobe"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise ValueError(result.stderr.strip() or f"ffprobe exited with {result.returncode}")
+    data = json.loads(result.stdout or '{}')
+    container = data.get('format') or {}
+    try:
+        duration = float(container.get('duration'))
+    except (TypeError, ValueError):
+        duration = None
+    return {
+        'duration': duration,
+        'streams': [f"{stream.get('codec_type')}:{stream.get('codec_name')}" for stream in data.get('streams') or []],
+        'tags': {key.lower(): value for key, value in (container.get('tags') or {}).items()},
+    }
+
+
+def remux(path, title, description):
+    """Copy the streams of `path` into an MKV with title and description tags, returning its path"""
+    base, ext = os.path.splitext(path)
+    output_file = base + '.mkv'
+    tmp_file = base + '.remux.mkv'
+    result = subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-i', path, '-map', '0', '-c', 'copy',
+         '-metadata', f'title={title}', '-metadata', f'description={description}', '-f', 'matroska', tmp_file],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise ValueError(result.stderr.strip() or f"ffmpeg exited with {result.returncode}")
+    os.replace(tmp_file, output_file)
+    if ext != '.mkv':
+        os.remove(path)
+    return output_file
+
+
+def verify_file(path, title='', description='', duration='', remux_allowed=True):
+    """Probe a finished download, check it against the page and remux it if needed (runs in a worker process).
+
+    Returns the verification result recorded in the manifest: `state` is
+    'verified', 'failed' or 'unverified' when ffprobe is not installed, with
+    the probed duration and streams and the final `output_file`. Files shared
+    with another series are checked but never remuxed (`remux_allowed`).
+    """
+    result = {'state': 'unverified', 'output_file': path, 'expected_duration': parse_duration(duration),
+              'duration': None, 'streams': [], 'remuxed': False, 'error': None}
+    if not shutil.which('ffprobe'):
+        return result
+    try:
+        info = probe(path)
+    except ValueError as e:
+        return dict(result, state='failed', error=str(e))
+    result.update(duration=info['duration'], streams=info['streams'])
+
+    if not any(stream.startswith(('video:', 'audio:')) for stream in info['streams']):
+        return dict(result, state='failed', error="No audio or video streams")
+    expected = result['expected_duration']
+    if expected and (info['duration'] or 0) < expected * (1 - DURATION_TOLERANCE) - DURATION_SLACK:
+        return dict(result, state='failed',
+                    error=f"Truncated: {info['duration'] or 0:.0f} s of {expected:.0f} s")
+
+    if remux_allowed and (not path.endswith('.mkv') or info['tags'].get('title') != title) and shutil.which('ffmpeg'):
+        try:
+            result.update(output_file=remux(path, title, description), remuxed=True)
+        except (OSError, ValueError) as e:
+            result['error'] = f"Remux failed, keeping {os.path.basename(path)}: {e}"
+    return dict(result, state='verified')
+
+
+class PostProcessor:
+    """Verifies finished downloads in a process pool while other downloads carry on"""
+
+    def __init__(self, jobs=2):
+        self.jobs = max(1, jobs)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        """True if downloads can actually be probed, i.e. ffprobe is installed"""
+        return shutil.which('ffprobe') is not None
+
+    def verify(self, video_info, path, remux_allowed=True):
+        """Run verify_file for a download in the pool and wait for its result"""
+        with self._lock:
+            if self._pool is None:
+                # Loaded with the first finished download rather than at startup
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=self.jobs)
+        future = self._pool.submit(verify_file, path, video_info.get('title') or '',
+                                   video_info.get('description') or '', video_info.get('duration') or '',
+                                   remux_allowed)
+        return future.result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -6,6 +6,12 @@ import sys
 # Define the location of the main scraper script
 SCRAPER_SCRIPT = os.path.join(os.path.dirname(__file__), 'ruv_improved_scraper.py')
 TEST_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'test_downloads')
+# Recorded pages served locally, for runs without access to ruv.is
+OFFLINE_BENCHMARK = os.path.join(os.path.dirname(__file__), 'benchmarks', 'bench_offline.py')
+# Unit tests of the scraper modules, in test_*.py next to this script
+UNIT_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+# Startup cost of the command line, measured with -X importtime
+IMPORT_BENCHMARK = os.path.join(os.path.dirname(__file__), 'benchmarks', 'bench_import.py')
 
 # Define the test cases
 TEST_CASES = [
@@ -77,6 +83,16 @@ def run_test(test_case):
 
 def main():
     """Main test function."""
+    if '--offline' in sys.argv:
+        args = [arg for arg in sys.argv[1:] if arg != '--offline']
+        sys.exit(subprocess.run([sys.executable, OFFLINE_BENCHMARK] + args).returncode)
+    if '--unit' in sys.argv:
+        sys.exit(subprocess.run([sys.executable, '-m', 'unittest', 'discover', '-s', UNIT_TEST_DIR,
+                                 '-p', 'test_*.py', '-t', UNIT_TEST_DIR]).returncode)
+    if '--imports' in sys.argv:
+        args = [arg for arg in sys.argv[1:] if arg != '--imports']
+        sys.exit(subprocess.run([sys.executable, IMPORT_BENCHMARK] + args).returncode)
+
     print("Starting scraper tests...")
     
     # Clean up previous test runs
@@ -1,16 +1,26 @@
-import requests
-from bs4 import BeautifulSoup
-import json
+import itertools
 import re
 import os
-import time
-from urllib.parse import urljoin, urlparse
-import subprocess
-import sys
+import threading
+
+from discovery import EpisodeDiscovery
+from extractors import extract_series_title, extract_video_info, parse_duration
+from manifest import SeriesManifest
+from metrics import timed
+from nfo import NFOWriter
+from pages import DEFAULT_PARSER, PageStore
+from pipeline import EpisodePipeline, SeriesJob
+from transport import PoliteSession
+
+# The download machinery (bandwidth, content_store, downloaders, hls, scheduler) is
+# imported where it is used, so dry runs and metadata runs start without it
 
 class RUVImprovedScraper:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, requests_per_second=1 / 3, max_retries=4, parser=DEFAULT_PARSER, cache=None, backend=None,
+                 progress_hooks=None, native_hls=False, segment_jobs=8, max_height=None, bandwidth_limit=None,
+                 metrics=None, min_free_space=0, store=None, streams=None, postprocessor=None):
+        # Rate limited per host, with retries and backoff when the server struggles
+        self.session = PoliteSession(requests_per_second, max_retries)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -20,103 +30,65 @@ class RUVImprovedScraper:
             'Upgrade-Insecure-Requests': '1',
         })
         self.base_url = "https://www.ruv.is"
-        self.episodes = []
+        # Stage timings and counters, when enabled with --metrics
+        self.metrics = metrics
+        # Every page is fetched and parsed once, then shared by the extractors
+        self.cache = cache
+        self.pages = PageStore(self.session, parser, cache, metrics)
+        # Video info of recently extracted episodes, so their pages are not fetched again
+        self.streams = streams
+        # One bandwidth cap shared by every running download
+        self.bandwidth = None
+        if bandwidth_limit:
+            from bandwidth import BandwidthLimiter
+            self.bandwidth = BandwidthLimiter(bandwidth_limit)
+        progress_hooks = list(progress_hooks or [])
+        if self.bandwidth:
+            progress_hooks.append(self.bandwidth.progress_hook)
+        # The yt-dlp backend is created by the first download that needs it
+        self.backend = backend
+        self.progress_hooks = progress_hooks
+        self._downloader = None
+        self._downloader_lock = threading.Lock()
+        self.hls = None
+        if native_hls:
+            from hls import HLSDownloader
+            self.hls = HLSDownloader(self.session.headers, segment_jobs=segment_jobs, max_height=max_height,
+                                     bandwidth=self.bandwidth)
+        # Stream metadata comes from the CDN, so retries but no per-host rate limit
+        self.stream_session = self.hls.session if self.hls else PoliteSession(max_retries=max_retries)
+        self.stream_session.headers.update(self.session.headers)
+        # Downloads wait or are skipped rather than leave less than this free on disk
+        self.min_free_space = min_free_space
+        # Episodes already downloaded for another series are linked, not downloaded again
+        self.store = store
+        # Finished files are probed, checked against the page and remuxed to MKV
+        self.postprocessor = postprocessor
+        
+    def get_downloader(self):
+        """The yt-dlp download backend, so runs that download nothing never load yt-dlp"""
+        with self._downloader_lock:
+            if self._downloader is None:
+                from downloaders import create_backend
+                self._downloader = create_backend(self.backend, self.progress_hooks, self.bandwidth)
+            return self._downloader
         
     def get_series_title(self, series_url):
         """Extracts the series title from the main series page."""
         try:
-            response = self.session.get(series_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            title_element = soup.find('h1')
-            if title_element:
-                return title_element.get_text(strip=True)
-            title_element = soup.find('h2')
-            if title_element:
-                return title_element.get_text(strip=True)
-            return None
+            return extract_series_title(self.pages.get(series_url).soup)
         except Exception as e:
             print(f"Error getting series title: {e}")
             return None
 
+    def discover_episodes(self, series_url):
+        """Yield the episodes of a series as they are found, following pagination"""
+        return EpisodeDiscovery(self.pages, self.base_url).episodes(series_url)
+
     def get_all_episodes(self, series_url):
-        """Get all episodes from a series page by analyzing the page structure"""
+        """Get all episodes of a series, from every page of its episode list"""
         try:
-            response = self.session.get(series_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            episodes = []
-            
-            # Method 1: Look for episode list in the page
-            # RÚV might have a specific episode list structure
-            episode_sections = soup.find_all(['div', 'section', 'ul'], class_=re.compile(r'episode|video|list|item'))
-            
-            for section in episode_sections:
-                links = section.find_all('a', href=True)
-                for link in links:
-                    href = link.get('href')
-                    if href and '/spila/' in href:
-                        title = link.get_text(strip=True)
-                        if title:
-                            full_url = urljoin(self.base_url, href)
-                            episodes.append({
-                                'url': full_url,
-                                'title': title
-                            })
-            
-            # Method 2: Look for all links containing the series ID
-            if not episodes:
-                series_id = series_url.split('/')[-1]  # Get the last part of URL
-                all_links = soup.find_all('a', href=re.compile(series_id))
-                
-                for link in all_links:
-                    href = link.get('href')
-                    title = link.get_text(strip=True)
-                    if href and title:
-                        full_url = urljoin(self.base_url, href)
-                        episodes.append({
-                            'url': full_url,
-                            'title': title
-                        })
-            
-            # Method 3: Look for navigation or pagination that might contain episode links
-            if not episodes:
-                nav_elements = soup.find_all(['nav', 'div'], class_=re.compile(r'nav|pagination|episode'))
-                for nav in nav_elements:
-                    links = nav.find_all('a', href=True)
-                    for link in links:
-                        href = link.get('href')
-                        if href and '/spila/' in href:
-                            title = link.get_text(strip=True)
-                            if title:
-                                full_url = urljoin(self.base_url, href)
-                                episodes.append({
-                                    'url': full_url,
-                                    'title': title
-                                })
-            
-            # Method 4: If no episodes found, treat the current page as a single episode
-            if not episodes:
-                # Try to extract title from the current page
-                title_elem = soup.find(['h1', 'h2', 'title'])
-                title = title_elem.get_text(strip=True) if title_elem else "Sammi brunavörður X"
-                
-                episodes.append({
-                    'url': series_url,
-                    'title': title
-                })
-            
-            # Remove duplicates
-            unique_episodes = []
-            seen_urls = set()
-            for episode in episodes:
-                if episode['url'] not in seen_urls:
-                    unique_episodes.append(episode)
-                    seen_urls.add(episode['url'])
-            
-            return unique_episodes
-            
+            return list(self.discover_episodes(series_url))
         except Exception as e:
             print(f"Error getting episodes: {e}")
             return []
@@ -124,158 +96,161 @@ class RUVImprovedScraper:
     def extract_video_data(self, episode_url):
         """Extract video data from an episode page"""
         try:
-            response = self.session.get(episode_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract title - try multiple methods
-            title = None
-            
-            # Method 1: Look for h1 tag
-            h1_elem = soup.find('h1')
-            if h1_elem:
-                title = h1_elem.get_text(strip=True)
-            
-            # Method 2: Look for title tag
-            if not title:
-                title_elem = soup.find('title')
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    # Clean up title (remove site name if present)
-                    if ' - RÚV' in title:
-                        title = title.replace(' - RÚV', '')
-            
-            # Method 3: Look for specific RÚV title elements
-            if not title:
-                title_elem = soup.find(['h2', 'h3'], class_=re.compile(r'title|heading'))
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-            
-            if not title:
-                title = "Unknown Title"
-            
-            video_info = {
-                'title': title,
-                'url': episode_url,
-                'video_url': None,
-                'description': '',
-                'duration': '',
-                'air_date': ''
-            }
-            
-            # Extract description
-            desc_elem = soup.find('meta', {'name': 'description'})
-            if desc_elem:
-                video_info['description'] = desc_elem.get('content', '')
-            
-            # Look for video player data in JavaScript
-            scripts = soup.find_all('script')
-            for script in scripts:
-                if script.string:
-                    # Look for RÚV-specific video data patterns
-                    patterns = [
-                        r'"videoUrl"\s*:\s*"([^"]+)"',
-                        r'"src"\s*:\s*"([^"]+\.mp4[^"]*)"',
-                        r'"url"\s*:\s*"([^"]+\.mp4[^"]*)"',
-                        r'"streamUrl"\s*:\s*"([^"]+)"',
-                        r'"mediaUrl"\s*:\s*"([^"]+)"',
-                        r'https?://[^\s"<>]+\.mp4[^\s"<>]*',
-                        r'https?://[^\s"<>]+\.m3u8[^\s"<>]*',
-                        r'https?://ruv-vod\.akamaized\.net/[^\s"<>]+'
-                    ]
-                    
-                    for pattern in patterns:
-                        matches = re.findall(pattern, script.string)
-                        if matches:
-                            video_info['video_url'] = matches[0]
-                            break
-                
-                if video_info['video_url']:
-                    break
-            
-            # If no video URL found in scripts, try other methods
-            if not video_info['video_url']:
-                # Look for video tags
-                video_tags = soup.find_all('video')
-                for video in video_tags:
-                    src = video.get('src')
-                    if src:
-                        video_info['video_url'] = urljoin(self.base_url, src)
-                        break
-                
-                # Look for source tags
-                if not video_info['video_url']:
-                    source_tags = soup.find_all('source')
-                    for source in source_tags:
-                        src = source.get('src')
-                        if src:
-                            video_info['video_url'] = urljoin(self.base_url, src)
-                            break
-                
-                # Look for iframe players
-                if not video_info['video_url']:
-                    iframes = soup.find_all('iframe')
-                    for iframe in iframes:
-                        src = iframe.get('src')
-                        if src and ('player' in src or 'video' in src):
-                            video_info['video_url'] = src
-                            break
-            
+            if self.streams is not None:
+                video_info = self.streams.get(episode_url)
+                if video_info:
+                    return video_info
+            soup = self.pages.get(episode_url).soup
+            with timed(self.metrics, 'extract', episode_url):
+                video_info = extract_video_info(soup, episode_url, self.base_url)
+            if self.streams is not None and video_info.get('video_url'):
+                self.streams.put(episode_url, video_info)
             return video_info
             
         except Exception as e:
             print(f"Error extracting video data from {episode_url}: {e}")
             return None
+        finally:
+            self.pages.release(episode_url)
+    
+    def _output_file(self, episode_title, output_dir):
+        """Path of the .mkv file for an episode"""
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Clean filename using the episode title
+        safe_title = re.sub(r'[<>:"/\\|?*]', '_', episode_title)
+        return os.path.join(output_dir, f"{safe_title}.mkv")
+    
+    def expected_download_size(self, video_info, episode_title, output_dir):
+        """Return (expected bytes or None, bytes already on disk, output file) for an episode's download"""
+        from hls import estimate_hls_size, fetch_playlist, is_hls_url
+        from scheduler import partial_download_bytes
+        
+        output_file = self._output_file(episode_title, output_dir)
+        key = self._content_key(video_info)
+        source = self.store.find(key) if key else None
+        if source is not None:
+            # A link on the same disk takes no space, a copy elsewhere does
+            if os.stat(source).st_dev == os.stat(output_dir).st_dev:
+                return 0, 0, output_file
+            return os.path.getsize(source), 0, output_file
+        done = partial_download_bytes(output_file)
+        video_url = video_info.get('video_url')
+        if not video_url:
+            return None, done, output_file
+        try:
+            if is_hls_url(video_url):
+                # The native downloader keeps the playlists fetched here for the download itself
+                # and honours --max-height; yt-dlp takes the best variant
+                if self.hls:
+                    fetch, max_height = self.hls.playlist, self.hls.max_height
+                else:
+                    fetch, max_height = (lambda url: fetch_playlist(self.stream_session, url)), None
+                duration = parse_duration(video_info.get('duration'))
+                return estimate_hls_size(fetch, video_url, max_height, duration), done, output_file
+            response = self.stream_session.head(video_url, allow_redirects=True)
+            response.raise_for_status()
+            return int(response.headers.get('Content-Length') or 0) or None, done, output_file
+        except Exception as e:
+            print(f"Could not estimate the size of {episode_title}: {e}")
+            return None, done, output_file
+    
+    def _report_download(self, episode_title, downloaded_file):
+        print(f"✓ Successfully downloaded: {episode_title}")
+        if os.path.isfile(downloaded_file):
+            file_size_mb = os.path.getsize(downloaded_file) / (1024 * 1024)
+            print(f"📁 File saved to: {downloaded_file}")
+            print(f"📊 File size: {file_size_mb:.1f} MB")
+    
+    def download_video(self, video_info, episode_title, output_dir="downloads"):
+        """Download an episode, or link it from the content store if another series has it"""
+        return self._download_or_link(video_info, episode_title, output_dir)
+    
+    def _forget_stream(self, video_info, episode_title):
+        """Drop a stream URL that failed to download from the stream cache, so the page is read again next time"""
+        if self.streams is not None and self.streams.invalidate(video_info.get('url'), video_info.get('video_url')):
+            print(f"Dropped the cached stream of {episode_title}")
+    
+    def _content_key(self, video_info):
+        """The episode's key in the content store, or None without a store"""
+        if self.store is None:
+            return None
+        from content_store import content_key
+        return content_key(video_info)
+    
+    def _download_or_link(self, video_info, episode_title, output_dir):
+        key = self._content_key(video_info)
+        if key is None:
+            return self._transfer(video_info, episode_title, output_dir)
+        
+        # The same episode in two series is downloaded once, the other waits and links it
+        linked_file = self.store.claim(key, self._output_file(episode_title, output_dir))
+        if linked_file:
+            self._report_download(episode_title, linked_file)
+            return linked_file
+        try:
+            downloaded_file = self._transfer(video_info, episode_title, output_dir)
+            if downloaded_file and os.path.isfile(downloaded_file):
+                self.store.add(key, downloaded_file)
+            return downloaded_file
+        finally:
+            self.store.release(key)
+    
+    def content_checksum(self, video_info):
+        """Checksum of an episode's file from the content store, if one was computed"""
+        key = self._content_key(video_info)
+        return self.store.get_checksum(key) if key else None
+    
+    def _transfer(self, video_info, episode_title, output_dir):
+        """Download an episode, using the native HLS downloader for HLS streams when enabled"""
+        with timed(self.metrics, 'download', video_info.get('url')):
+            if self.bandwidth:
+                with self.bandwidth.transfer():
+                    return self._download_video(video_info, episode_title, output_dir)
+            return self._download_video(video_info, episode_title, output_dir)
+    
+    def _download_video(self, video_info, episode_title, output_dir):
+        from hls import HLSUnsupported, is_hls_url
+        
+        if self.hls and is_hls_url(video_info.get('video_url')):
+            output_file = self._output_file(episode_title, output_dir)
+            try:
+                print(f"Downloading (native HLS): {episode_title}")
+                downloaded_file = self.hls.download(video_info['video_url'], output_file)
+                self._report_download(episode_title, downloaded_file)
+                return downloaded_file
+            except HLSUnsupported as e:
+                print(f"Native HLS not possible for {episode_title} ({e}), falling back to yt-dlp")
+            except Exception as e:
+                print(f"Native HLS download failed for {episode_title}: {e}, falling back to yt-dlp")
+                # Only a download of the cached stream URL itself says it is stale;
+                # yt-dlp reads the episode page on its own
+                self._forget_stream(video_info, episode_title)
+        
+        return self.download_with_yt_dlp(video_info, episode_title, output_dir)
     
     def download_with_yt_dlp(self, video_info, episode_title, output_dir="downloads"):
-        """Download video using yt-dlp"""
+        """Download video using yt-dlp, returning the output file path or False on failure"""
+        from downloaders import DownloadError
+        
         if not video_info.get('url'):
             print(f"No URL found for: {video_info['title']}")
             return False
         
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Clean filename using the episode title
-        safe_title = re.sub(r'[<>:"/\\|?*]', '_', episode_title)
-        output_file = os.path.join(output_dir, f"{safe_title}.mkv")
+        output_file = self._output_file(episode_title, output_dir)
         
         try:
-            cmd = [
-                'yt-dlp',
-                '--output', output_file,
-                '--format', 'best',
-                '--merge-output-format', 'mkv',
-                '--no-check-certificates',
-                '--geo-bypass',
-                video_info['url']
-            ]
-            
             print(f"Downloading: {episode_title}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                print(f"✓ Successfully downloaded: {episode_title}")
-                
-                # Find the actual downloaded file
-                actual_files = []
-                for file in os.listdir(output_dir):
-                    if file.startswith(safe_title) and file.endswith('.mkv'):
-                        actual_files.append(os.path.join(output_dir, file))
-                
-                if actual_files:
-                    # Get the largest file (main video file)
-                    largest_file = max(actual_files, key=os.path.getsize)
-                    file_size = os.path.getsize(largest_file)
-                    file_size_mb = file_size / (1024 * 1024)
-                    print(f"📁 File saved to: {largest_file}")
-                    print(f"📊 File size: {file_size_mb:.1f} MB")
-                
-                return True
-            else:
-                print(f"✗ yt-dlp failed for {episode_title}")
-                print(f"Error: {result.stderr}")
-                return False
+            # yt-dlp fetches the episode page itself, so it needs a token for that host too
+            self.session.throttle(video_info['url'])
+            downloaded_file = self.get_downloader().download(video_info['url'], output_file)
+            self._report_download(episode_title, downloaded_file)
+            return downloaded_file
                 
+        except DownloadError as e:
+            print(f"✗ yt-dlp failed for {episode_title}")
+            print(f"Error: {e}")
+            return False
         except Exception as e:
             print(f"Error downloading {episode_title}: {e}")
             return False
@@ -283,118 +258,119 @@ class RUVImprovedScraper:
     def create_info_file(self, series_title, episodes_data, output_dir):
         """Create a single info.nfo file with all episode information"""
         try:
-            info_content = f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<tvshow>\n    <title>{series_title}</title>\n    <episodes>\n"""
-            
-            for i, episode in enumerate(episodes_data, 1):
-                info_content += f"""        <episode>\n            <number>{i}</number>\n            <title>{episode.get('title', 'Unknown')}</title>\n            <description>{episode.get('description', '')}</description>\n            <url>{episode.get('url', '')}</url>\n            <video_url>{episode.get('video_url', '')}</video_url>\n        </episode>\n"""
-            
-            info_content += """    </episodes>\n</tvshow>"""
-            
-            info_file = os.path.join(output_dir, 'info.nfo')
-            with open(info_file, 'w', encoding='utf-8') as f:
-                f.write(info_content)
-            
+            with timed(self.metrics, 'nfo'):
+                info_file = NFOWriter(output_dir, series_title).write(enumerate(episodes_data, 1))
             print(f"✓ Info file created: {info_file}")
             return info_file
             
         except Exception as e:
             print(f"Error creating info file: {e}")
 
-    def scrape_series(self, series_url, download_videos=True, download_limit=None, output_dir_base="downloads"):
-        """Main method to scrape an entire series"""
+    def prepare_series(self, series_url, download_limit=None, output_dir_base="downloads", dry_run=False):
+        """Discover a series and return its SeriesJob with the (index, episode) pairs still to process.
+
+        A dry run creates no folder and leaves info.nfo alone.
+        """
         print(f"Starting to scrape series from: {series_url}")
         print("="*60)
 
         series_title = self.get_series_title(series_url)
         if not series_title:
             print("Could not determine series title. Exiting.")
-            return
+            return None, []
 
         print(f"Series Title: {series_title}")
         
         output_dir = os.path.join(output_dir_base, re.sub(r'[<>:"/\\|?*]', '_', series_title))
-        os.makedirs(output_dir, exist_ok=True)
-        
-        episodes_data = self.get_all_episodes(series_url)
-        print(f"Found {len(episodes_data)} episodes")
-        
-        if not episodes_data:
-            print("No episodes found. Exiting.")
-            return
+        if not dry_run:
+            os.makedirs(output_dir, exist_ok=True)
 
-        all_episodes_metadata = []
+        # Episodes are handed on as discovery finds them, so the total is not known yet
+        episodes = self.discover_episodes(series_url)
+        if download_limit is not None:
+            print(f"Download limit of {download_limit} set, processing at most {download_limit} episodes.")
+            episodes = itertools.islice(episodes, download_limit)
 
-        # Process each episode
-        for i, episode in enumerate(episodes_data, 1):
-            if download_limit is not None and i > download_limit:
-                print(f"\nReached download limit of {download_limit}. Stopping.")
-                break
+        # info.nfo is updated in small batches as episodes finish, so it survives an interrupted run
+        job = SeriesJob(series_url, series_title, output_dir, None, manifest=SeriesManifest(output_dir),
+                        nfo=None if dry_run else NFOWriter(output_dir, series_title))
+        return job, self._pending_episodes(job, episodes)
 
-            print(f"\n[{i}/{len(episodes_data)}] Processing: {episode['title']}")
-            print("-" * 40)
-            
-            video_info = self.extract_video_data(episode['url'])
-            if video_info:
-                all_episodes_metadata.append(video_info)
-                print(f"Title: {video_info['title']}")
-                print(f"URL: {video_info['url']}")
-                if video_info.get('video_url'):
-                    print(f"Video URL: {video_info['video_url']}")
-                if video_info.get('description'):
-                    print(f"Description: {video_info['description'][:100]}...")
-                
-                if download_videos:
-                    success = self.download_with_yt_dlp(video_info, episode['title'], output_dir)
-                    if not success:
-                        print("Download failed, but continuing with other episodes...")
-                
-                # Be respectful to the server
-                time.sleep(3)
-            else:
-                print(f"Failed to extract video info for: {episode['title']}")
+    def _pending_episodes(self, job, episodes):
+        """Yield the (index, episode) pairs still to process, numbering episodes as they are found"""
+        # Episodes finished on an earlier run are skipped before any request is made
+        skipped = []
+        skipped_count = count = 0
+        for count, episode in enumerate(episodes, 1):
+            if job.manifest.is_complete(episode['url']):
+                job.results[count] = job.manifest.get(episode['url'])['metadata']
+                skipped.append((count, job.results[count]))
+                skipped_count += 1
+                if self._needs_verification(job, episode['url']):
+                    # Downloaded while ffprobe was missing, so only the check is left to do
+                    yield count, dict(episode, verify_only=True)
+                continue
+            if skipped and job.nfo is not None:
+                job.nfo.update(skipped)
+                skipped = []
+            yield count, episode
+        if skipped and job.nfo is not None:
+            job.nfo.update(skipped)
+
+        job.total = count
+        print(f"Found {count} episodes in {job.title}")
+        if not count:
+            print("No episodes found.")
+        if skipped_count:
+            print(f"Skipped {skipped_count} episodes already downloaded.")
+
+    def _needs_verification(self, job, episode_url):
+        return self.postprocessor is not None and job.manifest.is_unverified(episode_url) \
+            and self.postprocessor.available()
+
+    def finish_series(self, job):
+        """Report on a processed series and return its episode metadata"""
+        all_episodes_metadata = job.metadata()
+        
+        if job.nfo is None:
+            print(f"\n" + "="*60)
+            pending = [info for info in all_episodes_metadata if not job.manifest.is_complete(info['url'])]
+            print(f"Dry run: {len(pending)} episodes of {job.title} would be downloaded to {job.output_dir}")
+            return all_episodes_metadata
         
-        # Create info.nfo file with all episode information
+        job.nfo.flush()
         if all_episodes_metadata:
-            self.create_info_file(series_title, all_episodes_metadata, output_dir)
+            print(f"✓ Info file updated: {job.nfo.path}")
         
         print(f"\n" + "="*60)
         print(f"Scraping completed! Processed {len(all_episodes_metadata)} episodes.")
-        print(f"Downloads and info file are in: {output_dir}")
+        print(f"Downloads and info file are in: {job.output_dir}")
         
         return all_episodes_metadata
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python ruv_improved_scraper.py <series_url> [--limit <number_of_episodes>] [--output-dir <directory>]")
-        sys.exit(1)
-        
-    series_url = sys.argv[1]
-    limit = None
-    output_dir_base = os.path.join("ruv_scraper", "downloads")
-
-    if '--limit' in sys.argv:
-        try:
-            limit_index = sys.argv.index('--limit') + 1
-            limit = int(sys.argv[limit_index])
-        except (ValueError, IndexError):
-            print("Invalid value for --limit. Please provide an integer.")
-            sys.exit(1)
+    def scrape_series(self, series_url, download_videos=True, download_limit=None, output_dir_base="downloads",
+                      jobs=1, download_jobs=1, dry_run=False):
+        """Main method to scrape an entire series"""
+        job, pending = self.prepare_series(series_url, download_limit, output_dir_base, dry_run)
+        if job is None:
+            return
 
-    if '--output-dir' in sys.argv:
+        # Metadata extraction and downloads run in separate worker pools
+        pipeline = EpisodePipeline(self, jobs=jobs, download_jobs=download_jobs,
+                                   download_videos=download_videos and not dry_run)
         try:
-            output_dir_index = sys.argv.index('--output-dir') + 1
-            output_dir_base = sys.argv[output_dir_index]
-        except IndexError:
-            print("Invalid value for --output-dir. Please provide a path.")
-            sys.exit(1)
+            pipeline.run((job, i, episode) for i, episode in pending)
+        finally:
+            # Episodes extracted before an interruption still reach info.nfo
+            if job.nfo is not None:
+                job.nfo.flush()
+        
+        return self.finish_series(job)
 
-    scraper = RUVImprovedScraper()
-    scraper.scrape_series(
-        series_url, 
-        download_videos=True, 
-        download_limit=limit,
-        output_dir_base=output_dir_base
-    )
+def main():
+    # The command line lives in cli.py, which imports only what a run needs
+    from cli import main as cli_main
+    cli_main()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import os
+import shutil
+import threading
+
+from fsutil import read_json
+
+
+def partial_download_bytes(output_file):
+    """Bytes already on disk from an interrupted download of `output_file`"""
+    base, _ = os.path.splitext(output_file)
+    # Native HLS downloads record what they have written next to the .ts.part file
+    if os.path.exists(base + '.ts.part'):
+        return read_json(base + '.hls.json', {}).get('bytes', 0)
+    # yt-dlp leaves <name>.mkv.part or per-format <name>.f123.mp4.part files
+    output_dir = os.path.dirname(output_file) or '.'
+    prefix = os.path.basename(base)
+    try:
+        names = os.listdir(output_dir)
+    except OSError:
+        return 0
+    # The name is followed by a dot, so "Episode 10.mkv.part" does not count toward "Episode 1"
+    return sum(
+        os.path.getsize(os.path.join(output_dir, name)) for name in names
+        if name.startswith(prefix + '.') and name.endswith('.part')
+    )
+
+
+def _device(path):
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+class DownloadScheduler:
+    """Priority queue between extraction and the download workers.
+
+    Episodes are handed out smallest remaining size first, so short and
+    nearly finished episodes complete before long ones start and the disk
+    holds as few partial files as possible. Episodes of unknown size go last.
+
+    A download is only admitted when the free disk space, less what the
+    running downloads on the same disk still have to write, covers its
+    remaining size plus `min_free` bytes. What a running download has written
+    so far is read from its partial files, since it already shows in the free
+    space. If a download does not fit, the scheduler waits for running
+    downloads to finish; with none running it is rejected instead.
+    """
+
+    def __init__(self, maxsize=0, min_free=0):
+        self.maxsize = maxsize
+        self.min_free = min_free
+        self._heap = []
+        self._order = itertools.count()
+        # id(task) -> (device, output file, remaining bytes, partial bytes when admitted)
+        self._reservations = {}
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, task, output_dir, expected=None, done=0, output_file=None):
+        """Queue `task`, blocking while the queue is full"""
+        remaining = max(0, expected - done) if expected is not None else None
+        key = (remaining is None, remaining or 0, next(self._order))
+        with self._cond:
+            while self.maxsize and len(self._heap) >= self.maxsize:
+                self._cond.wait()
+            heapq.heappush(self._heap, (key, task, output_dir, remaining, output_file))
+            self._cond.notify_all()
+
+    def close(self):
+        """No more tasks are coming; workers finish once the queue is empty"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _still_needed(self, output_file, remaining, done):
+        """Bytes a running download has yet to write"""
+        if not remaining or output_file is None:
+            return remaining or 0
+        written = max(0, partial_download_bytes(output_file) - done)
+        return max(0, remaining - written)
+
+    def free_space(self, output_dir):
+        """Free bytes on the disk holding `output_dir`, less what the running downloads still need"""
+        usage = shutil.disk_usage(output_dir)
+        device = _device(output_dir)
+        return usage.free - sum(self._still_needed(output_file, remaining, done)
+                                for task_device, output_file, remaining, done in self._reservations.values()
+                                if task_device == device)
+
+    def _running(self, device):
+        return any(reservation[0] == device for reservation in self._reservations.values())
+
+    def _fits(self, output_dir, remaining):
+        return self.free_space(output_dir) >= (remaining or 0) + self.min_free
+
+    def get(self):
+        """Return (task, remaining, admitted) for the next download, or None when done.
+
+        A task that is not admitted did not fit on the disk and should be skipped.
+        Every admitted task must be passed to `finished` afterwards.
+        """
+        with self._cond:
+            while True:
+                if self._heap:
+                    _, task, output_dir, remaining, output_file = self._heap[0]
+                    device = _device(output_dir)
+                    fits = self._fits(output_dir, remaining)
+                    if fits or not self._running(device):
+                        heapq.heappop(self._heap)
+                        if fits:
+                            done = partial_download_bytes(output_file) if output_file and remaining else 0
+                            self._reservations[id(task)] = (device, output_file, remaining, done)
+                        self._cond.notify_all()
+                        return task, remaining, fits
+                elif self._closed:
+                    return None
+                # Running downloads write into the reserved space, so look again now and then
+                self._cond.wait(5 if self._reservations else None)
+
+    def finished(self, task):
+        """Release the disk space reserved for an admitted download"""
+        with self._cond:
+            self._reservations.pop(id(task), None)
+            self._cond.notify_all()
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from fsutil import atomic_write_json, read_json
+
+
+class StreamCache:
+    """Persistent map from episode page URL to its extracted video info.
+
+    Entries younger than `ttl` seconds stand in for fetching and parsing the
+    episode page. Each entry keeps the video info with the time it was
+    extracted, and is dropped when a native download from its stream URL
+    fails. New entries are written out every `save_every` puts and on close();
+    expired entries are dropped when the file is read and written.
+    """
+
+    def __init__(self, path, ttl=86400, save_every=50):
+        self.path = path
+        self.ttl = ttl
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+        self.entries = self._fresh(read_json(path, {}).get('streams', {}))
+
+    def _fresh(self, entries):
+        now = time.time()
+        return {url: entry for url, entry in entries.items() if now - entry['extracted_at'] < self.ttl}
+
+    def get(self, episode_url):
+        """Cached video info for `episode_url`, or None if missing or stale"""
+        with self._lock:
+            entry = self.entries.get(episode_url)
+            if entry and time.time() - entry['extracted_at'] < self.ttl:
+                self.hits += 1
+                return dict(entry['info'])
+            self.misses += 1
+            return None
+
+    def put(self, episode_url, video_info, save=True):
+        """Cache the video info of an episode page.
+
+        Returns True when a write is due; with `save=False` it is left to the
+        caller to call save(), e.g. off the event loop.
+        """
+        with self._lock:
+            self.entries[episode_url] = {'info': video_info, 'extracted_at': time.time()}
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every
+        if due and save:
+            self.save()
+        return due
+
+    def invalidate(self, episode_url, video_url=None):
+        """Drop the entry for `episode_url`, only if it still points at `video_url` when given"""
+        with self._lock:
+            entry = self.entries.get(episode_url)
+            if not entry or (video_url is not None and entry['info'].get('video_url') != video_url):
+                return False
+            del self.entries[episode_url]
+            self._unsaved += 1
+        # Written at once, so a stale stream URL is not used again after a crash
+        self.save()
+        return True
+
+    def save(self):
+        """Write the cache if anything changed since the last write"""
+        with self._save_lock:
+            with self._lock:
+                if not self._unsaved:
+                    return
+                self.entries = self._fresh(self.entries)
+                entries = dict(self.entries)
+                self._unsaved = 0
+            atomic_write_json(self.path, {'streams': entries})
+
+    def close(self):
+        self.save()
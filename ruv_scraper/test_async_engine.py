@@ -0,0 +1,113 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from async_engine import AsyncTokenBucket, aiohttp, parse_episode_page
+from nfo import NFOWriter
+from ruv_improved_scraper import RUVImprovedScraper
+
+SERIES_PATH = '/sjonvarp/spila/demo/1'
+
+
+def listing(episode_ids, next_href=None):
+    links = ''.join(f'<li><a href="{SERIES_PATH}/{i}">Episode {i}</a></li>' for i in episode_ids)
+    nav = f'<nav class="pagination"><a class="next" href="{next_href}">Næsta</a></nav>' if next_href else ''
+    return f'<html><body><h1>Demo</h1><ul class="episode-list">{links}</ul>{nav}</body></html>'
+
+
+def episode_page(i):
+    return (f'<html><head><title>Episode {i} | RÚV</title>'
+            f'<meta name="description" content="About {i}"></head><body>'
+            f'<script type="application/ld+json">{{"@type": "VideoObject", "duration": "PT10M", '
+            f'"contentUrl": "https://ruv-vod.akamaized.net/opid/{i}/index.m3u8"}}</script></body></html>')
+
+
+PAGES = {
+    SERIES_PATH: listing(['a', 'b'], '?page=2'),
+    SERIES_PATH + '?page=2': listing(['c']),
+    SERIES_PATH + '/a': episode_page('a'),
+    SERIES_PATH + '/b': episode_page('b'),
+    SERIES_PATH + '/c': episode_page('c'),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PAGES.get(self.path)
+        self.send_response(200 if body else 404)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        data = (body or '').encode('utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ParseEpisodePageTest(unittest.TestCase):
+    def test_matches_the_scraper(self):
+        scraper = RUVImprovedScraper(requests_per_second=None, parser='html.parser')
+        url = 'https://www.ruv.is' + SERIES_PATH + '/a'
+        with mock.patch.object(scraper.pages, '_fetch', return_value=episode_page('a').encode('utf-8')):
+            expected = scraper.extract_video_data(url)
+        self.assertEqual(parse_episode_page(episode_page('a').encode('utf-8'), url, scraper.base_url, 'html.parser'),
+                         expected)
+        self.assertEqual(expected['video_url'], 'https://ruv-vod.akamaized.net/opid/a/index.m3u8')
+
+
+class AsyncTokenBucketTest(unittest.TestCase):
+    def test_requests_are_spaced_and_held(self):
+        async def acquire(bucket, count):
+            start = time.monotonic()
+            for _ in range(count):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        bucket = AsyncTokenBucket(50)
+        self.assertAlmostEqual(asyncio.run(acquire(bucket, 3)), 0.04, delta=0.03)
+        bucket.hold(0.1)
+        self.assertGreaterEqual(asyncio.run(acquire(bucket, 1)), 0.08)
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncMetadataEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        self.scraper = RUVImprovedScraper(requests_per_second=None, parser='html.parser')
+        self.scraper.base_url = self.base_url
+
+    def engine(self):
+        from async_engine import AsyncMetadataEngine
+        return AsyncMetadataEngine(self.scraper, concurrency=4, parse_workers=1)
+
+    def test_extract_many_matches_extract_video_data(self):
+        urls = [self.base_url + SERIES_PATH + f'/{i}' for i in 'abc']
+        results = self.engine().extract_many(urls)
+        with mock.patch('builtins.print'):
+            expected = [self.scraper.extract_video_data(url) for url in urls]
+        self.assertEqual(results, expected)
+
+    def test_crawl_writes_the_info_file_for_every_page(self):
+        with mock.patch('builtins.print'):
+            counts = self.engine().crawl([self.base_url + SERIES_PATH], self.dir)
+        self.assertEqual(counts, [3])
+        root = ET.parse(os.path.join(self.dir, 'Demo', NFOWriter.FILE_NAME)).getroot()
+        self.assertEqual([e.findtext('title') for e in root.iter('episode')], ['Episode a | RÚV', 'Episode b | RÚV', 'Episode c | RÚV'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from batch import BatchScheduler, read_series_urls
+from pipeline import SeriesJob
+
+
+class FakeSession:
+    def configure_pool(self, size):
+        pass
+
+
+class FakeScraper:
+    """Series named in `sizes` have that many episodes; other series fail to load"""
+
+    def __init__(self, output_dir, sizes):
+        self.output_dir = output_dir
+        self.sizes = sizes
+        self.session = FakeSession()
+        self.postprocessor = None
+        self.metrics = None
+        self.store = None
+        self.prepared = []
+        self.finished = []
+
+    def prepare_series(self, series_url, download_limit=None, output_dir_base="downloads", dry_run=False):
+        self.prepared.append(series_url)
+        if series_url not in self.sizes:
+            return None, []
+        job = SeriesJob(series_url, series_url, self.output_dir, self.sizes[series_url])
+        return job, [(i, {'url': f'{series_url}/e{i}', 'title': f'{series_url} e{i}'})
+                     for i in range(1, self.sizes[series_url] + 1)]
+
+    def extract_video_data(self, url):
+        return {'url': url, 'title': url, 'description': '', 'video_url': ''}
+
+    def finish_series(self, job):
+        self.finished.append(job.series_url)
+
+
+class ReadSeriesUrlsTest(unittest.TestCase):
+    def test_file_and_stdin(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'series.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("# catalogue\nhttps://www.ruv.is/a\n\n  https://www.ruv.is/b  \n")
+        self.assertEqual(read_series_urls(path), ['https://www.ruv.is/a', 'https://www.ruv.is/b'])
+        with mock.patch('sys.stdin', io.StringIO("https://www.ruv.is/c\n")):
+            self.assertEqual(read_series_urls('-'), ['https://www.ruv.is/c'])
+
+
+class BatchSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_series_are_interleaved_round_robin(self):
+        scraper = FakeScraper(self.dir, {'big': 4, 'small': 2})
+        batch = BatchScheduler(scraper, active_series=2)
+        order = [(job.series_url, index) for job, index, _ in batch._interleave(['big', 'small'])]
+        self.assertEqual(order, [('big', 1), ('small', 1), ('big', 2), ('small', 2), ('big', 3), ('big', 4)])
+
+    def test_later_series_start_as_earlier_ones_run_out(self):
+        scraper = FakeScraper(self.dir, {'a': 1, 'b': 1, 'c': 1})
+        batch = BatchScheduler(scraper, active_series=2)
+        items = batch._interleave(['a', 'b', 'c'])
+        next(items)
+        # Only as many series as are active have been read so far
+        self.assertEqual(scraper.prepared, ['a', 'b'])
+        self.assertEqual([job.series_url for job, _, _ in items], ['b', 'c'])
+
+    def test_failed_series_do_not_stop_the_batch(self):
+        scraper = FakeScraper(self.dir, {'a': 2, 'c': 1})
+        batch = BatchScheduler(scraper, download_videos=False)
+        with mock.patch('builtins.print'):
+            stats = batch.run(['a', 'missing', 'c'])
+        self.assertEqual(batch.failed_series, ['missing'])
+        self.assertEqual(stats['episodes'], 3)
+        self.assertEqual(scraper.finished, ['a', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
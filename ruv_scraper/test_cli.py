@@ -0,0 +1,74 @@
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import unittest
+
+import cli
+
+SERIES_URL = 'https://www.ruv.is/sjonvarp/spila/bubbi-byggir/37750'
+
+
+class ParseArgsTest(unittest.TestCase):
+    def parse_error(self, *argv):
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+            cli.parse_args(list(argv))
+        return stderr.getvalue()
+
+    def test_defaults(self):
+        args = cli.parse_args([SERIES_URL])
+        self.assertAlmostEqual(args.rate, 1 / 3)
+        self.assertEqual((args.jobs, args.download_jobs, args.min_free), (1, 1, 0))
+        self.assertTrue(cli.downloads_enabled(args))
+
+    def test_exactly_one_source(self):
+        self.assertIn('is required', self.parse_error())
+        self.assertIn('only one of', self.parse_error(SERIES_URL, '--batch', 'series.txt'))
+
+    def test_watch_rejects_one_off_modes(self):
+        for option in (['--dry-run'], ['--async'], ['--limit', '3']):
+            self.assertIn('--watch cannot be combined', self.parse_error('--watch', 'watch.txt', *option))
+
+    def test_sizes_and_intervals(self):
+        args = cli.parse_args([SERIES_URL, '--limit-rate', '5M', '--min-free', '1.5G', '--interval', '2h'])
+        self.assertEqual(args.limit_rate, 5 * 1024 * 1024)
+        self.assertEqual(args.min_free, int(1.5 * 1024 ** 3))
+        self.assertEqual(args.interval, 7200)
+        self.assertIn('expected a size', self.parse_error(SERIES_URL, '--limit-rate', 'fast'))
+        self.assertIn('expected an interval', self.parse_error(SERIES_URL, '--interval', 'soon'))
+
+    def test_metadata_modes_download_nothing(self):
+        for option in ('--dry-run', '--metadata-only', '--async'):
+            self.assertFalse(cli.downloads_enabled(cli.parse_args([SERIES_URL, option])))
+
+
+class CreateScraperTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_dry_run_loads_no_download_machinery(self):
+        loaded = set(sys.modules)
+        scraper = cli.create_scraper(cli.parse_args([SERIES_URL, '--dry-run', '--output-dir', self.dir]))
+        self.addCleanup(cli.close, scraper)
+        self.assertIsNone(scraper.store)
+        self.assertIsNone(scraper.postprocessor)
+        self.assertIsNone(scraper.hls)
+        for module in ('downloaders', 'hls', 'scheduler', 'content_store', 'postprocess'):
+            # Only meaningful when no earlier test in this process loaded it
+            if module not in loaded:
+                self.assertNotIn(module, sys.modules)
+
+    def test_download_run_gets_store_and_postprocessor(self):
+        args = cli.parse_args([SERIES_URL, '--native-hls', '--limit-rate', '1M', '--output-dir', self.dir])
+        scraper = cli.create_scraper(args)
+        self.addCleanup(cli.close, scraper)
+        self.assertIsNotNone(scraper.store)
+        self.assertIsNotNone(scraper.postprocessor)
+        self.assertIs(scraper.hls.bandwidth, scraper.bandwidth)
+        self.assertEqual(scraper.bandwidth.rate, 1024 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import content_store
+from content_store import ContentStore, content_key, file_checksum, link_file
+from manifest import SeriesManifest
+
+
+class ContentKeyTest(unittest.TestCase):
+    def test_media_id_is_shared_across_urls(self):
+        a = content_key({'video_url': 'https://ruv-vod.akamaized.net/opid/5f3a/index.m3u8'})
+        b = content_key({'video_url': 'https://other.example/x/opid/5f3a/master.m3u8?token=1'})
+        self.assertEqual(a, 'opid:5f3a')
+        self.assertEqual(a, b)
+
+    def test_other_urls_use_host_and_path(self):
+        self.assertEqual(content_key({'video_url': 'https://cdn.example/a/b.mp4?x=1'}), 'cdn.example/a/b.mp4')
+        self.assertIsNone(content_key({'video_url': ''}))
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.index = os.path.join(self.dir, '.store', 'index.json')
+        # Series folders exist before anything is linked into them
+        os.makedirs(os.path.join(self.dir, 'B'))
+
+    def write(self, name, data=b'video data'):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+class LinkFileTest(StoreTestCase):
+    def test_hardlink_first(self):
+        source = self.write('a/one.mkv')
+        self.assertEqual(link_file(source, os.path.join(self.dir, 'two.mkv')), 'hardlink')
+        self.assertTrue(os.path.samefile(source, os.path.join(self.dir, 'two.mkv')))
+
+    def test_falls_back_to_a_copy(self):
+        source = self.write('a/one.mkv')
+        target = os.path.join(self.dir, 'two.mkv')
+        error = OSError('cross-device link')
+        with mock.patch('os.link', side_effect=error), mock.patch.object(content_store, '_reflink', side_effect=error):
+            self.assertEqual(link_file(source, target), 'copy')
+        self.assertFalse(os.path.samefile(source, target))
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), b'video data')
+
+
+class ContentStoreTest(StoreTestCase):
+    def test_add_find_and_persist(self):
+        source = self.write('A/one.mkv')
+        ContentStore(self.index).add('opid:1', source)
+        store = ContentStore(self.index)
+        self.assertEqual(store.entries['opid:1']['file'], os.path.join('A', 'one.mkv'))
+        self.assertEqual(store.find('opid:1'), source)
+        self.assertIsNone(store.find('opid:2'))
+
+    def test_find_ignores_changed_files(self):
+        source = self.write('A/one.mkv')
+        store = ContentStore(self.index)
+        store.add('opid:1', source)
+        self.write('A/one.mkv', b'short')
+        self.assertIsNone(store.find('opid:1'))
+
+    def test_link_keeps_the_source_extension(self):
+        source = self.write('A/one.ts')
+        store = ContentStore(self.index)
+        store.add('opid:1', source)
+        linked = store.link('opid:1', os.path.join(self.dir, 'B', 'uno.mkv'))
+        self.assertEqual(linked, os.path.join(self.dir, 'B', 'uno.ts'))
+        self.assertEqual((store.linked, store.linked_bytes), (1, len(b'video data')))
+
+    def test_checksum_mismatch_is_not_linked(self):
+        source = self.write('A/one.mkv')
+        store = ContentStore(self.index, checksum=True)
+        store.add('opid:1', source)
+        self.assertEqual(store.get_checksum('opid:1'), file_checksum(source))
+
+        def bad_copy(src, dst):
+            with open(dst, 'wb') as f:
+                f.write(b'video dat!')
+            return 'copy'
+        with mock.patch.object(content_store, 'link_file', bad_copy):
+            self.assertIsNone(store.link('opid:1', os.path.join(self.dir, 'B', 'uno.mkv')))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'B', 'uno.mkv')))
+
+    def test_remove_evicts_the_entry(self):
+        store = ContentStore(self.index)
+        store.add('opid:1', self.write('A/one.mkv'))
+        self.assertTrue(store.remove('opid:1'))
+        self.assertFalse(store.remove('opid:1'))
+        self.assertNotIn('opid:1', ContentStore(self.index).entries)
+
+    def test_claim_waits_for_the_download_and_links_it(self):
+        store = ContentStore(self.index)
+        self.assertIsNone(store.claim('opid:1', os.path.join(self.dir, 'A', 'one.mkv')))
+        results = []
+        waiter = threading.Thread(
+            target=lambda: results.append(store.claim('opid:1', os.path.join(self.dir, 'B', 'uno.mkv'))))
+        waiter.start()
+        time.sleep(0.1)
+        # The waiter holds no lock, so the store stays usable for the key meanwhile
+        self.assertIsNone(store.find('opid:1'))
+        self.assertEqual(results, [])
+        store.add('opid:1', self.write('A/one.mkv'))
+        store.release('opid:1')
+        waiter.join(5)
+        self.assertEqual(results, [os.path.join(self.dir, 'B', 'uno.mkv')])
+
+    def test_claim_passes_on_after_a_failed_download(self):
+        store = ContentStore(self.index)
+        self.assertIsNone(store.claim('opid:1', os.path.join(self.dir, 'A', 'one.mkv')))
+        results = []
+        waiter = threading.Thread(
+            target=lambda: results.append(store.claim('opid:1', os.path.join(self.dir, 'B', 'uno.mkv'))))
+        waiter.start()
+        store.release('opid:1')
+        waiter.join(5)
+        # Nothing to link, so the waiter now holds the claim itself
+        self.assertEqual(results, [None])
+        self.assertIn('opid:1', store._claimed)
+
+
+class SeriesManifestTest(StoreTestCase):
+    def test_record_and_skip(self):
+        path = self.write('one.mkv')
+        manifest = SeriesManifest(self.dir)
+        entry = manifest.record({'url': 'https://www.ruv.is/e/1', 'video_url': 'v'}, path)
+        self.assertEqual((entry['output_file'], entry['size']), ('one.mkv', len(b'video data')))
+        manifest = SeriesManifest(self.dir)
+        self.assertTrue(manifest.is_complete('https://www.ruv.is/e/1'))
+        self.assertFalse(manifest.is_complete('https://www.ruv.is/e/2'))
+        self.write('one.mkv', b'truncated')
+        self.assertFalse(manifest.is_complete('https://www.ruv.is/e/1'))
+
+    def test_checksum_is_recorded_not_verified(self):
+        path = self.write('one.mkv')
+        manifest = SeriesManifest(self.dir)
+        self.assertEqual(manifest.record({'url': 'a'}, path, 'abc')['checksum_state'], 'recorded')
+        self.assertEqual(manifest.record({'url': 'b'}, path)['checksum_state'], 'unverified')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import xml.etree.ElementTree as ET
+
+from daemon import WatchDaemon, WatchedSeries, parse_interval, read_watch_list
+from nfo import NFOWriter
+from pipeline import SeriesJob
+
+SERIES_URL = 'https://www.ruv.is/sjonvarp/spila/demo/1'
+
+
+def episode(name):
+    return {'url': f'https://www.ruv.is/sjonvarp/spila/demo/{name}', 'title': name}
+
+
+class FakePages:
+    def release(self, url):
+        pass
+
+
+class FakeSession:
+    def configure_pool(self, size):
+        pass
+
+
+class FakeScraper:
+    def __init__(self, output_dir, episodes):
+        self.output_dir = output_dir
+        self.episodes = episodes
+        self.pages = FakePages()
+        self.session = FakeSession()
+        self.postprocessor = None
+        self.metrics = None
+
+    def prepare_series(self, series_url, output_dir_base="downloads"):
+        job = SeriesJob(series_url, 'Demo', self.output_dir, len(self.episodes),
+                        nfo=NFOWriter(self.output_dir, 'Demo'))
+        return job, list(enumerate(self.episodes, 1))
+
+    def get_all_episodes(self, series_url):
+        return list(self.episodes)
+
+
+class ParseTest(unittest.TestCase):
+    def test_parse_interval(self):
+        self.assertEqual(parse_interval('900'), 900)
+        self.assertEqual(parse_interval('15m'), 900)
+        self.assertEqual(parse_interval('1.5h'), 5400)
+        self.assertEqual(parse_interval('1D'), 86400)
+        with self.assertRaises(ValueError):
+            parse_interval('soon')
+
+    def test_read_watch_list(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'series.watch')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# comment\n\n{SERIES_URL} 2h\nhttps://www.ruv.is/b\nhttps://www.ruv.is/c soon\n")
+        with mock.patch('builtins.print'):
+            self.assertEqual(read_watch_list(path, 900),
+                             [(SERIES_URL, 7200), ('https://www.ruv.is/b', 900), ('https://www.ruv.is/c', 900)])
+
+
+class PollTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.scraper = FakeScraper(self.dir, [episode('e1'), episode('e2')])
+        self.daemon = WatchDaemon(self.scraper, os.path.join(self.dir, 'series.watch'), output_dir_base=self.dir)
+        self.watched = WatchedSeries(SERIES_URL, 900)
+
+    def poll(self):
+        with mock.patch('builtins.print'):
+            self.daemon._poll(self.watched)
+        tasks = []
+        while not self.daemon.tasks.empty():
+            _, index, item = self.daemon.tasks.get()
+            tasks.append((index, item['title']))
+        return tasks
+
+    def test_only_new_episodes_are_queued(self):
+        self.assertEqual(self.poll(), [(1, 'e1'), (2, 'e2')])
+        self.assertEqual(self.poll(), [])
+        self.assertEqual(self.watched.last_new, 0)
+
+    def test_episode_listed_first_gets_the_next_number(self):
+        self.poll()
+        self.scraper.episodes.insert(0, episode('e3'))
+        self.scraper.episodes.append(episode('e4'))
+        self.assertEqual(self.poll(), [(3, 'e3'), (4, 'e4')])
+        self.assertEqual(self.watched.job.total, 4)
+        self.assertEqual(self.watched.status()['episodes'], 4)
+
+    def test_info_file_is_flushed(self):
+        self.poll()
+        job = self.watched.job
+        job.nfo.update([(1, dict(episode('e1'), description='', video_url=''))])
+        self.daemon.series[SERIES_URL] = self.watched
+        self.daemon.flush_info_files()
+        root = ET.parse(job.nfo.path).getroot()
+        self.assertEqual([e.findtext('title') for e in root.iter('episode')], ['e1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
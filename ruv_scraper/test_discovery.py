@@ -0,0 +1,89 @@
+import json
+import unittest
+
+from bs4 import BeautifulSoup
+
+from discovery import EpisodeDiscovery, scan_listing_html, scan_listing_json
+
+BASE_URL = 'https://www.ruv.is'
+SERIES_URL = 'https://www.ruv.is/sjonvarp/spila/bubbi-byggir/37750'
+
+
+class FakePage:
+    def __init__(self, html):
+        self.content = html.encode('utf-8')
+        self.soup = BeautifulSoup(html, 'html.parser')
+
+
+class FakePages:
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+
+    def get(self, url):
+        self.fetched.append(url)
+        return FakePage(self.pages[url])
+
+    def release(self, url):
+        pass
+
+
+def listing(episode_ids, next_href=None):
+    links = ''.join(f'<li><a href="/sjonvarp/spila/bubbi-byggir/37750/{i}">Episode {i}</a></li>'
+                    for i in episode_ids)
+    nav = f'<nav class="pagination"><a class="next" href="{next_href}">Næsta</a></nav>' if next_href else ''
+    return f'<html><body><h1>Bubbi byggir</h1><ul class="episode-list">{links}</ul>{nav}</body></html>'
+
+
+class ScanListingTest(unittest.TestCase):
+    def test_episode_section_and_next_link(self):
+        soup = BeautifulSoup(listing(['a', 'b'], '?page=2'), 'html.parser')
+        episodes, next_urls = scan_listing_html(soup, SERIES_URL, SERIES_URL, BASE_URL)
+        self.assertEqual([episode['title'] for episode in episodes], ['Episode a', 'Episode b'])
+        self.assertEqual(next_urls, [SERIES_URL + '?page=2'])
+
+    def test_deeply_nested_markup(self):
+        html = '<div>' * 3000 + '<ul class="episode-list"><li><a href="/sjonvarp/spila/x/1">One</a></li></ul>'
+        soup = BeautifulSoup(html + '</div>' * 3000, 'html.parser')
+        episodes, _ = scan_listing_html(soup, SERIES_URL, SERIES_URL, BASE_URL)
+        self.assertEqual(episodes, [{'url': 'https://www.ruv.is/sjonvarp/spila/x/1', 'title': 'One'}])
+
+    def test_json_episodes_by_url_and_id(self):
+        data = {'props': {'episodes': [{'title': 'One', 'url': '/sjonvarp/spila/bubbi-byggir/37750/a'},
+                                       {'title': 'Two', 'id': 'b'}],
+                          'nextPage': '/api/programs/37750/episodes?page=2'}}
+        episodes, next_urls = scan_listing_json(data, SERIES_URL, BASE_URL)
+        self.assertEqual([episode['url'] for episode in episodes],
+                         [SERIES_URL + '/a', SERIES_URL + '/b'])
+        self.assertEqual(next_urls, ['https://www.ruv.is/api/programs/37750/episodes?page=2'])
+
+
+class EpisodeDiscoveryTest(unittest.TestCase):
+    def test_follows_pagination_without_duplicates(self):
+        pages = FakePages({SERIES_URL: listing(['a', 'b'], '?page=2'),
+                           SERIES_URL + '?page=2': listing(['b', 'c'])})
+        episodes = list(EpisodeDiscovery(pages, BASE_URL).episodes(SERIES_URL))
+        self.assertEqual([episode['url'].rsplit('/', 1)[1] for episode in episodes], ['a', 'b', 'c'])
+
+    def test_does_not_follow_links_to_other_hosts(self):
+        pages = FakePages({SERIES_URL: listing(['a'], 'https://evil.example/page2')})
+        list(EpisodeDiscovery(pages, BASE_URL).episodes(SERIES_URL))
+        self.assertEqual(pages.fetched, [SERIES_URL])
+
+    def test_follows_api_pages(self):
+        api_url = 'https://www.ruv.is/api/programs/37750/episodes?page=2'
+        blob = json.dumps({'episodesUrl': api_url})
+        series = listing(['a']).replace('</body>', f'<script type="application/json">{blob}</script></body>')
+        pages = FakePages({SERIES_URL: series,
+                           api_url: json.dumps({'episodes': [{'title': 'Two', 'id': 'b'}]})})
+        episodes = list(EpisodeDiscovery(pages, BASE_URL).episodes(SERIES_URL))
+        self.assertEqual([episode['title'] for episode in episodes], ['Episode a', 'Two'])
+
+    def test_page_without_episodes_is_a_single_episode(self):
+        pages = FakePages({SERIES_URL: '<html><body><h1>Film</h1></body></html>'})
+        episodes = list(EpisodeDiscovery(pages, BASE_URL).episodes(SERIES_URL))
+        self.assertEqual(episodes, [{'url': SERIES_URL, 'title': 'Film'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
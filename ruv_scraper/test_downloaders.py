@@ -0,0 +1,112 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import downloaders
+from downloaders import DownloadError, SubprocessBackend, YtDlpApiBackend, create_backend
+
+
+class FakeBandwidth:
+    def fair_share(self):
+        return 1000
+
+
+class FakeYoutubeDL:
+    created = 0
+
+    def __init__(self, params):
+        FakeYoutubeDL.created += 1
+        self.params = params
+
+    def extract_info(self, url, download):
+        if 'broken' in url:
+            raise FakeYtDlp.utils.DownloadError('unavailable')
+        path = self.params['outtmpl']['default']
+        return {'requested_downloads': [{'filepath': path}]}
+
+
+class FakeYtDlp:
+    YoutubeDL = FakeYoutubeDL
+
+    class utils:
+        class DownloadError(Exception):
+            pass
+
+
+class CreateBackendTest(unittest.TestCase):
+    def test_prefers_the_api_when_installed(self):
+        with mock.patch('importlib.util.find_spec', return_value=object()), \
+                mock.patch.object(downloaders, 'YtDlpApiBackend') as api:
+            create_backend()
+        api.assert_called_once()
+
+    def test_falls_back_to_the_subprocess(self):
+        with mock.patch('importlib.util.find_spec', return_value=None):
+            self.assertIsInstance(create_backend(), SubprocessBackend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_backend('curl')
+
+
+class YtDlpApiBackendTest(unittest.TestCase):
+    def setUp(self):
+        FakeYoutubeDL.created = 0
+        # Works without yt-dlp installed
+        with mock.patch.dict(sys.modules, {'yt_dlp': FakeYtDlp}):
+            self.backend = YtDlpApiBackend(progress_hooks=[print])
+
+    def test_one_instance_per_thread_reused_across_episodes(self):
+        self.assertEqual(self.backend.download('https://www.ruv.is/e/1', 'a.mkv'), 'a.mkv')
+        self.assertEqual(self.backend.download('https://www.ruv.is/e/2', 'b.mkv'), 'b.mkv')
+        self.assertEqual(FakeYoutubeDL.created, 1)
+        thread = threading.Thread(target=self.backend.download, args=('https://www.ruv.is/e/3', 'c.mkv'))
+        thread.start()
+        thread.join()
+        self.assertEqual(FakeYoutubeDL.created, 2)
+
+    def test_original_options_and_progress_hooks(self):
+        params = self.backend._ydl().params
+        self.assertEqual((params['format'], params['merge_output_format']), ('best', 'mkv'))
+        self.assertTrue(params['geo_bypass'] and params['nocheckcertificate'])
+        self.assertEqual(params['progress_hooks'], [print])
+
+    def test_errors_become_download_errors(self):
+        with self.assertRaises(DownloadError):
+            self.backend.download('https://www.ruv.is/broken', 'a.mkv')
+
+
+class SubprocessBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def run_backend(self, returncode=0, stdout='', bandwidth=None):
+        result = subprocess.CompletedProcess([], returncode, stdout=stdout, stderr='failed')
+        with mock.patch.object(downloaders.subprocess, 'run', return_value=result) as run:
+            path = SubprocessBackend(bandwidth).download('https://www.ruv.is/e/1', os.path.join(self.dir, 'e1.mkv'))
+        return path, run.call_args[0][0]
+
+    def test_printed_file_path_is_returned(self):
+        merged = os.path.join(self.dir, 'e1.mkv')
+        open(merged, 'wb').close()
+        path, cmd = self.run_backend(stdout=f"{merged}\n")
+        self.assertEqual(path, merged)
+        self.assertNotIn('--limit-rate', cmd)
+
+    def test_share_of_the_bandwidth_cap(self):
+        _, cmd = self.run_backend(bandwidth=FakeBandwidth())
+        self.assertEqual(cmd[cmd.index('--limit-rate') + 1], '1000')
+
+    def test_failure_raises(self):
+        with self.assertRaises(DownloadError):
+            self.run_backend(returncode=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from bs4 import BeautifulSoup
+
+from extractors import find_video_url, parse_duration
+
+
+def page(*scripts):
+    body = ''.join(f'<script type="{kind}">{text}</script>' if kind else f'<script>{text}</script>'
+                   for kind, text in scripts)
+    return BeautifulSoup(f'<html><body>{body}</body></html>', 'html.parser')
+
+
+class FindVideoURLTest(unittest.TestCase):
+    def test_hls_ranks_above_an_earlier_mp4(self):
+        soup = page(('', 'var a = "https://cdn/x.mp4";'), ('', 'var b = "https://cdn/x.m3u8";'))
+        self.assertEqual(find_video_url(soup), 'https://cdn/x.m3u8')
+
+    def test_video_url_key_wins(self):
+        soup = page(('', 'var a = "https://cdn/x.m3u8";'), ('', '{"videoUrl": "https://cdn/best"}'))
+        self.assertEqual(find_video_url(soup), 'https://cdn/best')
+
+    def test_json_ld_content_url(self):
+        soup = page(('application/ld+json', '{"@type": "VideoObject", "contentUrl": "https://cdn/a.m3u8"}'),
+                    ('application/json', '{"props": {"src": "https://cdn/other.mp4"}}'))
+        self.assertEqual(find_video_url(soup), 'https://cdn/a.m3u8')
+
+    def test_generic_json_keys_need_a_media_url(self):
+        soup = page(('application/json', '{"url": "https://www.ruv.is/page", "media": {"url": "https://cdn/a.mp4"}}'))
+        self.assertEqual(find_video_url(soup), 'https://cdn/a.mp4')
+
+    def test_invalid_json_falls_back_to_patterns(self):
+        soup = page(('application/json', '{"streamUrl": "https://cdn/s", broken'))
+        self.assertEqual(find_video_url(soup), 'https://cdn/s')
+
+    def test_no_candidates(self):
+        self.assertIsNone(find_video_url(page(('application/json', '{"title": "x"}'), ('', 'var a = 1;'))))
+
+
+class ParseDurationTest(unittest.TestCase):
+    def test_durations(self):
+        self.assertEqual(parse_duration('PT11M33S'), 693)
+        self.assertEqual(parse_duration('PT1H'), 3600)
+        self.assertIsNone(parse_duration('P'))
+        self.assertIsNone(parse_duration(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
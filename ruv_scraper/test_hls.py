@@ -0,0 +1,184 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from hls import HLSDownloader, HLSUnsupported, choose_variant, estimate_hls_size, is_hls_url, parse_playlist
+
+MASTER = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=800000,AVERAGE-BANDWIDTH=640000,RESOLUTION=640x360
+low/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=3000000,RESOLUTION=1280x720
+high/index.m3u8
+"""
+
+MEDIA = """#EXTM3U
+#EXT-X-TARGETDURATION:10
+#EXTINF:10.0,
+seg0.ts
+#EXTINF:5.0,
+seg1.ts
+#EXT-X-ENDLIST
+"""
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+
+    def get(self, url):
+        self.requests.append(url)
+        return FakeResponse(self.files[url])
+
+
+class SlowSession(FakeSession):
+    """Serves earlier segments more slowly, so they finish out of order, and can fail one segment"""
+
+    def __init__(self, files, fail=None):
+        super().__init__(files)
+        self.fail = fail
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if url.endswith('.ts'):
+                number = int(url.rsplit('seg', 1)[1][:-3])
+                time.sleep(0.002 * (10 - number % 10))
+                if number == self.fail:
+                    raise ConnectionError("segment unavailable")
+            return super().get(url)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class PlaylistTest(unittest.TestCase):
+    def test_hls_urls(self):
+        self.assertTrue(is_hls_url('https://cdn/x/master.m3u8?token=1'))
+        self.assertTrue(is_hls_url('https://ruv-vod.akamaized.net/opid/5f3a/'))
+        self.assertFalse(is_hls_url('https://cdn/x/video.mp4'))
+        self.assertFalse(is_hls_url(None))
+
+    def test_master_and_media(self):
+        kind, variants = parse_playlist(MASTER, 'https://cdn/x/master.m3u8')
+        self.assertEqual(kind, 'master')
+        self.assertEqual(variants[0]['uri'], 'https://cdn/x/low/index.m3u8')
+        self.assertEqual(variants[0]['resolution'], (640, 360))
+        kind, segments = parse_playlist(MEDIA, 'https://cdn/x/low/index.m3u8')
+        self.assertEqual([s['duration'] for s in segments], [10.0, 5.0])
+
+    def test_unsupported_streams(self):
+        with self.assertRaises(HLSUnsupported):
+            parse_playlist('#EXTM3U\n#EXT-X-KEY:METHOD=AES-128,URI="k"\nseg.ts', 'https://cdn/')
+        with self.assertRaises(HLSUnsupported):
+            parse_playlist('not a playlist', 'https://cdn/')
+
+    def test_choose_variant(self):
+        _, variants = parse_playlist(MASTER, 'https://cdn/x/master.m3u8')
+        self.assertEqual(choose_variant(variants)['resolution'][1], 720)
+        self.assertEqual(choose_variant(variants, 480)['resolution'][1], 360)
+        self.assertEqual(choose_variant(variants, 240)['resolution'][1], 360)
+
+    def test_estimate_uses_the_page_duration_when_known(self):
+        fetched = []
+
+        def fetch(url):
+            fetched.append(url)
+            return parse_playlist(MASTER if url.endswith('master.m3u8') else MEDIA, url)
+
+        self.assertEqual(estimate_hls_size(fetch, 'https://cdn/x/master.m3u8', 480), 640000 * 15 // 8)
+        self.assertEqual(len(fetched), 2)
+        self.assertEqual(estimate_hls_size(fetch, 'https://cdn/x/master.m3u8', 480, duration=100), 640000 * 100 // 8)
+        self.assertEqual(len(fetched), 3)
+
+
+class HLSDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.downloader = HLSDownloader(segment_jobs=2, max_height=480)
+        self.downloader.session = FakeSession({
+            'https://cdn/x/master.m3u8': MASTER.encode(),
+            'https://cdn/x/low/index.m3u8': MEDIA.encode(),
+            'https://cdn/x/low/seg0.ts': b'AAAA',
+            'https://cdn/x/low/seg1.ts': b'BB',
+        })
+
+    def test_download_reuses_playlists_from_the_estimate(self):
+        estimate_hls_size(self.downloader.playlist, 'https://cdn/x/master.m3u8', 480)
+        output = self.downloader.download('https://cdn/x/master.m3u8', os.path.join(self.dir, 'Episode.mp4'))
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), b'AAAABB')
+        self.assertEqual(len(self.downloader.session.requests), 4)
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'Episode.hls.json')))
+
+    def test_resumes_after_the_last_segment_written(self):
+        base = os.path.join(self.dir, 'Episode')
+        with open(base + '.ts.part', 'wb') as f:
+            f.write(b'AAAAjunk')
+        with open(base + '.hls.json', 'w') as f:
+            f.write('{"playlist": "https://cdn/x/low/index.m3u8", "segments": 2, "completed": 1, "bytes": 4}')
+        output = self.downloader.download('https://cdn/x/master.m3u8', base + '.mp4')
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), b'AAAABB')
+        self.assertNotIn('https://cdn/x/low/seg0.ts', self.downloader.session.requests)
+
+
+class SegmentOrderTest(unittest.TestCase):
+    COUNT = 20
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.files = {'https://cdn/y/index.m3u8': ('#EXTM3U\n' + ''.join(
+            f'#EXTINF:2.0,\nseg{i}.ts\n' for i in range(self.COUNT))).encode()}
+        for i in range(self.COUNT):
+            self.files[f'https://cdn/y/seg{i}.ts'] = f'[{i}]'.encode()
+        self.expected = b''.join(f'[{i}]'.encode() for i in range(self.COUNT))
+
+    def downloader(self, fail=None):
+        downloader = HLSDownloader(segment_jobs=4, buffer_segments=6)
+        downloader.session = SlowSession(self.files, fail)
+        return downloader
+
+    def test_segments_are_written_in_order_with_a_bounded_buffer(self):
+        downloader = self.downloader()
+        output = downloader.download('https://cdn/y/index.m3u8', os.path.join(self.dir, 'Episode.mp4'))
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), self.expected)
+        self.assertLessEqual(downloader.session.max_in_flight, 4)
+
+    def test_failed_download_resumes_where_it_stopped(self):
+        base = os.path.join(self.dir, 'Episode')
+        with self.assertRaises(ConnectionError):
+            self.downloader(fail=12).download('https://cdn/y/index.m3u8', base + '.mp4')
+        with open(base + '.hls.json') as f:
+            self.assertEqual(json.load(f)['completed'], 12)
+
+        downloader = self.downloader()
+        output = downloader.download('https://cdn/y/index.m3u8', base + '.mp4')
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), self.expected)
+        self.assertEqual(sorted(url for url in downloader.session.requests if url.endswith('.ts')),
+                         sorted(f'https://cdn/y/seg{i}.ts' for i in range(12, self.COUNT)))
+
+
+if __name__ == '__main__':
+    unittest.main()
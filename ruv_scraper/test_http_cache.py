@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from fsutil import read_json
+from http_cache import HTTPCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ValueError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Serves fixed bodies with an ETag and answers matching conditional requests with 304"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, headers=None):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        etag = f'"{len(self.pages[url])}"'
+        if headers.get('If-None-Match') == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.pages[url], {'ETag': etag})
+
+
+class HTTPCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.session = FakeSession({'http://a/1': b'one', 'http://a/2': b'two!', 'http://a/3': b'three'})
+
+    def test_revalidates_with_etag(self):
+        cache = HTTPCache(self.dir)
+        self.assertEqual(cache.get(self.session, 'http://a/1'), b'one')
+        self.assertEqual(cache.get(self.session, 'http://a/1'), b'one')
+        self.assertEqual(self.session.requests[1][1], {'If-None-Match': '"3"'})
+        self.assertEqual((cache.misses, cache.revalidated), (1, 1))
+
+    def test_fresh_entries_are_served_without_a_request(self):
+        cache = HTTPCache(self.dir, ttl=3600)
+        cache.get(self.session, 'http://a/1')
+        cache.get(self.session, 'http://a/1')
+        self.assertEqual(len(self.session.requests), 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = HTTPCache(self.dir, ttl=3600, max_bytes=8)
+        cache.get(self.session, 'http://a/1')
+        cache.get(self.session, 'http://a/2')
+        cache.get(self.session, 'http://a/1')
+        cache.get(self.session, 'http://a/3')
+        urls = {entry['url'] for entry in cache._index.values()}
+        self.assertEqual(urls, {'http://a/1', 'http://a/3'})
+
+    def test_index_is_written_on_close_not_per_request(self):
+        cache = HTTPCache(self.dir, save_interval=3600)
+        index_path = os.path.join(self.dir, HTTPCache.INDEX_FILE)
+        cache.get(self.session, 'http://a/1')
+        cache.get(self.session, 'http://a/1')
+        self.assertFalse(os.path.exists(index_path))
+        cache.close()
+        self.assertEqual(len(read_json(index_path)), 1)
+        self.assertEqual(HTTPCache(self.dir).get(self.session, 'http://a/1'), b'one')
+        self.assertEqual(self.session.requests[-1][1], {'If-None-Match': '"3"'})
+
+
+if __name__ == '__main__':
+    unittest.main()
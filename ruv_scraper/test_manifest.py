@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from manifest import SeriesManifest
+from pipeline import SeriesJob
+from ruv_improved_scraper import RUVImprovedScraper
+
+
+def episode(number):
+    return {'url': f'https://www.ruv.is/e/{number}', 'title': f'e{number}'}
+
+
+class FakeNFO:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, episodes):
+        self.updates.extend(episodes)
+
+
+class PendingEpisodesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.manifest = SeriesManifest(self.dir)
+        self.scraper = RUVImprovedScraper(requests_per_second=None)
+
+    def finish(self, number, data=b'video data'):
+        path = os.path.join(self.dir, f'e{number}.mkv')
+        with open(path, 'wb') as f:
+            f.write(data)
+        info = dict(episode(number), video_url=f'https://x/opid/{number}/a.m3u8')
+        self.manifest.record(info, path, verification={'state': 'verified'})
+        return path
+
+    def pending(self, count):
+        job = SeriesJob('https://www.ruv.is/s', 'Series', self.dir, None, manifest=SeriesManifest(self.dir),
+                        nfo=FakeNFO())
+        with mock.patch('builtins.print'):
+            pending = list(self.scraper._pending_episodes(job, iter([episode(i) for i in range(1, count + 1)])))
+        return job, pending
+
+    def test_finished_episodes_are_skipped_without_requests(self):
+        self.finish(1)
+        self.finish(3)
+        with mock.patch.object(self.scraper.session, 'request') as request:
+            job, pending = self.pending(4)
+        request.assert_not_called()
+        self.assertEqual([index for index, _ in pending], [2, 4])
+        self.assertEqual(job.total, 4)
+        # Skipped episodes keep their metadata in the results and in info.nfo
+        self.assertEqual(sorted(job.results), [1, 3])
+        self.assertEqual([number for number, _ in job.nfo.updates], [1, 3])
+
+    def test_changed_file_is_downloaded_again(self):
+        path = self.finish(1)
+        with open(path, 'ab') as f:
+            f.write(b' and more')
+        _, pending = self.pending(1)
+        self.assertEqual([index for index, _ in pending], [1])
+
+    def test_missing_file_is_downloaded_again(self):
+        os.remove(self.finish(1))
+        _, pending = self.pending(1)
+        self.assertEqual([index for index, _ in pending], [1])
+
+    def test_manifest_survives_a_restart(self):
+        self.finish(1)
+        entry = SeriesManifest(self.dir).get('https://www.ruv.is/e/1')
+        self.assertEqual(entry['output_file'], 'e1.mkv')
+        self.assertEqual(entry['video_url'], 'https://x/opid/1/a.m3u8')
+        self.assertTrue(entry['completed_at'])
+        self.assertFalse(SeriesManifest(self.dir).is_unverified('https://www.ruv.is/e/1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
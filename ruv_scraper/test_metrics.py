@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from metrics import Metrics, percentile, timed
+from pages import PageStore
+
+
+class ThrottledSession:
+    """Spends `wait` seconds on the rate limit and `latency` seconds on the request itself"""
+
+    def __init__(self, wait, latency):
+        self.wait = wait
+        self.latency = latency
+        self.waited = 0.0
+
+    def thread_waited(self):
+        return self.waited
+
+    def get(self, url):
+        time.sleep(self.wait)
+        self.waited += self.wait
+        time.sleep(self.latency)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    content = b'<html><body><h1>Page</h1></body></html>'
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 51)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 99), 3)
+
+    def test_json_lines_and_summary(self):
+        path = os.path.join(self.dir, 'run.jsonl')
+        metrics = Metrics(path)
+        with timed(metrics, 'fetch', 'https://a'):
+            pass
+        metrics.record('download', 2.0)
+        metrics.count(retries=2)
+        metrics.close(cache_hits=5)
+        with open(path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['type'] for line in lines], ['stage', 'stage', 'summary'])
+        self.assertEqual(list(lines[-1]['stages']), ['fetch', 'download'])
+        self.assertEqual(lines[-1]['counters'], {'retries': 2, 'cache_hits': 5})
+
+    def test_prometheus_output(self):
+        path = os.path.join(self.dir, 'run.prom')
+        metrics = Metrics(path)
+        metrics.record('fetch', 0.5)
+        metrics.close(retries=1)
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        self.assertIn('ruv_scraper_stage_seconds_count{stage="fetch"} 1', text)
+        self.assertIn('ruv_scraper_retries_total 1', text)
+
+    def test_timed_without_metrics_does_nothing(self):
+        with timed(None, 'fetch'):
+            pass
+
+    def test_fetch_time_leaves_out_the_rate_limit_wait(self):
+        metrics = Metrics(os.path.join(self.dir, 'run.jsonl'))
+        pages = PageStore(ThrottledSession(wait=0.2, latency=0.01), metrics=metrics)
+        pages.get('https://www.ruv.is/a')
+        self.assertLess(metrics.samples['fetch'][0], 0.1)
+        metrics.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
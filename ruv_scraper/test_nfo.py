@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from nfo import NFOWriter
+
+
+def info(number, url=None, title=None):
+    return {'title': title or f'Episode {number}', 'url': url or f'https://www.ruv.is/e/{number}',
+            'description': 'A & B <c>', 'video_url': ''}
+
+
+class NFOWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def episodes(self):
+        root = ET.parse(os.path.join(self.dir, NFOWriter.FILE_NAME)).getroot()
+        return [(int(e.findtext('number')), e.findtext('url'), e.findtext('title')) for e in root.iter('episode')]
+
+    def test_write_returns_the_path(self):
+        path = NFOWriter(self.dir, 'Series').write([(1, info(1))])
+        self.assertEqual(path, os.path.join(self.dir, NFOWriter.FILE_NAME))
+        self.assertEqual(ET.parse(path).getroot().findtext('title'), 'Series')
+
+    def test_merge_keeps_series_order_and_escapes(self):
+        writer = NFOWriter(self.dir, 'Series')
+        writer.merge([(3, info(3)), (1, info(1))])
+        writer.merge([(2, info(2))])
+        self.assertEqual([number for number, _, _ in self.episodes()], [1, 2, 3])
+        root = ET.parse(writer.path).getroot()
+        self.assertEqual(root.find('episodes/episode').findtext('description'), 'A & B <c>')
+
+    def test_merge_replaces_by_url_and_by_number(self):
+        writer = NFOWriter(self.dir, 'Series')
+        writer.merge([(1, info(1)), (2, info(2))])
+        writer.merge([(5, info(1, title='Moved'))])
+        writer.merge([(2, info(2, url='https://www.ruv.is/e/new', title='Replaced'))])
+        self.assertEqual(self.episodes(), [(2, 'https://www.ruv.is/e/new', 'Replaced'),
+                                           (5, 'https://www.ruv.is/e/1', 'Moved')])
+
+    def test_updates_are_buffered_until_flushed(self):
+        writer = NFOWriter(self.dir, 'Series', flush_every=3, flush_interval=3600)
+        writer.update([(1, info(1))])
+        writer.update([(2, info(2))])
+        self.assertFalse(os.path.exists(writer.path))
+        writer.update([(3, info(3))])
+        self.assertEqual(len(self.episodes()), 3)
+        writer.update([(4, info(4))])
+        writer.flush()
+        self.assertEqual(len(self.episodes()), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
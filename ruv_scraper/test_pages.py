@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+
+from pages import PageStore
+
+HTML = b'<html><head><title>Bubbi byggir</title></head><body><h1>Bubbi</h1></body></html>'
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, delay=0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def get(self, url):
+        self.calls.append(url)
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("unreachable")
+        return FakeResponse(HTML)
+
+
+class PageStoreTest(unittest.TestCase):
+    def test_page_is_fetched_and_parsed_once(self):
+        session = FakeSession()
+        pages = PageStore(session, 'html.parser')
+        soup = pages.get('https://www.ruv.is/s').soup
+        self.assertEqual(soup.title.string, 'Bubbi byggir')
+        self.assertIs(pages.get('https://www.ruv.is/s').soup, soup)
+        self.assertEqual(session.calls, ['https://www.ruv.is/s'])
+
+    def test_concurrent_callers_share_one_fetch(self):
+        session = FakeSession(delay=0.05)
+        pages = PageStore(session, 'html.parser')
+        threads = [threading.Thread(target=pages.get, args=('https://www.ruv.is/s',)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(session.calls), 1)
+
+    def test_release_frees_the_page(self):
+        session = FakeSession()
+        pages = PageStore(session, 'html.parser')
+        page = pages.get('https://www.ruv.is/s')
+        page.soup
+        pages.release('https://www.ruv.is/s')
+        self.assertIsNone(page.content)
+        pages.get('https://www.ruv.is/s')
+        self.assertEqual(len(session.calls), 2)
+
+    def test_failed_fetch_is_not_kept(self):
+        session = FakeSession(fail=True)
+        pages = PageStore(session, 'html.parser')
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                pages.get('https://www.ruv.is/s')
+        self.assertEqual(len(session.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from manifest import SeriesManifest
+from nfo import NFOWriter
+from pipeline import EpisodePipeline, SeriesJob
+
+
+class FakeSession:
+    def __init__(self):
+        self.pool_size = None
+
+    def configure_pool(self, size):
+        self.pool_size = size
+
+
+class FakeScraper:
+    """Extracts every episode but `bad_extract` and downloads every one but `bad_download`"""
+
+    def __init__(self, bad_extract=(), bad_download=(), extract_seconds=0, download_seconds=0):
+        self.session = FakeSession()
+        self.postprocessor = None
+        self.metrics = None
+        self.store = None
+        self.min_free_space = 0
+        self.bad_extract = bad_extract
+        self.bad_download = bad_download
+        self.extract_seconds = extract_seconds
+        self.download_seconds = download_seconds
+        self.downloading = 0
+        self.max_downloading = 0
+        self.extracted_while_downloading = 0
+        self._lock = threading.Lock()
+
+    def extract_video_data(self, url):
+        time.sleep(self.extract_seconds)
+        if url in self.bad_extract:
+            return None
+        with self._lock:
+            if self.downloading:
+                self.extracted_while_downloading += 1
+        return {'url': url, 'title': url.rsplit('/', 1)[-1], 'description': '', 'video_url': url + '.m3u8'}
+
+    def expected_download_size(self, video_info, episode_title, output_dir):
+        return 10, 0, os.path.join(output_dir, episode_title + '.mkv')
+
+    def download_video(self, video_info, episode_title, output_dir):
+        with self._lock:
+            self.downloading += 1
+            self.max_downloading = max(self.max_downloading, self.downloading)
+        try:
+            time.sleep(self.download_seconds)
+            if video_info['url'] in self.bad_download:
+                return False
+            path = os.path.join(output_dir, episode_title + '.mkv')
+            with open(path, 'wb') as f:
+                f.write(b'0123456789')
+            return path
+        finally:
+            with self._lock:
+                self.downloading -= 1
+
+    def content_checksum(self, video_info):
+        return None
+
+
+def episodes(count):
+    return [{'url': f'https://www.ruv.is/e/{i}', 'title': f'e{i}'} for i in range(1, count + 1)]
+
+
+class EpisodePipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.job = SeriesJob('https://www.ruv.is/s', 'Series', self.dir, 6, manifest=SeriesManifest(self.dir),
+                             nfo=NFOWriter(self.dir, 'Series'))
+
+    def run_pipeline(self, scraper, count=6, **options):
+        pipeline = EpisodePipeline(scraper, **options)
+        with mock.patch('builtins.print'):
+            stats = pipeline.run((self.job, i, episode) for i, episode in enumerate(episodes(count), 1))
+        self.job.nfo.flush()
+        return pipeline, stats
+
+    def test_pools_share_the_work_and_keep_episode_order(self):
+        scraper = FakeScraper(extract_seconds=0.02, download_seconds=0.05)
+        _, stats = self.run_pipeline(scraper, jobs=2, download_jobs=3)
+        self.assertEqual(scraper.session.pool_size, 5)
+        self.assertEqual(stats, {'episodes': 6, 'downloads': 6, 'failed': 0, 'bytes': 60, 'verify_failed': 0})
+        self.assertEqual([info['url'] for info in self.job.metadata()], [episode['url'] for episode in episodes(6)])
+        self.assertGreater(scraper.max_downloading, 1)
+        self.assertLessEqual(scraper.max_downloading, 3)
+        # Later pages are extracted while earlier episodes download
+        self.assertGreater(scraper.extracted_while_downloading, 0)
+
+    def test_failures_are_counted_and_the_rest_continue(self):
+        scraper = FakeScraper(bad_extract={'https://www.ruv.is/e/2'}, bad_download={'https://www.ruv.is/e/3'})
+        _, stats = self.run_pipeline(scraper, jobs=2, download_jobs=2)
+        self.assertEqual((stats['episodes'], stats['downloads'], stats['failed']), (5, 4, 1))
+        self.assertNotIn(2, self.job.results)
+        manifest = SeriesManifest(self.dir)
+        self.assertTrue(manifest.is_complete('https://www.ruv.is/e/1'))
+        self.assertFalse(manifest.is_complete('https://www.ruv.is/e/3'))
+
+    def test_metadata_only_downloads_nothing(self):
+        scraper = FakeScraper()
+        _, stats = self.run_pipeline(scraper, count=3, download_videos=False)
+        self.assertEqual((stats['episodes'], stats['downloads']), (3, 0))
+        self.assertEqual(sorted(os.listdir(self.dir)), [NFOWriter.FILE_NAME])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import postprocess
+from content_store import ContentStore
+from manifest import SeriesManifest
+from pipeline import EpisodePipeline, SeriesJob
+from postprocess import verify_file
+
+PROBED = {'duration': 700.0, 'streams': ['video:h264', 'audio:aac'], 'tags': {}}
+
+
+class VerifyFileTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(postprocess.shutil, 'which', return_value='/usr/bin/tool')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unverified_without_ffprobe(self):
+        with mock.patch.object(postprocess.shutil, 'which', return_value=None):
+            self.assertEqual(verify_file('a.ts', duration='PT10M')['state'], 'unverified')
+
+    def test_truncated_file_fails(self):
+        with mock.patch.object(postprocess, 'probe', return_value=dict(PROBED, duration=100.0)):
+            result = verify_file('a.ts', duration='PT11M40S')
+        self.assertEqual(result['state'], 'failed')
+        self.assertIn('Truncated', result['error'])
+
+    def test_remuxed_unless_shared(self):
+        with mock.patch.object(postprocess, 'probe', return_value=PROBED), \
+                mock.patch.object(postprocess, 'remux', return_value='a.mkv') as remux:
+            self.assertEqual(verify_file('a.ts', 'A')['output_file'], 'a.mkv')
+            result = verify_file('a.ts', 'A', remux_allowed=False)
+        remux.assert_called_once_with('a.ts', 'A', '')
+        self.assertEqual((result['state'], result['output_file'], result['remuxed']), ('verified', 'a.ts', False))
+
+
+class FakePostProcessor:
+    jobs = 1
+
+    def __init__(self, state):
+        self.state = state
+        self.calls = []
+
+    def verify(self, video_info, path, remux_allowed=True):
+        self.calls.append((path, remux_allowed))
+        return {'state': self.state, 'output_file': path, 'remuxed': False, 'error': 'Truncated',
+                'duration': 1.0, 'streams': []}
+
+
+class FakeSession:
+    def configure_pool(self, size):
+        pass
+
+
+class FakeScraper:
+    def __init__(self, store, postprocessor):
+        self.session = FakeSession()
+        self.store = store
+        self.postprocessor = postprocessor
+        self.metrics = None
+        self.min_free_space = 0
+
+    def content_checksum(self, video_info):
+        return None
+
+
+class VerifyWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.store = ContentStore(os.path.join(self.dir, '.store', 'index.json'))
+        self.info = {'url': 'https://www.ruv.is/e/1', 'title': 'One', 'video_url': 'https://x/opid/1/a.m3u8'}
+
+    def series(self, name):
+        output_dir = os.path.join(self.dir, name)
+        os.makedirs(output_dir)
+        return SeriesJob('https://www.ruv.is/s/' + name, name, output_dir, 1, manifest=SeriesManifest(output_dir))
+
+    def write(self, path):
+        with open(path, 'wb') as f:
+            f.write(b'video data')
+        return path
+
+    def verify(self, state, job, output_file):
+        postprocessor = FakePostProcessor(state)
+        pipeline = EpisodePipeline(FakeScraper(self.store, postprocessor))
+        tasks = [(job, 1, dict(self.info, verify_only=True))]
+        with mock.patch('builtins.print'):
+            pipeline.run(tasks)
+        return pipeline, postprocessor
+
+    def test_unverified_download_is_verified_later(self):
+        job = self.series('A')
+        output_file = self.write(os.path.join(job.output_dir, 'One.ts'))
+        job.manifest.record(self.info, output_file, verification={'state': 'unverified'})
+        self.assertTrue(job.manifest.is_unverified(self.info['url']))
+
+        self.verify('verified', job, output_file)
+        self.assertFalse(SeriesManifest(job.output_dir).is_unverified(self.info['url']))
+
+    def test_linked_file_is_not_remuxed(self):
+        job = self.series('A')
+        source = self.write(os.path.join(job.output_dir, 'One.ts'))
+        self.store.add('opid:1', source)
+        other = self.series('B')
+        linked = self.store.link('opid:1', os.path.join(other.output_dir, 'One.mkv'))
+        other.manifest.record(self.info, linked)
+
+        _, postprocessor = self.verify('verified', other, linked)
+        self.assertEqual(postprocessor.calls, [(linked, False)])
+
+    def test_failed_verification_is_counted_and_evicted(self):
+        job = self.series('A')
+        output_file = self.write(os.path.join(job.output_dir, 'One.ts'))
+        self.store.add('opid:1', output_file)
+        job.manifest.record(self.info, output_file)
+
+        pipeline, postprocessor = self.verify('failed', job, output_file)
+        self.assertEqual(postprocessor.calls, [(output_file, True)])
+        self.assertEqual(pipeline.stats['verify_failed'], 1)
+        self.assertTrue(all(value >= 0 for value in pipeline.stats.values()))
+        self.assertFalse(os.path.exists(output_file))
+        self.assertIsNone(self.store.find('opid:1'))
+        self.assertNotIn('opid:1', self.store.entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import scheduler
+from scheduler import DownloadScheduler, partial_download_bytes
+
+DiskUsage = collections.namedtuple('DiskUsage', 'total used free')
+
+
+class PartialDownloadBytesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write(self, name, size):
+        with open(os.path.join(self.dir, name), 'wb') as f:
+            f.write(b'x' * size)
+
+    def test_counts_only_the_episodes_own_part_files(self):
+        self.write('Episode 1.mkv.part', 10)
+        self.write('Episode 1.f137.mp4.part', 5)
+        self.write('Episode 10.mkv.part', 100)
+        self.write('Episode 1.mkv', 1000)
+        self.assertEqual(partial_download_bytes(os.path.join(self.dir, 'Episode 1.mkv')), 15)
+
+    def test_native_hls_progress(self):
+        self.write('Episode 1.ts.part', 10)
+        with open(os.path.join(self.dir, 'Episode 1.hls.json'), 'w') as f:
+            f.write('{"bytes": 7}')
+        self.assertEqual(partial_download_bytes(os.path.join(self.dir, 'Episode 1.mkv')), 7)
+
+
+class DownloadSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.free = 1000
+        patcher = mock.patch.object(scheduler.shutil, 'disk_usage', lambda path: DiskUsage(0, 0, self.free))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_smallest_remaining_first_and_unknown_sizes_last(self):
+        queue = DownloadScheduler()
+        queue.put('unknown', self.dir)
+        queue.put('large', self.dir, 300)
+        queue.put('resumed', self.dir, 500, done=450)
+        queue.close()
+        order = []
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            order.append(item[0])
+            queue.finished(item[0])
+        self.assertEqual(order, ['resumed', 'large', 'unknown'])
+
+    def test_rejects_what_does_not_fit_with_nothing_running(self):
+        queue = DownloadScheduler(min_free=100)
+        queue.put('huge', self.dir, 950)
+        self.assertEqual(queue.get(), ('huge', 950, False))
+
+    def test_reservation_shrinks_as_the_download_writes(self):
+        output_file = os.path.join(self.dir, 'Episode 1.mkv')
+        queue = DownloadScheduler()
+        queue.put('first', self.dir, 800, output_file=output_file)
+        task, _, admitted = queue.get()
+        self.assertTrue(admitted)
+        self.assertEqual(queue.free_space(self.dir), 200)
+
+        # 600 bytes written: the disk has that much less free, and only 200 are still reserved
+        with open(output_file + '.part', 'wb') as f:
+            f.write(b'x' * 600)
+        self.free = 400
+        self.assertEqual(queue.free_space(self.dir), 200)
+
+        queue.finished(task)
+        self.assertEqual(queue.free_space(self.dir), 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from stream_cache import StreamCache
+
+
+def info(number):
+    return {'url': f'https://www.ruv.is/e/{number}', 'video_url': f'https://ruv-vod.akamaized.net/opid/{number}/x.m3u8'}
+
+
+class StreamCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'streams.json')
+
+    def saved(self):
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)['streams']
+
+    def test_get_counts_hits_and_misses(self):
+        cache = StreamCache(self.path)
+        cache.put('e1', info(1))
+        self.assertEqual(cache.get('e1'), info(1))
+        self.assertIsNone(cache.get('e2'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_expired_entries_are_not_used(self):
+        cache = StreamCache(self.path, ttl=60)
+        cache.put('e1', info(1))
+        cache.entries['e1']['extracted_at'] -= 120
+        self.assertIsNone(cache.get('e1'))
+
+    def test_puts_are_written_in_batches_and_on_close(self):
+        cache = StreamCache(self.path, save_every=3)
+        self.assertFalse(cache.put('e1', info(1)))
+        cache.put('e2', info(2))
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(cache.put('e3', info(3)))
+        self.assertEqual(sorted(self.saved()), ['e1', 'e2', 'e3'])
+        cache.put('e4', info(4))
+        cache.close()
+        self.assertEqual(len(self.saved()), 4)
+
+    def test_put_without_save_leaves_the_write_to_the_caller(self):
+        cache = StreamCache(self.path, save_every=1)
+        self.assertTrue(cache.put('e1', info(1), save=False))
+        self.assertFalse(os.path.exists(self.path))
+        cache.save()
+        self.assertEqual(list(self.saved()), ['e1'])
+
+    def test_expired_entries_are_pruned_on_load_and_save(self):
+        cache = StreamCache(self.path, ttl=60)
+        cache.put('old', info(1))
+        cache.put('new', info(2))
+        cache.entries['old']['extracted_at'] = time.time() - 120
+        cache.save()
+        self.assertEqual(list(self.saved()), ['new'])
+
+        cache.entries['new']['extracted_at'] = time.time() - 120
+        cache._unsaved = 0
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'streams': cache.entries}, f)
+        self.assertEqual(StreamCache(self.path, ttl=60).entries, {})
+
+    def test_invalidate_only_the_failed_stream(self):
+        cache = StreamCache(self.path)
+        cache.put('e1', info(1))
+        self.assertFalse(cache.invalidate('e1', 'https://elsewhere/x.m3u8'))
+        self.assertTrue(cache.invalidate('e1', info(1)['video_url']))
+        self.assertEqual(self.saved(), {})
+        self.assertFalse(cache.invalidate('e1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import email.utils
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from transport import PoliteSession, TokenBucket, parse_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_rate_halves_and_recovers_within_bounds(self):
+        bucket = TokenBucket(8)
+        for _ in range(10):
+            bucket.slow_down()
+        self.assertEqual(bucket.rate, 0.5)
+        for _ in range(20):
+            bucket.speed_up()
+        self.assertEqual(bucket.rate, 8)
+
+    def test_waits_for_the_next_token(self):
+        bucket = TokenBucket(20)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertAlmostEqual(bucket.acquire(), 0.05, delta=0.02)
+
+
+class RetryAfterTest(unittest.TestCase):
+    def test_seconds_and_dates(self):
+        self.assertEqual(parse_retry_after('5'), 5.0)
+        self.assertAlmostEqual(parse_retry_after(email.utils.formatdate(time.time() + 60, usegmt=True)), 60, delta=2)
+        self.assertEqual(parse_retry_after(email.utils.formatdate(time.time() - 60, usegmt=True)), 0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class PoliteSessionTest(unittest.TestCase):
+    def request_with(self, session, responses):
+        with mock.patch.object(requests.Session, 'request', side_effect=responses) as request:
+            response = session.get('https://www.ruv.is/x')
+        return response, request.call_count
+
+    def test_retries_overload_and_honours_retry_after(self):
+        session = PoliteSession(requests_per_second=100, max_retries=3)
+        response, calls = self.request_with(session, [FakeResponse(503, {'Retry-After': '0'}),
+                                                      FakeResponse(429, {'Retry-After': '0'}), FakeResponse(200)])
+        self.assertEqual((response.status_code, calls, session.retries), (200, 3, 2))
+
+    def test_gives_up_after_max_retries(self):
+        session = PoliteSession(max_retries=1, backoff=0)
+        response, calls = self.request_with(session, [FakeResponse(503), FakeResponse(503)])
+        self.assertEqual((response.status_code, calls), (503, 2))
+
+    def test_connection_errors_are_retried_then_raised(self):
+        session = PoliteSession(max_retries=1, backoff=0)
+        with self.assertRaises(requests.ConnectionError):
+            self.request_with(session, [requests.ConnectionError(), requests.ConnectionError()])
+
+    def test_pool_is_only_remounted_to_grow(self):
+        session = PoliteSession()
+        adapter = session.get_adapter('https://www.ruv.is/')
+        session.configure_pool(4)
+        self.assertIs(session.get_adapter('https://www.ruv.is/'), adapter)
+        session.configure_pool(24)
+        grown = session.get_adapter('https://www.ruv.is/')
+        self.assertIsNot(grown, adapter)
+        session.configure_pool(12)
+        self.assertIs(session.get_adapter('https://www.ruv.is/'), grown)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Adaptive per-host request rate.
+
+    The rate halves whenever the server signals overload and creeps back up
+    towards the configured rate with every successful response.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._hold_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent, returning the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = max(-self._tokens / self.rate if self._tokens < 0 else 0, self._hold_until - now)
+        if delay > 0:
+            time.sleep(delay)
+            return delay
+        return 0
+
+    def hold(self, seconds):
+        """Stop every request to this host for `seconds`"""
+        with self._lock:
+            self._hold_until = max(self._hold_until, time.monotonic() + seconds)
+
+    def slow_down(self):
+        with self._lock:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def speed_up(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header, which is either seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class PoliteSession(requests.Session):
+    """requests.Session with per-host rate limiting and retries.
+
+    Every request to a host first takes a token from that host's bucket
+    (`requests_per_second`, or no limit when None). Connection errors, 429 and
+    5xx responses are retried with jittered exponential backoff, honouring
+    Retry-After.
+    """
+
+    def __init__(self, requests_per_second=None, max_retries=4, backoff=1.0, max_backoff=60.0, timeout=30):
+        super().__init__()
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.retries = 0
+        # Seconds spent waiting for the rate limit, over all threads
+        self.throttled = 0.0
+        self._buckets = {}
+        self._pool_size = 10
+        self._waited = threading.local()
+        self._lock = threading.Lock()
+
+    def configure_pool(self, size):
+        """Make room in the connection pool for `size` concurrent requests per host.
+
+        The adapters are only replaced when the pool has to grow, since that
+        drops the pooled keep-alive connections.
+        """
+        if size <= self._pool_size:
+            return
+        self._pool_size = size
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=size)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def _bucket(self, url):
+        if not self.requests_per_second:
+            return None
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.requests_per_second)
+            return bucket
+
+    def _acquire(self, bucket):
+        waited = bucket.acquire()
+        if waited:
+            self._waited.seconds = self.thread_waited() + waited
+            with self._lock:
+                self.throttled += waited
+
+    def thread_waited(self):
+        """Seconds the calling thread has spent waiting for rate limits and backoff"""
+        return getattr(self._waited, 'seconds', 0.0)
+
+    def throttle(self, url):
+        """Take a token for the host of `url`, e.g. before another tool fetches it"""
+        bucket = self._bucket(url)
+        if bucket:
+            self._acquire(bucket)
+
+    def _back_off(self, bucket, attempt, retry_after=None):
+        with self._lock:
+            self.retries += 1
+        delay = retry_after
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if bucket:
+            bucket.slow_down()
+            bucket.hold(delay)
+        else:
+            time.sleep(delay)
+            self._waited.seconds = self.thread_waited() + delay
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        bucket = self._bucket(url)
+        for attempt in range(self.max_retries + 1):
+            if bucket:
+                self._acquire(bucket)
+            try:
+                response = super().request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._back_off(bucket, attempt)
+                continue
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                response.close()
+                self._back_off(bucket, attempt, retry_after)
+                continue
+            if bucket and response.status_code < 400:
+                bucket.speed_up()
+            return response